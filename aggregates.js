@@ -0,0 +1,80 @@
+/**
+ * CLI para verificar o reconstruir los agregados mensuales (tabla resumen_mensual).
+ * Uso: node aggregates.js verify    -> compara contra transacciones, exit 1 si hay diferencias
+ *      node aggregates.js rebuild   -> recalcula resumen_mensual desde cero (transaccional)
+ *      DB_FILE=/tmp/x.sqlite node aggregates.js verify   -> otra base (misma variable que server.js)
+ */
+const sqlite3 = require('sqlite3').verbose();
+const path = require('path');
+const { MIGRATIONS, RESUMEN_EXPECTED_SQL, RESUMEN_REBUILD_SQL } = require('./lib/schema');
+
+const DB_FILE = process.env.DB_FILE || path.join(__dirname, 'data/finanzas.sqlite');
+const db = new sqlite3.Database(DB_FILE);
+db.configure('busyTimeout', 5000); // igual que server.js: esperar a su escritor en vez de fallar con SQLITE_BUSY
+
+// Versión que deja el servidor al arrancar: con un esquema anterior fechas y montos tienen otro formato
+const SCHEMA_VERSION = Math.max(...MIGRATIONS.map(m => m.version));
+
+const command = process.argv[2];
+if (command !== 'verify' && command !== 'rebuild') {
+    console.error('❌ Uso: node aggregates.js <verify|rebuild>');
+    process.exit(1);
+}
+
+function verify() {
+    // FULL OUTER JOIN emulado: filas esperadas vs almacenadas, en ambas direcciones
+    const sql = `
+        WITH esperado AS (${RESUMEN_EXPECTED_SQL})
+        SELECT e.user_id, e.mes, e.tipo, e.categoria, e.total AS esperado, r.total AS actual, e.cantidad AS n_esperado, r.cantidad AS n_actual
+        FROM esperado e LEFT JOIN resumen_mensual r
+          ON r.user_id = e.user_id AND r.mes = e.mes AND r.tipo = e.tipo AND r.categoria = e.categoria
+        WHERE r.user_id IS NULL OR r.total != e.total OR r.cantidad != e.cantidad
+        UNION ALL
+        SELECT r.user_id, r.mes, r.tipo, r.categoria, NULL, r.total, NULL, r.cantidad
+        FROM resumen_mensual r LEFT JOIN esperado e
+          ON r.user_id = e.user_id AND r.mes = e.mes AND r.tipo = e.tipo AND r.categoria = e.categoria
+        WHERE e.user_id IS NULL
+    `;
+    db.all(sql, (err, rows) => {
+        if (err) {
+            console.error('❌ Error DB:', err.message);
+            process.exit(1);
+        }
+        if (rows.length === 0) {
+            console.log('✅ resumen_mensual coincide con transacciones.');
+            return db.close();
+        }
+        console.error(`❌ ${rows.length} diferencia(s) en resumen_mensual:`);
+        rows.slice(0, 50).forEach(r => console.error(
+            `   user ${r.user_id} ${r.mes} ${r.tipo}/${r.categoria}: esperado ${r.esperado} (${r.n_esperado}) vs actual ${r.actual} (${r.n_actual})`
+        ));
+        console.error('ℹ️ Ejecute: node aggregates.js rebuild');
+        process.exit(1);
+    });
+}
+
+function rebuild() {
+    db.exec(`BEGIN IMMEDIATE;
+        DELETE FROM resumen_mensual;
+        ${RESUMEN_REBUILD_SQL}
+        COMMIT;`, (err) => {
+        if (err) {
+            console.error('❌ Error DB:', err.message);
+            return db.exec('ROLLBACK', () => process.exit(1));
+        }
+        db.get('SELECT COUNT(*) AS n FROM resumen_mensual', (err, row) => {
+            console.log(`✅ resumen_mensual reconstruido (${row.n} filas).`);
+            db.close();
+        });
+    });
+}
+
+// Base sin migrar (o a medias): que migre el servidor primero
+db.get('PRAGMA user_version', (err, row) => {
+    if (err || row.user_version < SCHEMA_VERSION) {
+        console.error(`❌ La base no está en el esquema ${SCHEMA_VERSION}: inicie el servidor una vez para aplicar las migraciones.`);
+        process.exit(1);
+    }
+    if (command === 'verify') verify();
+    else rebuild();
+});
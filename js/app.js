@@ -1,16 +1,27 @@
 /**
  * Saul-Finanzas Client (Modular Version)
  */
-import { API } from './core/api.js?v=12.2';
+import { API } from './core/api.js'; // sin ?v: mismo módulo (caché y coalescing) que las vistas
+import { ChangeStream } from './core/events.js?v=12.2';
 import { initModalHandlers } from './components/modal.js?v=12.2';
-import { loadDashboard } from './views/dashboard.js?v=12.2';
+import { loadDashboard, updateBalance } from './views/dashboard.js?v=12.2';
 import { loadTransactionsView, startAddTransaction, saveTransaction } from './views/transactions.js?v=12.2';
-import { loadSavingsView, createEnvelope, openNewEnvelopeModal, closeEnvelopeModal, processFundUpdate, closeFundsModal, setFundMode } from './views/savings.js?v=12.2';
+import { loadSavingsView, applyEnvelopeBalance, createEnvelope, openNewEnvelopeModal, closeEnvelopeModal, processFundUpdate, closeFundsModal, setFundMode } from './views/savings.js?v=12.2';
 import { loadCategoriesSettings, addCategory } from './views/settings.js?v=12.2';
 
 // --- STATE ---
 let currentViewYear = new Date().getFullYear();
 let currentViewMonth = new Date().getMonth();
+let currentView = 'dashboard';
+
+// Eventos del stream de cambios que invalidan cada vista
+const VIEW_EVENTS = {
+    dashboard: ['transaccion', 'presupuesto'],
+    transacciones: ['transaccion'],
+    ahorros: ['sobre'],
+    ajustes: ['categoria', 'presupuesto']
+};
+const RELOAD_DEBOUNCE_MS = 100;
 
 // --- HELPERS (Month State) ---
 function getMonthFilter() {
@@ -73,7 +84,7 @@ async function initApp() {
         // Let's check index.html later. For now, expose what's needed.
 
         // Funds modal static buttons (Guardar/Cancelar) need handlers
-        window.processFundUpdate = () => processFundUpdate(() => loadDashboard(getMonthFilter));
+        window.processFundUpdate = () => processFundUpdate(refreshAfterWrite(loadSavingsView, () => loadDashboard(getMonthFilter)));
         window.closeFundsModal = closeFundsModal;
         window.setFundMode = setFundMode;
 
@@ -97,12 +108,12 @@ async function initApp() {
             onAddIncome: () => startAddTransaction('ingreso'),
             onAddExpense: () => startAddTransaction('gasto'),
             onSave: () => saveTransaction([
-                () => loadDashboard(getMonthFilter),
-                () => loadTransactionsView(getMonthFilter)
+                refreshAfterWrite(() => loadDashboard(getMonthFilter), () => loadTransactionsView(getMonthFilter))
             ])
         });
 
         initNavigation();
+        initChangeStream();
 
         // Initial Load
         await loadDashboard(getMonthFilter);
@@ -135,12 +146,42 @@ function showView(viewName) {
     document.querySelector('.sidebar')?.classList.remove('active');
     document.getElementById('sidebarOverlay')?.classList.remove('active');
 
+    currentView = viewName;
+    loadView(viewName);
+}
+
+function loadView(viewName) {
     if (viewName === 'dashboard') loadDashboard(getMonthFilter);
     if (viewName === 'transacciones') loadTransactionsView(getMonthFilter);
     if (viewName === 'ahorros') loadSavingsView();
     if (viewName === 'ajustes') loadCategoriesSettings();
 }
 
+// --- CAMBIOS EN VIVO (SSE) ---
+// Con el stream abierto, los eventos (de esta pestaña o de otros dispositivos) actualizan la
+// vista activa: balance y saldos en el lugar, el resto recargando solo esa vista.
+function initChangeStream() {
+    let reloadPending = false;
+    const reloadActiveView = () => {
+        if (reloadPending) return;
+        reloadPending = true;
+        setTimeout(() => { reloadPending = false; loadView(currentView); }, RELOAD_DEBOUNCE_MS);
+    };
+    ChangeStream.subscribe((type, data) => {
+        // El cambio pudo venir de otra pestaña/dispositivo: el caché corto de API.get ya no vale
+        API.invalidate();
+        if (type === 'balance') return updateBalance(data.balance);
+        if (type === 'sobre' && data.accion === 'saldo' && currentView === 'ahorros') return applyEnvelopeBalance(data.id, data.saldo);
+        if (type === 'resync' || VIEW_EVENTS[currentView].includes(type)) reloadActiveView();
+    });
+    ChangeStream.connect();
+}
+
+/** Recarga después de guardar; si el stream está abierto el evento de la escritura ya lo hace. */
+function refreshAfterWrite(...loaders) {
+    return () => ChangeStream.live ? Promise.resolve() : Promise.all(loaders.map(load => load()));
+}
+
 function initMobileMenu() {
     const toggle = document.getElementById('mobileMenuToggle');
     const overlay = document.getElementById('sidebarOverlay');
@@ -1,12 +1,59 @@
 /**
  * Cliente HTTP centralizado para interactuar con el backend.
  * Maneja headers, serialización JSON y normalización de errores.
+ * GET condicional: guarda la última respuesta con ETag por endpoint y la reenvía en
+ * `If-None-Match`; con 304 devuelve la copia local sin volver a descargar ni parsear.
+ * GET coalescido: llamadas simultáneas al mismo endpoint comparten un único fetch, y una
+ * respuesta se reutiliza durante GET_CACHE_MS sin ir al servidor. Cualquier POST/PUT/DELETE
+ * vacía ese caché corto al responder (las lecturas en vuelo iniciadas antes no se guardan);
+ * escrituras de otras pestañas/dispositivos lo vacían con `API.invalidate()`.
+ * Importar siempre como `core/api.js` sin query string: otra URL es otro módulo, con su propio caché.
  */
+const GET_CACHE_MS = 2000;
+const validators = new Map(); // endpoint -> { etag, data }
+const inflight = new Map();   // endpoint -> Promise
+const recent = new Map();     // endpoint -> { data, at }
+let generation = 0;
+
+function invalidate() {
+    generation++;
+    inflight.clear();
+    recent.clear();
+}
+
+async function fetchGet(endpoint) {
+    const cached = validators.get(endpoint);
+    const res = await fetch(`/api/${endpoint}`, {
+        cache: 'no-store', // la revalidación la maneja este cliente, no el caché HTTP del navegador
+        headers: cached ? { 'If-None-Match': cached.etag } : {}
+    });
+    if (res.status === 304 && cached) return cached.data;
+    if (!res.ok) throw new Error(`API Error: ${res.statusText}`);
+    const data = await res.json();
+    const etag = res.headers.get('ETag');
+    if (etag) validators.set(endpoint, { etag, data });
+    else validators.delete(endpoint);
+    return data;
+}
+
 export const API = {
-    async get(endpoint) {
-        const res = await fetch(`/api/${endpoint}`);
-        if (!res.ok) throw new Error(`API Error: ${res.statusText}`);
-        return res.json();
+    /** Descarta el caché corto y los GET en vuelo (cambios que no hizo esta pestaña). */
+    invalidate,
+
+    get(endpoint) {
+        const hit = recent.get(endpoint);
+        if (hit && Date.now() - hit.at < GET_CACHE_MS) return Promise.resolve(hit.data);
+        if (inflight.has(endpoint)) return inflight.get(endpoint);
+
+        const started = generation;
+        const request = fetchGet(endpoint).then(data => {
+            if (started === generation) recent.set(endpoint, { data, at: Date.now() });
+            return data;
+        }).finally(() => {
+            if (inflight.get(endpoint) === request) inflight.delete(endpoint);
+        });
+        inflight.set(endpoint, request);
+        return request;
     },
     async post(endpoint, data) {
         const res = await fetch(`/api/${endpoint}`, {
@@ -14,6 +61,7 @@ export const API = {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify(data)
         });
+        invalidate();
         if (!res.ok) throw new Error(`API Error: ${res.statusText}`);
         return res.json();
     },
@@ -23,6 +71,7 @@ export const API = {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify(data)
         });
+        invalidate();
         if (!res.ok) {
             const error = await res.json().catch(() => ({ error: res.statusText }));
             throw new Error(error.error || res.statusText);
@@ -31,6 +80,7 @@ export const API = {
     },
     async delete(endpoint) {
         const res = await fetch(`/api/${endpoint}`, { method: 'DELETE' });
+        invalidate();
         if (!res.ok) {
             const error = await res.json().catch(() => ({ error: res.statusText }));
             throw new Error(error.error || res.statusText);
@@ -0,0 +1,37 @@
+/**
+ * Stream de cambios del usuario (GET /api/events, Server-Sent Events).
+ * El servidor empuja eventos chicos después de cada escritura (de esta pestaña o de otro
+ * dispositivo): `transaccion`, `sobre`, `presupuesto`, `categoria` y `balance`.
+ * EventSource reconecta solo y reenvía el último id; si en el medio hubo escrituras que no
+ * llegaron, el evento inicial trae `resync` y se avisa como tipo 'resync'.
+ */
+const TYPES = ['transaccion', 'sobre', 'presupuesto', 'categoria', 'balance'];
+
+let source = null;
+const listeners = new Set();
+
+function emit(type, data) {
+    listeners.forEach(listener => listener(type, data));
+}
+
+export const ChangeStream = {
+    /** true mientras el stream está abierto: las vistas se actualizan por eventos. */
+    get live() {
+        return source !== null && source.readyState === EventSource.OPEN;
+    },
+
+    connect() {
+        if (source || !window.EventSource) return;
+        source = new EventSource('/api/events');
+        source.addEventListener('hola', e => {
+            if (JSON.parse(e.data).resync) emit('resync', null);
+        });
+        TYPES.forEach(type => source.addEventListener(type, e => emit(type, JSON.parse(e.data))));
+    },
+
+    /** `listener(tipo, data)` por cada evento recibido. */
+    subscribe(listener) {
+        listeners.add(listener);
+        return () => listeners.delete(listener);
+    }
+};
@@ -0,0 +1,94 @@
+/**
+ * Copia local de las transacciones del usuario en IndexedDB.
+ * Al cargar una vista se sincroniza con GET /api/transactions/changes: solo viajan las filas
+ * nuevas o modificadas y los ids borrados desde la última vez (marcas `lastId`/`lastDeleted`).
+ * Sin IndexedDB (modo privado, navegador viejo) o ante cualquier error local, se consulta
+ * el listado del servidor como antes.
+ */
+import { API } from './api.js';
+
+const DB_VERSION = 1;
+const META_KEY = 'sync';
+
+let dbPromise = null;
+let syncing = null;
+let queued = null;
+
+function promisify(request) {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function done(tx) {
+    return new Promise((resolve, reject) => {
+        tx.oncomplete = () => resolve();
+        tx.onerror = tx.onabort = () => reject(tx.error);
+    });
+}
+
+// Una base por usuario: en un mismo navegador pueden alternarse cuentas
+async function openDB() {
+    if (!window.indexedDB) throw new Error('IndexedDB no disponible');
+    const me = await API.get('me');
+    const request = indexedDB.open(`saulfinanzas-${me.id}`, DB_VERSION);
+    request.onupgradeneeded = () => {
+        const db = request.result;
+        const store = db.createObjectStore('transacciones', { keyPath: 'id' });
+        store.createIndex('fecha', 'fecha');
+        db.createObjectStore('meta');
+    };
+    return promisify(request);
+}
+
+function getDB() {
+    if (!dbPromise) dbPromise = openDB().catch(err => { dbPromise = null; throw err; });
+    return dbPromise;
+}
+
+async function pull(db) {
+    let marks = await promisify(db.transaction('meta').objectStore('meta').get(META_KEY)) || { lastId: 0, lastDeleted: 0 };
+    let more = true;
+    while (more) {
+        const changes = await API.get(`transactions/changes?since_id=${marks.lastId}&since_deleted=${marks.lastDeleted}`);
+        // Bajas primero: un UPDATE llega como baja + fila actual
+        const tx = db.transaction(['transacciones', 'meta'], 'readwrite');
+        const rows = tx.objectStore('transacciones');
+        changes.deleted.forEach(id => rows.delete(id));
+        changes.data.forEach(row => rows.put(row));
+        marks = { lastId: changes.lastId, lastDeleted: changes.lastDeleted };
+        tx.objectStore('meta').put(marks, META_KEY);
+        await done(tx);
+        more = changes.more;
+    }
+}
+
+export const TransactionStore = {
+    /** Trae los cambios del servidor; llamadas simultáneas comparten la misma sincronización. */
+    sync() {
+        if (!syncing) {
+            syncing = getDB().then(pull).finally(() => { syncing = null; });
+            return syncing;
+        }
+        // La sincronización en curso pudo pedir el delta antes del cambio que motivó esta llamada
+        if (!queued) queued = syncing.catch(() => { }).then(() => { queued = null; return this.sync(); });
+        return queued;
+    },
+
+    /** Transacciones del mes ('YYYY-MM') y tipo, ordenadas como el listado (fecha DESC, id DESC). */
+    async list({ month, tipo }) {
+        try {
+            await this.sync();
+            const db = await getDB();
+            const range = IDBKeyRange.bound(`${month}-01`, `${month}-31`);
+            const rows = await promisify(db.transaction('transacciones').objectStore('transacciones').index('fecha').getAll(range));
+            return rows
+                .filter(row => !tipo || row.tipo === tipo)
+                .sort((a, b) => b.fecha.localeCompare(a.fecha) || b.id - a.id);
+        } catch (err) {
+            console.warn('[Store] Sin copia local, se usa el servidor:', err.message);
+            return API.get(`transactions?month=${month}&tipo=${tipo}`);
+        }
+    }
+};
@@ -5,58 +5,44 @@ let chart;
 
 export async function loadDashboard(getMonthFilter) {
     try {
-        await Promise.all([
-            updateStats(getMonthFilter),
-            updateCharts(getMonthFilter),
-            updateBudgetDisplay(getMonthFilter)
-        ]);
+        // Un solo request: el servidor agrega todo en SQL (ver GET /api/dashboard)
+        const data = await API.get(`dashboard?month=${getMonthFilter()}`);
+        updateStats(data);
+        updateCharts(data);
+        updateBudgetDisplay(data);
     } catch (err) {
         console.error('Error loading dashboard:', err);
     }
 }
 
-async function updateStats(getMonthFilter) {
-    console.log('[DEBUG] updateStats triggered');
-    const [globalStats, txs] = await Promise.all([
-        API.get('stats'),
-        API.get('transactions')
-    ]);
-    console.log('[DEBUG] API Data:', { globalStats, txsSize: txs.length });
-
-    const monthFilter = getMonthFilter();
-    const filtered = txs.filter(t => t.fecha && t.fecha.startsWith(monthFilter));
-
-    let monthlyIncome = 0, monthlyExpense = 0;
-    filtered.forEach(t => {
-        if (t.tipo === 'ingreso') monthlyIncome += t.monto;
-        if (t.tipo === 'gasto') monthlyExpense += t.monto;
-    });
+/** Balance global recibido por el stream de cambios (evento `balance`), sin volver a pedir el dashboard. */
+export function updateBalance(balance) {
+    const totalBalance = document.getElementById('totalBalance');
+    if (totalBalance) totalBalance.textContent = formatCurrency(balance);
+}
 
+function updateStats(data) {
     const totalIncome = document.getElementById('totalIncome');
     const totalExpenses = document.getElementById('totalExpenses');
     const totalBalance = document.getElementById('totalBalance');
 
-    console.log('[DEBUG] Rendering:', { monthlyIncome, monthlyExpense, globalBalance: globalStats.balance });
-
     // Mensuales
-    if (totalIncome) totalIncome.textContent = formatCurrency(monthlyIncome);
-    if (totalExpenses) totalExpenses.textContent = formatCurrency(monthlyExpense);
+    if (totalIncome) totalIncome.textContent = formatCurrency(data.income);
+    if (totalExpenses) totalExpenses.textContent = formatCurrency(data.expense);
 
     // Global (Arrastre histórico)
     if (totalBalance) {
-        totalBalance.textContent = formatCurrency(globalStats.balance);
+        totalBalance.textContent = formatCurrency(data.balance);
     }
 }
 
-async function updateCharts(getMonthFilter) {
+function updateCharts(data) {
     const canvas = document.getElementById('expensesChart');
     if (!canvas) return;
     try {
-        const txs = await API.get('transactions');
-        const monthFilter = getMonthFilter();
-        const expenses = txs.filter(t => t.tipo === 'gasto' && t.fecha && t.fecha.startsWith(monthFilter));
         const catTotals = {};
-        expenses.forEach(t => { catTotals[t.categoria] = (catTotals[t.categoria] || 0) + t.monto; });
+        data.categories.forEach(c => { if (c.spent > 0) catTotals[c.categoria] = c.spent; });
+        if (data.savings > 0) catTotals['Ahorro'] = data.savings;
 
         const ctx = canvas.getContext('2d');
         if (chart) chart.destroy();
@@ -84,30 +70,10 @@ async function updateCharts(getMonthFilter) {
     } catch (err) { console.error(err); }
 }
 
-async function updateBudgetDisplay(getMonthFilter) {
+function updateBudgetDisplay(data) {
     try {
-        const [budgets, txs] = await Promise.all([
-            API.get('category-budgets'),
-            API.get('transactions')
-        ]);
-
-        const monthFilter = getMonthFilter();
-        const currentMonthExpenses = txs.filter(t =>
-            t.tipo === 'gasto' &&
-            t.fecha &&
-            t.fecha.startsWith(monthFilter) &&
-            t.categoria !== 'Ahorro'
-        );
-
-        const expenseMap = {};
-        let totalExpense = 0;
-        currentMonthExpenses.forEach(t => {
-            expenseMap[t.categoria] = (expenseMap[t.categoria] || 0) + t.monto;
-            totalExpense += t.monto;
-        });
-
-        let totalBudget = 0;
-        budgets.forEach(b => totalBudget += b.limite);
+        const totalExpense = data.budget.spent;
+        const totalBudget = data.budget.limit;
 
         const budgetProgress = document.getElementById('budgetProgress');
         const budgetText = document.getElementById('budgetText');
@@ -136,19 +102,15 @@ async function updateBudgetDisplay(getMonthFilter) {
         const container = document.getElementById('categoryBudgetsContainer');
         if (container) {
             container.innerHTML = '';
-            const allCategories = new Set([...budgets.map(b => b.categoria), ...Object.keys(expenseMap)]);
-
-            allCategories.forEach(cat => {
-                const b = budgets.find(b => b.categoria === cat) || { limite: 0 };
-                const spent = expenseMap[cat] || 0;
 
-                if (b.limite > 0 || spent > 0) {
+            data.categories.forEach(({ categoria: cat, spent, limite }) => {
+                if (limite > 0 || spent > 0) {
                     let pct = 0;
-                    if (b.limite > 0) pct = (spent / b.limite) * 100;
+                    if (limite > 0) pct = (spent / limite) * 100;
                     else if (spent > 0) pct = 100;
 
                     let color;
-                    if (b.limite === 0 && spent > 0) color = 'var(--danger)';
+                    if (limite === 0 && spent > 0) color = 'var(--danger)';
                     else if (pct > 100) color = 'var(--danger)';
                     else if (pct >= 100) color = 'var(--warning)';
                     else color = '#22c55e';
@@ -158,7 +120,7 @@ async function updateBudgetDisplay(getMonthFilter) {
                     item.innerHTML = `
                         <div class="cat-budget-info">
                             <span>${cat}</span>
-                            <span>${formatCurrency(spent)} / ${formatCurrency(b.limite)}</span>
+                            <span>${formatCurrency(spent)} / ${formatCurrency(limite)}</span>
                         </div>
                         <div class="cat-budget-bar">
                             <div class="progress" style="width: ${Math.min(pct, 100)}%; background: ${color}"></div>
@@ -168,7 +130,7 @@ async function updateBudgetDisplay(getMonthFilter) {
                 }
             });
 
-            if (budgets.length === 0) {
+            if (data.budget.count === 0) {
                 container.innerHTML = '<p class="text-muted text-center" style="font-size:0.9rem;">No tienes presupuestos configurados.</p>';
             }
         }
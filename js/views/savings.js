@@ -24,6 +24,8 @@ export async function loadSavingsView() {
         envelopes.forEach(env => {
             const card = document.createElement('div');
             card.className = 'envelope-card';
+            card.dataset.id = env.id;
+            card.dataset.saldo = env.saldo || 0;
             card.innerHTML = `
                 <div class="envelope-header">
                     <span class="envelope-icon">${env.icono || '💰'}</span>
@@ -54,6 +56,18 @@ export async function loadSavingsView() {
     }
 }
 
+/** Saldo nuevo de un sobre (evento `sobre` del stream de cambios): actualiza la tarjeta sin recargar la lista. */
+export function applyEnvelopeBalance(id, saldo) {
+    const card = document.querySelector(`#envelopesGrid .envelope-card[data-id="${id}"]`);
+    if (!card) return loadSavingsView();
+    card.dataset.saldo = saldo;
+    card.querySelector('.envelope-balance').textContent = formatCurrency(saldo);
+    card.querySelector('.withdraw').disabled = saldo <= 0;
+    const total = [...document.querySelectorAll('#envelopesGrid .envelope-card')].reduce((sum, c) => sum + Number(c.dataset.saldo), 0);
+    const totalEl = document.getElementById('savingsTotal');
+    if (totalEl) totalEl.textContent = formatCurrency(total);
+}
+
 async function deleteEnvelope(id) {
     showConfirm('Eliminar Sobre', '¿Deseas eliminar este sobre?', async () => {
         try {
@@ -122,14 +136,14 @@ export function closeFundsModal() {
     document.getElementById('fundsModal').style.display = 'none';
 }
 
-export async function processFundUpdate(refreshDashboardCallback) {
+export async function processFundUpdate(refreshCallback) {
     const monto = parseFloat(document.getElementById('fundsAmount')?.value || 0);
     if (monto <= 0) return showToast('Monto inválido', 'warning');
     try {
         await API.put(`savings/${currentFundEnvelopeId}/${currentFundMode}`, { monto });
         closeFundsModal();
-        await loadSavingsView();
-        if (refreshDashboardCallback) await refreshDashboardCallback();
+        // Sin callback recarga la vista; app.js la omite cuando el stream de cambios ya la actualiza
+        await (refreshCallback ? refreshCallback() : loadSavingsView());
         showToast('Fondos actualizados', 'success');
         showSaveStatus();
     } catch (err) {
@@ -1,4 +1,5 @@
 import { API } from '../core/api.js';
+import { TransactionStore } from '../core/store.js';
 import { showToast, showSaveStatus } from '../utils/ui.js';
 import { formatCurrency } from '../utils/formatters.js';
 import { showConfirm, closeModal } from '../components/modal.js';
@@ -17,11 +18,8 @@ async function renderTable(tableId, type, getMonthFilter) {
     tbody.innerHTML = '<tr><td colspan="5">Cargando...</td></tr>';
 
     try {
-        const txs = await API.get('transactions');
-        const monthFilter = getMonthFilter();
-        const filtered = txs
-            .filter(t => t.tipo === type && t.fecha && t.fecha.startsWith(monthFilter))
-            .sort((a, b) => new Date(b.fecha) - new Date(a.fecha));
+        // Copia local sincronizada por deltas; ya filtra por mes y tipo y ordena por fecha DESC
+        const filtered = await TransactionStore.list({ month: getMonthFilter(), tipo: type });
 
         tbody.innerHTML = '';
         if (filtered.length === 0) {
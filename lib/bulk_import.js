@@ -0,0 +1,269 @@
+/**
+ * Importación Masiva de Transacciones
+ * - Lee el cuerpo del request como stream (NDJSON o CSV con encabezado), sin cargarlo entero.
+ * - Valida cada fila; las inválidas se reportan con su número de línea y no detienen la carga.
+ * - Inserta con un único prepared statement en lotes de `chunkSize` filas, cada lote un
+ *   trabajo de `WriteQueue` (una transacción). Mientras un lote está en vuelo el request se
+ *   pausa (backpressure), así la memoria queda acotada a un lote.
+ * - Los lotes ya confirmados quedan aunque uno posterior falle: la respuesta dice cuántas
+ *   filas se insertaron.
+ */
+
+const { DATE_RE, toDay, toCents } = require('./storage_units');
+
+const DEFAULT_CHUNK_SIZE = 1000;
+const MAX_REPORTED_ERRORS = 1000;
+const MAX_LINE_LENGTH = 64 * 1024;
+const COLUMNS = ['fecha', 'tipo', 'categoria', 'monto', 'descripcion'];
+const INSERT_SQL = "INSERT INTO transacciones (user_id, fecha, tipo, categoria, monto, descripcion) VALUES (?,?,?,?,?,?)";
+
+class BulkImportError extends Error {
+    constructor(message, status = 400) {
+        super(message);
+        this.status = status;
+    }
+}
+
+/** Formato según `?format=` o Content-Type; null si no es soportado. */
+function detectFormat(contentType, format) {
+    const type = (format || contentType || '').split(';')[0].trim().toLowerCase();
+    if (['ndjson', 'application/x-ndjson', 'application/ndjson', 'application/jsonl'].includes(type)) return 'ndjson';
+    if (['csv', 'text/csv', 'application/csv'].includes(type)) return 'csv';
+    return null;
+}
+
+/**
+ * Valida y normaliza una fila al formato almacenado (fecha yyyymmdd, monto en céntimos).
+ * @returns {Object} { values: [fecha, tipo, categoria, monto, descripcion] } o { error }
+ */
+function validateTransaction(row) {
+    const { fecha, tipo, categoria, descripcion } = row;
+    if (typeof fecha !== 'string' || !DATE_RE.test(fecha)) return { error: 'fecha debe ser YYYY-MM-DD' };
+    const day = toDay(fecha);
+    if (day === null) return { error: `fecha inexistente: ${fecha}` };
+    if (tipo !== 'ingreso' && tipo !== 'gasto') return { error: 'tipo debe ser ingreso o gasto' };
+    if (typeof categoria !== 'string' || !categoria.trim()) return { error: 'categoria es obligatoria' };
+    const monto = toCents(row.monto);
+    if (monto === null || monto <= 0) return { error: 'monto debe ser un número mayor a 0 con hasta 2 decimales' };
+    if (descripcion !== undefined && descripcion !== null && typeof descripcion !== 'string') return { error: 'descripcion debe ser texto' };
+    return { values: [day, tipo, categoria.trim(), monto, descripcion || ''] };
+}
+
+/** Una fila JSON por línea; las líneas vacías se ignoran. */
+class NdjsonParser {
+    constructor() {
+        this.buffer = '';
+        this.line = 0;
+    }
+
+    push(text) {
+        const parts = (this.buffer + text).split('\n');
+        this.buffer = parts.pop();
+        if (this.buffer.length > MAX_LINE_LENGTH) throw new BulkImportError(`Línea ${this.line + 1} demasiado larga`, 413);
+        return parts.map(l => this._parse(l)).filter(Boolean);
+    }
+
+    end() {
+        const last = this._parse(this.buffer);
+        this.buffer = '';
+        return last ? [last] : [];
+    }
+
+    _parse(text) {
+        this.line++;
+        if (!text.trim()) return null;
+        try {
+            const row = JSON.parse(text);
+            if (row && typeof row === 'object' && !Array.isArray(row)) return { line: this.line, row };
+        } catch { }
+        return { line: this.line, error: 'JSON inválido' };
+    }
+}
+
+/**
+ * CSV RFC 4180 (comillas dobles, "" escapado, saltos de línea dentro de comillas).
+ * La primera fila es el encabezado; se usan las columnas conocidas en cualquier orden.
+ */
+class CsvParser {
+    constructor() {
+        this.header = null;
+        this.record = [];
+        this.field = '';
+        this.inQuotes = false;
+        this.justClosed = false;  // la última comilla cerró un campo (o es la primera de un "")
+        this.line = 1;            // línea física actual
+        this.recordLine = 1;      // línea donde empezó el registro en curso
+    }
+
+    push(text) {
+        const out = [];
+        for (let i = 0; i < text.length; i++) {
+            const c = text[i];
+            if (this.inQuotes) {
+                if (c === '"') {
+                    this.inQuotes = false;
+                    this.justClosed = true;
+                } else {
+                    if (c === '\n') this.line++;
+                    this.field += c;
+                }
+                continue;
+            }
+            if (c === '"') {
+                if (this.justClosed) this.field += '"';
+                this.inQuotes = this.justClosed || this.field === '';
+                if (!this.inQuotes) this.field += c;
+                this.justClosed = false;
+                continue;
+            }
+            this.justClosed = false;
+            if (c === ',') {
+                this.record.push(this.field);
+                this.field = '';
+            } else if (c === '\n') {
+                this._endRecord(out);
+                this.line++;
+                this.recordLine = this.line;
+            } else if (c !== '\r') {
+                this.field += c;
+            }
+        }
+        if (this.field.length > MAX_LINE_LENGTH) throw new BulkImportError(`Registro en línea ${this.recordLine} demasiado largo`, 413);
+        return out;
+    }
+
+    end() {
+        const out = [];
+        if (this.inQuotes) {
+            out.push({ line: this.recordLine, error: 'Comillas sin cerrar' });
+        } else {
+            this._endRecord(out);
+        }
+        if (!this.header) throw new BulkImportError('CSV sin encabezado');
+        return out;
+    }
+
+    _endRecord(out) {
+        this.record.push(this.field);
+        const record = this.record;
+        this.record = [];
+        this.field = '';
+        if (record.length === 1 && !record[0].trim()) return; // línea vacía
+
+        if (!this.header) {
+            this.header = record.map(h => h.trim().toLowerCase());
+            const missing = COLUMNS.filter(c => c !== 'descripcion' && !this.header.includes(c));
+            if (missing.length) throw new BulkImportError(`Faltan columnas en el encabezado: ${missing.join(', ')}`);
+            return;
+        }
+        const row = {};
+        this.header.forEach((name, i) => { if (COLUMNS.includes(name)) row[name] = record[i]; });
+        out.push({ line: this.recordLine, row });
+    }
+}
+
+/**
+ * Importa el cuerpo de `req` como transacciones de `userId`.
+ * @param {Function} callback (err, { inserted, failed, errors: [{ line, error }], errorsTruncated })
+ *        `err` solo para fallas de todo el request (formato, stream cortado, DB); aun así los lotes
+ *        ya confirmados quedan y el segundo argumento trae `{ inserted }` con su cantidad.
+ */
+function importTransactions(req, { queue, userId, format, chunkSize = DEFAULT_CHUNK_SIZE }, callback) {
+    const parser = format === 'csv' ? new CsvParser() : new NdjsonParser();
+    const stmt = queue.db.prepare(INSERT_SQL);
+    const result = { inserted: 0, failed: 0, errors: [], errorsTruncated: false };
+    let chunk = [];
+    let inFlight = false;
+    let ended = false;
+    let finished = false;
+    let failure = null;
+
+    const fail = (line, error) => {
+        result.failed++;
+        if (result.errors.length < MAX_REPORTED_ERRORS) result.errors.push({ line, error });
+        else result.errorsTruncated = true;
+    };
+
+    const finish = (err) => {
+        if (finished) return;
+        finished = true;
+        failure = err || null;
+        if (err) req.resume(); // descartar el resto del cuerpo
+        if (!inFlight) complete(); // si no, al cerrar el lote en vuelo (cuenta en `inserted`)
+    };
+
+    const complete = () => {
+        stmt.finalize(() => callback(failure, failure ? { inserted: result.inserted } : result));
+    };
+
+    const accept = (records) => {
+        records.forEach(({ line, row, error }) => {
+            if (error) return fail(line, error);
+            const valid = validateTransaction(row);
+            if (valid.error) return fail(line, valid.error);
+            chunk.push({ line, values: valid.values });
+        });
+    };
+
+    const insertChunk = (rows) => {
+        inFlight = true;
+        req.pause();
+        queue.transaction((tx, done) => {
+            const rowErrors = [];
+            let pending = rows.length;
+            // El Statement encola sus ejecuciones en orden; el lote termina con el último callback
+            rows.forEach(r => stmt.run([userId, ...r.values], (err) => {
+                if (err) rowErrors.push({ line: r.line, error: err.message });
+                if (--pending === 0) done(null, rowErrors);
+            }));
+        }, (err, rowErrors) => {
+            inFlight = false;
+            if (err) {
+                if (!finished) return finish(err);
+            } else {
+                result.inserted += rows.length - rowErrors.length;
+                rowErrors.forEach(e => fail(e.line, e.error));
+            }
+            if (finished) return complete();
+            pump();
+        });
+    };
+
+    const pump = () => {
+        if (inFlight || finished) return;
+        if (chunk.length >= chunkSize || (ended && chunk.length)) {
+            const rows = chunk.slice(0, chunkSize);
+            chunk = chunk.slice(rows.length);
+            return insertChunk(rows);
+        }
+        if (ended) return finish();
+        req.resume();
+    };
+
+    const guard = (fn) => (...args) => {
+        if (finished) return;
+        try {
+            fn(...args);
+        } catch (e) {
+            finish(e);
+        }
+    };
+
+    let first = true;
+    req.setEncoding('utf8');
+    req.on('data', guard((text) => {
+        if (first) text = text.replace(/^\uFEFF/, ''); // BOM de exportaciones de Excel
+        first = false;
+        accept(parser.push(text));
+        if (chunk.length >= chunkSize) pump();
+    }));
+    req.on('end', guard(() => {
+        ended = true;
+        accept(parser.end());
+        pump();
+    }));
+    req.on('aborted', () => finish(new BulkImportError('Carga interrumpida por el cliente')));
+    req.on('error', finish);
+}
+
+module.exports = { importTransactions, validateTransaction, detectFormat, BulkImportError, CsvParser, NdjsonParser };
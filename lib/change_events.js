@@ -0,0 +1,112 @@
+/**
+ * Eventos de Cambios por Usuario (Server-Sent Events, GET /api/events)
+ * - Cada escritura confirmada publica, junto con la nueva versión de datos (`DataVersions.bump`),
+ *   eventos chicos: transacción creada/borrada, saldo de un sobre, presupuestos, nuevo balance.
+ *   Viajan en el mismo mensaje 'version' del bus: en cluster llegan a todos los workers antes de
+ *   responder la escritura y cada worker los escribe en los streams abiertos de ese usuario.
+ * - El `id` de cada evento es `<arranque>.<versión>` (como el ETag). Al reconectar, EventSource
+ *   manda `Last-Event-ID`: si no coincide con la versión actual, el evento inicial `hola` lleva
+ *   `resync: true` (no se guardan eventos pasados; el cliente recarga la vista).
+ * - Un comentario cada HEARTBEAT_MS mantiene viva la conexión a través de proxies. Un cliente que
+ *   no lee (más de MAX_BUFFERED bytes pendientes) se desconecta; al cerrar sesión se cierran
+ *   sus streams.
+ */
+
+const HEARTBEAT_MS = 25000;
+const RETRY_MS = 3000;
+const MAX_STREAMS_PER_USER = 10;
+const MAX_BUFFERED = 1024 * 1024;
+
+class ChangeEvents {
+    /** @param {DataVersions} dataVersions Fuente de versiones y eventos (tema 'version' del bus). */
+    constructor(dataVersions) {
+        this.dataVersions = dataVersions;
+        this.streams = new Map(); // userId -> Set<{ res, token }>
+        this.size = 0;
+        this.timer = null;
+        dataVersions.onBump(({ userId, version, events }) => this.deliver(userId, version, events || []));
+    }
+
+    eventId(userId, version = this.dataVersions.get(userId)) {
+        return `${this.dataVersions.boot}.${version}`;
+    }
+
+    /**
+     * Abre el stream de `userId` sobre `res`.
+     * @returns {boolean} false si el usuario ya tiene MAX_STREAMS_PER_USER abiertos (no se escribió nada)
+     */
+    subscribe(req, res, { userId, token }) {
+        const own = this.streams.get(userId) || new Set();
+        if (own.size >= MAX_STREAMS_PER_USER) return false;
+        this.streams.set(userId, own);
+
+        const stream = { res, token };
+        own.add(stream);
+        this.size++;
+        req.socket.setNoDelay(true);
+        req.socket.setTimeout(0);
+        res.writeHead(200, {
+            'Content-Type': 'text/event-stream; charset=utf-8',
+            'Cache-Control': 'no-store',
+            'Connection': 'keep-alive',
+            'X-Accel-Buffering': 'no' // nginx: no acumular el stream
+        });
+        const lastSeen = req.headers['last-event-id'];
+        const current = this.eventId(userId);
+        res.write(`retry: ${RETRY_MS}\n` +
+            format(current, 'hola', { version: this.dataVersions.get(userId), resync: Boolean(lastSeen) && lastSeen !== current }));
+
+        res.on('close', () => {
+            if (!own.delete(stream)) return;
+            this.size--;
+            if (own.size === 0) this.streams.delete(userId);
+            if (this.size === 0) this._stopHeartbeat();
+        });
+        this._startHeartbeat();
+        return true;
+    }
+
+    /** true si este proceso tiene algún stream abierto de `userId`. */
+    has(userId) {
+        return this.streams.has(userId);
+    }
+
+    deliver(userId, version, events) {
+        const own = this.streams.get(userId);
+        if (!own || events.length === 0) return;
+        const id = this.eventId(userId, version);
+        const chunk = events.map(e => format(id, e.type, e.data)).join('');
+        own.forEach(stream => this._write(stream, chunk));
+    }
+
+    /** Cierra los streams abiertos con la sesión `token` (logout). */
+    closeSession(token) {
+        this.streams.forEach(own => own.forEach(stream => {
+            if (stream.token === token) stream.res.end();
+        }));
+    }
+
+    _write(stream, chunk) {
+        if (stream.res.writableLength > MAX_BUFFERED) return stream.res.destroy();
+        stream.res.write(chunk);
+    }
+
+    _startHeartbeat() {
+        if (this.timer) return;
+        this.timer = setInterval(() => {
+            this.streams.forEach(own => own.forEach(stream => this._write(stream, ': ping\n\n')));
+        }, HEARTBEAT_MS);
+        this.timer.unref();
+    }
+
+    _stopHeartbeat() {
+        clearInterval(this.timer);
+        this.timer = null;
+    }
+}
+
+function format(id, type, data) {
+    return `id: ${id}\nevent: ${type}\ndata: ${JSON.stringify(data)}\n\n`;
+}
+
+module.exports = { ChangeEvents, MAX_STREAMS_PER_USER };
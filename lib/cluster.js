@@ -0,0 +1,172 @@
+/**
+ * Modo Cluster (WORKERS > 1)
+ * - El proceso primario no abre la base ni atiende HTTP: forkea los workers (primero uno solo,
+ *   que aplica las migraciones; el resto cuando ese ya escucha), los reinicia si mueren y
+ *   reenvía SIGTERM/SIGINT. Los workers comparten el puerto (reparto round-robin de `cluster`).
+ * - Cada worker tiene su propio escritor + WriteQueue; SQLite (WAL + BEGIN IMMEDIATE + busy_timeout)
+ *   serializa las escrituras entre procesos.
+ * - `ClusterBus`: mensajes entre workers vía el primario. `publish(topic, payload, done)` aplica el
+ *   mensaje en TODOS los workers y llama a `done(payload, replies)` cuando todos confirmaron: una
+ *   respuesta de escritura o de login sale recién cuando cualquier worker ya ve el cambio.
+ *   Temas usados por server.js: 'version' (versión de datos por usuario, la asigna el primario),
+ *   'session' (alta/baja en los LRU de sesiones) y 'metrics' (cada worker responde su exposición).
+ * - Sin cluster (un solo proceso) el bus aplica los handlers localmente con la misma semántica.
+ */
+const cluster = require('cluster');
+const crypto = require('crypto');
+
+const RESPAWN_DELAY_MS = 1000;
+
+/**
+ * Proceso primario: supervisa `count` workers que ejecutan el mismo script.
+ */
+function runPrimary(count) {
+    const boot = crypto.randomBytes(4).toString('hex');
+    const versions = new Map();  // userId -> versión de datos (fuente de verdad del cluster)
+    const ready = new Set();     // workers que ya recibieron el snapshot
+    const pending = new Map();   // id global -> { origin, originId, remaining: Set, replies }
+    let seq = 0;
+    let shuttingDown = false;
+
+    const finish = (id, entry) => {
+        pending.delete(id);
+        const origin = cluster.workers[entry.origin];
+        if (origin && origin.isConnected()) {
+            origin.send({ bus: 'done', id: entry.originId, payload: entry.payload, replies: entry.replies });
+        }
+    };
+
+    const onMessage = (worker, msg) => {
+        if (!msg || !msg.bus) return;
+        if (msg.bus === 'hello') {
+            worker.send({ bus: 'snapshot', boot, versions: [...versions] });
+            ready.add(worker.id);
+        } else if (msg.bus === 'publish') {
+            const payload = msg.payload;
+            if (msg.topic === 'version') {
+                payload.version = (versions.get(payload.userId) || 0) + 1;
+                versions.set(payload.userId, payload.version);
+            }
+            const id = ++seq;
+            const entry = { origin: worker.id, originId: msg.id, payload, remaining: new Set(ready), replies: [] };
+            pending.set(id, entry);
+            entry.remaining.forEach(wid => cluster.workers[wid].send({ bus: 'apply', id, topic: msg.topic, payload }));
+            if (entry.remaining.size === 0) finish(id, entry);
+        } else if (msg.bus === 'ack') {
+            const entry = pending.get(msg.id);
+            if (!entry) return;
+            entry.remaining.delete(worker.id);
+            entry.replies.push({ worker: worker.id, reply: msg.reply });
+            if (entry.remaining.size === 0) finish(msg.id, entry);
+        }
+    };
+
+    const fork = () => {
+        const worker = cluster.fork();
+        worker.on('message', msg => onMessage(worker, msg));
+        return worker;
+    };
+
+    cluster.on('exit', (worker, code, signal) => {
+        ready.delete(worker.id);
+        // Lo que esperaba confirmación de este worker ya no la necesita
+        pending.forEach((entry, id) => {
+            if (entry.remaining.delete(worker.id) && entry.remaining.size === 0) finish(id, entry);
+        });
+        if (shuttingDown) {
+            if (Object.keys(cluster.workers).length === 0) process.exit(0);
+            return;
+        }
+        console.error(`[Cluster] Worker ${worker.process.pid} terminó (${signal || code}); reiniciando`);
+        setTimeout(fork, RESPAWN_DELAY_MS);
+    });
+
+    console.log(`[Cluster] Primario ${process.pid}: ${count} workers`);
+    // El primero aplica migraciones y crea el admin; los demás arrancan con el esquema listo
+    let started = false;
+    cluster.on('listening', () => {
+        if (started) return;
+        started = true;
+        for (let i = 1; i < count; i++) fork();
+    });
+    fork();
+
+    ['SIGTERM', 'SIGINT'].forEach(signal => process.on(signal, () => {
+        if (shuttingDown) return;
+        shuttingDown = true;
+        const workers = Object.values(cluster.workers);
+        if (workers.length === 0) process.exit(0);
+        workers.forEach(w => w.process.kill('SIGTERM'));
+    }));
+}
+
+/**
+ * Bus de mensajes del lado del worker (o local, sin cluster).
+ */
+class ClusterBus {
+    constructor() {
+        this.enabled = cluster.isWorker;
+        this.handlers = new Map();  // topic -> handler(payload) => reply
+        this.waiting = new Map();   // id local -> done
+        this.versions = new Map();  // solo sin cluster: asignación local de 'version'
+        this.boot = crypto.randomBytes(4).toString('hex');
+        this.snapshot = null;
+        this.onReady = [];
+        this.seq = 0;
+        if (this.enabled) {
+            process.on('message', msg => this._onMessage(msg));
+            process.send({ bus: 'hello' });
+        } else {
+            this.snapshot = { boot: this.boot, versions: [] };
+        }
+    }
+
+    get workerId() {
+        return this.enabled ? cluster.worker.id : 0;
+    }
+
+    on(topic, handler) {
+        this.handlers.set(topic, handler);
+    }
+
+    /** `callback({ boot, versions })` cuando el primario envió el estado inicial (inmediato sin cluster). */
+    ready(callback) {
+        if (this.snapshot) return setImmediate(() => callback(this.snapshot));
+        this.onReady.push(callback);
+    }
+
+    _apply(topic, payload) {
+        const handler = this.handlers.get(topic);
+        return handler ? handler(payload) : undefined;
+    }
+
+    publish(topic, payload, done) {
+        if (!this.enabled) {
+            if (topic === 'version') {
+                payload.version = (this.versions.get(payload.userId) || 0) + 1;
+                this.versions.set(payload.userId, payload.version);
+            }
+            const reply = this._apply(topic, payload);
+            return setImmediate(() => done(payload, [{ worker: 0, reply }]));
+        }
+        const id = ++this.seq;
+        this.waiting.set(id, done);
+        process.send({ bus: 'publish', id, topic, payload });
+    }
+
+    _onMessage(msg) {
+        if (!msg || !msg.bus) return;
+        if (msg.bus === 'snapshot') {
+            this.snapshot = { boot: msg.boot, versions: msg.versions };
+            this.onReady.splice(0).forEach(cb => cb(this.snapshot));
+        } else if (msg.bus === 'apply') {
+            process.send({ bus: 'ack', id: msg.id, reply: this._apply(msg.topic, msg.payload) });
+        } else if (msg.bus === 'done') {
+            const done = this.waiting.get(msg.id);
+            this.waiting.delete(msg.id);
+            if (done) done(msg.payload, msg.replies);
+        }
+    }
+}
+
+module.exports = { runPrimary, ClusterBus };
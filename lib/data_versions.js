@@ -0,0 +1,67 @@
+/**
+ * Versión de Datos por Usuario (ETag / GET condicional)
+ * - Contador en memoria por usuario que sube en cada escritura confirmada (transacciones, categorías,
+ *   presupuestos, sobres, depósitos/retiros, carga masiva).
+ * - El ETag de los listados es `W/"<arranque>.<usuario>.<versión>"`: si el cliente manda el mismo en
+ *   `If-None-Match` se responde 304 sin consultar SQLite.
+ * - El id de arranque invalida todos los ETags al reiniciar (los contadores no se persisten).
+ * - La versión se lee ANTES de consultar y se sube DESPUÉS del commit: una lectura concurrente con una
+ *   escritura queda etiquetada con la versión vieja y se vuelve a pedir, nunca al revés.
+ * - En cluster la versión la asigna el primario y llega a todos los workers por `ClusterBus`
+ *   antes de responder la escritura, así el ETag vale igual en cualquier worker.
+ * - El mismo mensaje lleva los eventos de la escritura para los streams SSE (lib/change_events.js).
+ */
+
+class DataVersions {
+    /** @param {ClusterBus} bus Tema 'version'; el estado inicial llega con `bus.ready`. */
+    constructor(bus) {
+        this.bus = bus;
+        this.boot = bus.boot;
+        this.versions = new Map(); // userId -> versión
+        this.listeners = [];
+        bus.on('version', (payload) => {
+            if (payload.version > this.get(payload.userId)) this.versions.set(payload.userId, payload.version);
+            this.listeners.forEach(listener => listener(payload));
+        });
+    }
+
+    /** Estado inicial enviado por el primario (id de arranque compartido y versiones vigentes). */
+    restore({ boot, versions }) {
+        this.boot = boot;
+        versions.forEach(([userId, version]) => {
+            if (version > this.get(userId)) this.versions.set(userId, version);
+        });
+    }
+
+    get(userId) {
+        return this.versions.get(userId) || 0;
+    }
+
+    /**
+     * Llamar después de confirmar una escritura del usuario; `done` cuando todos los procesos la ven.
+     * @param {Array} events [{ type, data }] para los streams del usuario ([] si no hay nada que avisar)
+     */
+    bump(userId, events, done) {
+        this.bus.publish('version', { userId, events }, () => done());
+    }
+
+    /** `listener({ userId, version, events })` en cada proceso, por cada escritura de cualquier worker. */
+    onBump(listener) {
+        this.listeners.push(listener);
+    }
+
+    etag(userId) {
+        return `W/"${this.boot}.${userId}.${this.get(userId)}"`;
+    }
+
+    /** true si algún validador de `If-None-Match` coincide con `etag` (comparación débil). */
+    matches(req, etag) {
+        const header = req.headers['if-none-match'];
+        if (!header) return false;
+        if (header.trim() === '*') return true;
+        const opaque = etag.replace(/^W\//, '');
+        return header.split(',').some(tag => tag.trim().replace(/^W\//, '') === opaque);
+    }
+}
+
+module.exports = { DataVersions };
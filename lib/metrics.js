@@ -0,0 +1,245 @@
+/**
+ * Métricas del Servidor (formato de texto Prometheus)
+ * - HTTP: histograma de latencia por (método, ruta), requests por status, requests en vuelo,
+ *   bytes del cuerpo recibido y bytes escritos al socket.
+ * - SQLite: histograma de duración por sentencia (texto SQL normalizado) y errores; se mide
+ *   desde la llamada hasta el callback, incluyendo la espera en la cola del driver.
+ * - Slow query log opcional: `SLOW_QUERY_MS=50` imprime las sentencias que tardan más (sin parámetros).
+ * Las rutas se normalizan (`/api/transactions/:id`) y las series tienen tope para no crecer sin límite.
+ * En cluster cada worker mide lo suyo; `mergeExpositions` une las exposiciones con un label `worker`.
+ */
+const { monitorEventLoopDelay } = require('perf_hooks');
+
+const BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5];
+const MAX_ROUTES = 200;
+const MAX_STATEMENTS = 500;
+
+class Histogram {
+    constructor() {
+        this.counts = new Array(BUCKETS.length).fill(0); // no acumulado; se acumula al exportar
+        this.sum = 0;
+        this.count = 0;
+    }
+
+    observe(seconds) {
+        let i = 0;
+        while (i < BUCKETS.length && seconds > BUCKETS[i]) i++;
+        if (i < BUCKETS.length) this.counts[i]++;
+        this.sum += seconds;
+        this.count++;
+    }
+}
+
+function escapeLabel(value) {
+    return String(value).replace(/\\/g, '\\\\').replace(/"/g, '\\"').replace(/\n/g, '\\n');
+}
+
+function labels(obj) {
+    return '{' + Object.entries(obj).map(([k, v]) => `${k}="${escapeLabel(v)}"`).join(',') + '}';
+}
+
+/** Ruta de baja cardinalidad: ids numéricos -> :id, estáticos agrupados. */
+function routeLabel(url) {
+    if (!url.startsWith('/api/')) return 'static';
+    return url.replace(/\/\d+(?=\/|$)/g, '/:id');
+}
+
+/** SQL normalizado: espacios colapsados y listas de placeholders de largo variable unificadas. */
+function sqlLabel(sql) {
+    return sql.replace(/\s+/g, ' ').trim()
+        .replace(/\(\?(?:, ?\?)*\)(?:, ?\(\?(?:, ?\?)*\))+/g, '(?), ...')
+        .replace(/\?(?:, ?\?)+/g, '?, ...');
+}
+
+class Metrics {
+    constructor({ slowQueryMs = null } = {}) {
+        this.slowQueryMs = slowQueryMs;
+        this.started = Date.now();
+        this.inFlight = 0;
+        this.http = new Map();       // "método ruta" -> { method, route, histogram, status: Map, bytesIn, bytesOut }
+        this.sql = new Map();        // "db\0sql" -> { db, sql, histogram, errors }
+        this.collectors = [];
+        this.loopDelay = monitorEventLoopDelay({ resolution: 10 });
+        this.loopDelay.enable();
+    }
+
+    /** Mide un request HTTP completo; llamar al inicio del handler. */
+    trackRequest(req, res, url) {
+        const started = process.hrtime.bigint();
+        const socket = req.socket;
+        const readBefore = socket.bytesRead;
+        const writtenBefore = socket.bytesWritten;
+        this.inFlight++;
+        let done = false;
+        const finish = () => {
+            if (done) return;
+            done = true;
+            this.inFlight--;
+            const seconds = Number(process.hrtime.bigint() - started) / 1e9;
+            const entry = this._route(req.method, routeLabel(url));
+            entry.histogram.observe(seconds);
+            entry.status.set(res.statusCode, (entry.status.get(res.statusCode) || 0) + 1);
+            // El cuerpo chico ya llegó junto con los headers: Content-Length; si es chunked, lo leído desde el inicio
+            entry.bytesIn += parseInt(req.headers['content-length'], 10) || Math.max(0, socket.bytesRead - readBefore);
+            entry.bytesOut += Math.max(0, socket.bytesWritten - writtenBefore);
+        };
+        res.on('finish', finish);
+        res.on('close', finish); // cliente desconectado antes de terminar
+    }
+
+    _route(method, route) {
+        let key = `${method} ${route}`;
+        if (!this.http.has(key) && this.http.size >= MAX_ROUTES) key = `${method} other`;
+        let entry = this.http.get(key);
+        if (!entry) {
+            entry = { method, route: this.http.size >= MAX_ROUTES ? 'other' : route, histogram: new Histogram(), status: new Map(), bytesIn: 0, bytesOut: 0 };
+            this.http.set(key, entry);
+        }
+        return entry;
+    }
+
+    observeQuery(dbName, sql, seconds, err) {
+        let label = sqlLabel(sql);
+        let key = `${dbName}\0${label}`;
+        if (!this.sql.has(key) && this.sql.size >= MAX_STATEMENTS) {
+            label = 'other';
+            key = `${dbName}\0other`;
+        }
+        let entry = this.sql.get(key);
+        if (!entry) {
+            entry = { db: dbName, sql: label, histogram: new Histogram(), errors: 0 };
+            this.sql.set(key, entry);
+        }
+        entry.histogram.observe(seconds);
+        if (err) entry.errors++;
+        if (this.slowQueryMs !== null && seconds * 1000 >= this.slowQueryMs) {
+            console.warn(`[SlowQuery] ${(seconds * 1000).toFixed(1)}ms ${dbName}: ${label.slice(0, 300)}`);
+        }
+    }
+
+    /**
+     * Envuelve run/get/all/each/exec/prepare de una conexión sqlite3 para medir cada sentencia.
+     * Solo se miden llamadas con callback (sin callback el driver emite 'error' y no hay fin observable).
+     */
+    instrumentDatabase(db, dbName) {
+        const metrics = this;
+        const wrapLast = (sql, args) => {
+            const i = args.length - 1;
+            if (typeof args[i] !== 'function') return args;
+            const callback = args[i];
+            const started = process.hrtime.bigint();
+            const wrapped = args.slice();
+            wrapped[i] = function (err, ...rest) {
+                metrics.observeQuery(dbName, sql, Number(process.hrtime.bigint() - started) / 1e9, err);
+                return callback.call(this, err, ...rest);
+            };
+            return wrapped;
+        };
+        ['run', 'get', 'all', 'exec'].forEach(method => {
+            const original = db[method];
+            db[method] = function (sql, ...args) {
+                return original.call(this, sql, ...wrapLast(sql, args));
+            };
+        });
+        const originalEach = db.each;
+        db.each = function (sql, ...args) {
+            // each(sql, [params], onRow, onComplete): se mide hasta onComplete
+            const fns = args.filter(a => typeof a === 'function').length;
+            return originalEach.call(this, sql, ...(fns >= 2 ? wrapLast(sql, args) : args));
+        };
+        const originalPrepare = db.prepare;
+        db.prepare = function (sql, ...args) {
+            const stmt = originalPrepare.call(this, sql, ...args);
+            ['run', 'get', 'all'].forEach(method => {
+                const original = stmt[method];
+                stmt[method] = function (...stmtArgs) {
+                    return original.apply(this, wrapLast(sql, stmtArgs));
+                };
+            });
+            return stmt;
+        };
+        return db;
+    }
+
+    /** `collector()` devuelve líneas de texto Prometheus adicionales (ej. estado de la cola de escrituras). */
+    addCollector(collector) {
+        this.collectors.push(collector);
+    }
+
+    _histogramLines(name, labelObj, h) {
+        const lines = [];
+        let cumulative = 0;
+        BUCKETS.forEach((le, i) => {
+            cumulative += h.counts[i];
+            lines.push(`${name}_bucket${labels({ ...labelObj, le })} ${cumulative}`);
+        });
+        lines.push(`${name}_bucket${labels({ ...labelObj, le: '+Inf' })} ${h.count}`);
+        lines.push(`${name}_sum${labels(labelObj)} ${h.sum}`);
+        lines.push(`${name}_count${labels(labelObj)} ${h.count}`);
+        return lines;
+    }
+
+    /** Exposición completa en formato de texto Prometheus 0.0.4. */
+    render() {
+        const out = [];
+        const http = [...this.http.values()];
+        const sql = [...this.sql.values()];
+
+        out.push('# HELP http_requests_in_flight Requests en curso.', '# TYPE http_requests_in_flight gauge',
+            `http_requests_in_flight ${this.inFlight}`);
+
+        out.push('# HELP http_requests_total Requests terminados por método, ruta y status.', '# TYPE http_requests_total counter');
+        http.forEach(e => e.status.forEach((n, status) =>
+            out.push(`http_requests_total${labels({ method: e.method, route: e.route, status })} ${n}`)));
+
+        out.push('# HELP http_request_duration_seconds Latencia de requests por método y ruta.', '# TYPE http_request_duration_seconds histogram');
+        http.forEach(e => out.push(...this._histogramLines('http_request_duration_seconds', { method: e.method, route: e.route }, e.histogram)));
+
+        out.push('# HELP http_request_bytes_total Bytes de cuerpo recibidos por ruta.', '# TYPE http_request_bytes_total counter');
+        http.forEach(e => out.push(`http_request_bytes_total${labels({ method: e.method, route: e.route })} ${e.bytesIn}`));
+        out.push('# HELP http_response_bytes_total Bytes escritos al socket por ruta (con headers).', '# TYPE http_response_bytes_total counter');
+        http.forEach(e => out.push(`http_response_bytes_total${labels({ method: e.method, route: e.route })} ${e.bytesOut}`));
+
+        out.push('# HELP sqlite_query_duration_seconds Duración de sentencias SQLite (llamada a callback).', '# TYPE sqlite_query_duration_seconds histogram');
+        sql.forEach(e => out.push(...this._histogramLines('sqlite_query_duration_seconds', { db: e.db, sql: e.sql }, e.histogram)));
+        out.push('# HELP sqlite_query_errors_total Sentencias SQLite con error.', '# TYPE sqlite_query_errors_total counter');
+        sql.forEach(e => e.errors && out.push(`sqlite_query_errors_total${labels({ db: e.db, sql: e.sql })} ${e.errors}`));
+
+        const mem = process.memoryUsage();
+        out.push('# TYPE process_resident_memory_bytes gauge', `process_resident_memory_bytes ${mem.rss}`,
+            '# TYPE nodejs_heap_used_bytes gauge', `nodejs_heap_used_bytes ${mem.heapUsed}`,
+            '# TYPE nodejs_eventloop_delay_p99_seconds gauge', `nodejs_eventloop_delay_p99_seconds ${this.loopDelay.percentile(99) / 1e9}`,
+            '# TYPE process_uptime_seconds gauge', `process_uptime_seconds ${(Date.now() - this.started) / 1000}`);
+        this.collectors.forEach(c => out.push(...c()));
+        return out.join('\n') + '\n';
+    }
+}
+
+/**
+ * Une las exposiciones de varios workers en una sola: un bloque HELP/TYPE por familia y cada
+ * muestra con `worker="<id>"` (las sumas por ruta o sentencia las hace quien consulta).
+ * @param {Array<{worker, text}>} parts
+ */
+function mergeExpositions(parts) {
+    const families = new Map(); // nombre -> { header: [], samples: [] }
+    parts.forEach(({ worker, text }) => {
+        let family = null;
+        text.split('\n').forEach(line => {
+            if (!line) return;
+            const meta = line.match(/^# (?:HELP|TYPE) (\S+)/);
+            if (meta) {
+                family = families.get(meta[1]);
+                if (!family) families.set(meta[1], family = { header: [], samples: [] });
+                if (!family.header.includes(line)) family.header.push(line);
+                return;
+            }
+            family.samples.push(line.replace(/^([a-zA-Z_:][\w:]*)(\{)?/, (_, name, brace) =>
+                `${name}{worker="${worker}"${brace ? ',' : '}'}`));
+        });
+    });
+    const out = [];
+    families.forEach(f => out.push(...f.header, ...f.samples));
+    return out.join('\n') + '\n';
+}
+
+module.exports = { Metrics, routeLabel, sqlLabel, mergeExpositions };
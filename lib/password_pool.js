@@ -0,0 +1,81 @@
+/**
+ * Pool de workers para bcrypt.
+ * `compareSync`/`hashSync` bloquean el event loop decenas de ms; aquí corren en
+ * worker_threads con concurrencia limitada al tamaño del pool y una cola acotada.
+ */
+const os = require('os');
+const path = require('path');
+const { Worker } = require('worker_threads');
+
+const DEFAULT_SIZE = Math.max(1, Math.min(os.cpus().length - 1, 4));
+const DEFAULT_MAX_QUEUE = 500;
+
+class PoolBusyError extends Error { }
+
+class PasswordPool {
+    constructor({ size = DEFAULT_SIZE, maxQueue = DEFAULT_MAX_QUEUE } = {}) {
+        this.size = size;
+        this.maxQueue = maxQueue;
+        this.idle = [];
+        this.queue = [];        // tareas esperando worker
+        this.running = new Map(); // id -> { resolve, reject, worker }
+        this.nextId = 1;
+        for (let i = 0; i < size; i++) this._spawn();
+    }
+
+    _spawn() {
+        const worker = new Worker(path.join(__dirname, 'password_worker.js'));
+        worker.unref();
+        worker.on('message', ({ id, result, error }) => {
+            const task = this.running.get(id);
+            this.running.delete(id);
+            if (error) task.reject(new Error(error));
+            else task.resolve(result);
+            this._release(worker);
+        });
+        worker.on('error', (err) => {
+            console.error('[Passwords] Worker caído:', err.message);
+            // Fallar las tareas del worker y reemplazarlo
+            this.running.forEach((task, id) => {
+                if (task.worker === worker) { this.running.delete(id); task.reject(err); }
+            });
+            this.idle = this.idle.filter(w => w !== worker);
+            this._spawn();
+        });
+        this._release(worker);
+    }
+
+    _release(worker) {
+        const next = this.queue.shift();
+        if (next) return this._run(worker, next);
+        this.idle.push(worker);
+    }
+
+    _run(worker, task) {
+        this.running.set(task.message.id, { ...task, worker });
+        worker.postMessage(task.message);
+    }
+
+    _submit(message) {
+        return new Promise((resolve, reject) => {
+            const task = { message: { id: this.nextId++, ...message }, resolve, reject };
+            const worker = this.idle.pop();
+            if (worker) return this._run(worker, task);
+            if (this.queue.length >= this.maxQueue) return reject(new PoolBusyError('Demasiadas verificaciones en curso'));
+            this.queue.push(task);
+        });
+    }
+
+    /** @returns {Promise<boolean>} */
+    compare(password, hash) {
+        if (typeof password !== 'string' || typeof hash !== 'string') return Promise.resolve(false);
+        return this._submit({ op: 'compare', password, hash });
+    }
+
+    /** @returns {Promise<string>} */
+    hash(password, rounds = 10) {
+        return this._submit({ op: 'hash', password, rounds });
+    }
+}
+
+module.exports = { PasswordPool, PoolBusyError };
@@ -0,0 +1,15 @@
+/**
+ * Worker de hashing: ejecuta bcrypt fuera del event loop principal.
+ * Mensajes: { id, op: 'hash' | 'compare', password, hash, rounds } -> { id, result } | { id, error }
+ */
+const { parentPort } = require('worker_threads');
+const bcrypt = require('bcryptjs');
+
+parentPort.on('message', ({ id, op, password, hash, rounds }) => {
+    try {
+        const result = op === 'compare' ? bcrypt.compareSync(password, hash) : bcrypt.hashSync(password, rounds);
+        parentPort.postMessage({ id, result });
+    } catch (err) {
+        parentPort.postMessage({ id, error: err.message });
+    }
+});
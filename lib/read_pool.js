@@ -0,0 +1,72 @@
+/**
+ * Pool de Conexiones de Solo Lectura (lectores WAL)
+ * - node-sqlite3 ejecuta las sentencias de una conexión de a una, en el threadpool de libuv.
+ *   Con varias conexiones de lectura, consultas de distintos usuarios corren en paralelo y
+ *   no esperan detrás del escritor (`writer` + WriteQueue) ni de la conexión principal.
+ * - Conexiones abiertas con OPEN_READONLY: un bug que intente escribir por aquí falla en vez de
+ *   competir por el lock de escritura.
+ * - Despacho a la conexión con menos consultas en vuelo. Misma firma que `db.get/all/each`.
+ */
+const sqlite3 = require('sqlite3');
+
+class ReadPool {
+    /**
+     * @param {string} file Archivo SQLite (ya creado y en modo WAL)
+     * @param {Object} options { size, busyTimeout, instrument(db, name) }
+     */
+    constructor(file, { size = 4, busyTimeout = 5000, instrument = null } = {}) {
+        this.file = file;
+        this.size = Math.max(1, size);
+        this.busyTimeout = busyTimeout;
+        this.instrument = instrument;
+        this.connections = []; // { db, inFlight }
+    }
+
+    /** Abre las conexiones; llamar después de initDB (el archivo y el WAL deben existir). */
+    open(callback) {
+        let remaining = this.size, failed = null;
+        for (let i = 0; i < this.size; i++) {
+            const db = new sqlite3.Database(this.file, sqlite3.OPEN_READONLY, (err) => {
+                if (err) failed = err;
+                if (--remaining === 0) callback(failed);
+            });
+            db.configure('busyTimeout', this.busyTimeout);
+            if (this.instrument) this.instrument(db, 'read');
+            this.connections.push({ db, inFlight: 0 });
+        }
+    }
+
+    _acquire() {
+        let best = this.connections[0];
+        for (const c of this.connections) if (c.inFlight < best.inFlight) best = c;
+        best.inFlight++;
+        return best;
+    }
+
+    _dispatch(method, sql, args) {
+        const conn = this._acquire();
+        const i = args.length - 1;
+        const callback = args[i];
+        const rest = args.slice(0, i);
+        conn.db[method](sql, ...rest, function (...result) {
+            conn.inFlight--;
+            return callback.apply(this, result);
+        });
+        return this;
+    }
+
+    get(sql, ...args) { return this._dispatch('get', sql, args); }
+    all(sql, ...args) { return this._dispatch('all', sql, args); }
+
+    /** each(sql, [params], onRow, onComplete): la conexión se libera en onComplete. */
+    each(sql, ...args) { return this._dispatch('each', sql, args); }
+
+    close(callback) {
+        let remaining = this.connections.length;
+        if (!remaining) return callback && setImmediate(callback);
+        this.connections.forEach(c => c.db.close(() => { if (--remaining === 0 && callback) callback(); }));
+        this.connections = [];
+    }
+}
+
+module.exports = { ReadPool };
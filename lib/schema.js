@@ -0,0 +1,311 @@
+/**
+ * Esquema SQLite: tablas base y migraciones versionadas
+ * - Única definición del esquema: la aplica server.js (`initDB` / `runMigrations`) y la lee
+ *   `tests/db_schema.py` (vía `node -e`) para crear bases de benchmark sin levantar el servidor.
+ * - Solo datos (SQL en texto): sin dependencias, para poder cargarlo desde cualquier proceso.
+ */
+
+/**
+ * Tablas base en su formato original (v2). Los cambios de formato posteriores van como
+ * migraciones, así una base vieja y una nueva terminan con el mismo esquema.
+ */
+const TABLES = [
+    // 1. Tabla de Usuarios
+    `CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )`,
+
+    // 2. Tablas de Negocio con user_id
+    `CREATE TABLE IF NOT EXISTS transacciones (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL DEFAULT 1,
+        fecha TEXT, tipo TEXT, categoria TEXT, monto REAL, descripcion TEXT
+    )`,
+
+    `CREATE TABLE IF NOT EXISTS categorias (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL DEFAULT 1,
+        nombre TEXT, tipo TEXT
+    )`,
+
+    `CREATE TABLE IF NOT EXISTS presupuestos_categoria (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL DEFAULT 1,
+        categoria TEXT,
+        limite REAL DEFAULT 0,
+        UNIQUE(user_id, categoria)
+    )`,
+
+    `CREATE TABLE IF NOT EXISTS sobres (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL DEFAULT 1,
+        nombre TEXT,
+        saldo REAL DEFAULT 0,
+        icono TEXT,
+        UNIQUE(user_id, nombre)
+    )`
+];
+
+/**
+ * Filas que `resumen_mensual` debería tener según `transacciones` (`node aggregates.js verify` las compara).
+ */
+const RESUMEN_EXPECTED_SQL = `
+    SELECT user_id, IFNULL(fecha / 100, 0) AS mes, IFNULL(tipo, '') AS tipo,
+           IFNULL(categoria, '') AS categoria, IFNULL(SUM(monto), 0) AS total, COUNT(*) AS cantidad
+    FROM transacciones GROUP BY 1, 2, 3, 4
+`;
+
+/**
+ * Reconstruye `resumen_mensual` desde `transacciones` (mismo SQL que `node aggregates.js rebuild`).
+ */
+const RESUMEN_REBUILD_SQL = `
+    INSERT INTO resumen_mensual (user_id, mes, tipo, categoria, total, cantidad) ${RESUMEN_EXPECTED_SQL};
+`;
+
+/**
+ * SQL para cambiar el tipo de columnas de una tabla (SQLite no tiene ALTER COLUMN): crea
+ * `<tabla>_nueva`, copia las filas convertidas con `select`, conserva el contador de
+ * AUTOINCREMENT y reemplaza la original. Sus índices y triggers se van con la tabla vieja.
+ */
+function rebuildTableSQL(table, definition, select) {
+    return `
+        CREATE TABLE ${table}_nueva (${definition});
+        INSERT INTO ${table}_nueva ${select};
+        DELETE FROM sqlite_sequence WHERE name = '${table}_nueva';
+        INSERT INTO sqlite_sequence (name, seq) SELECT '${table}_nueva', seq FROM sqlite_sequence WHERE name = '${table}';
+        DROP TABLE ${table};
+        ALTER TABLE ${table}_nueva RENAME TO ${table};
+    `;
+}
+
+/**
+ * Migraciones versionadas. Se aplican en orden, una sola vez, registrando la
+ * versión en `PRAGMA user_version` dentro de la misma transacción.
+ * `check` (opcional): consulta de filas que la migración no puede convertir; si devuelve
+ * alguna, no se aplica.
+ */
+const MIGRATIONS = [
+    {
+        version: 1,
+        description: 'Índices por user_id para listados, stats y verificación de fondos',
+        sql: `
+            -- Listado y paginación: WHERE user_id = ? [AND fecha BETWEEN] ORDER BY fecha DESC, id DESC
+            CREATE INDEX IF NOT EXISTS idx_transacciones_user_fecha ON transacciones (user_id, fecha);
+            -- Stats y fondos disponibles: SUM(monto) por tipo resuelto solo con el índice (covering)
+            CREATE INDEX IF NOT EXISTS idx_transacciones_user_tipo_monto ON transacciones (user_id, tipo, monto);
+            -- Categorías: WHERE user_id = ? ORDER BY nombre
+            CREATE INDEX IF NOT EXISTS idx_categorias_user_nombre ON categorias (user_id, nombre);
+            -- sobres y presupuestos_categoria ya tienen índice (user_id, ...) por su UNIQUE
+        `
+    },
+    {
+        version: 2,
+        description: 'Agregados mensuales por usuario mantenidos por triggers',
+        sql: `
+            -- Totales por (usuario, mes, tipo, categoría). Los triggers los actualizan dentro de la
+            -- misma transacción que cualquier INSERT/UPDATE/DELETE sobre transacciones.
+            CREATE TABLE IF NOT EXISTS resumen_mensual (
+                user_id INTEGER NOT NULL,
+                mes TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                categoria TEXT NOT NULL,
+                total REAL NOT NULL DEFAULT 0,
+                cantidad INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, mes, tipo, categoria)
+            ) WITHOUT ROWID;
+
+            CREATE TRIGGER IF NOT EXISTS trg_transacciones_resumen_insert AFTER INSERT ON transacciones BEGIN
+                INSERT INTO resumen_mensual (user_id, mes, tipo, categoria, total, cantidad)
+                VALUES (NEW.user_id, IFNULL(substr(NEW.fecha, 1, 7), ''), IFNULL(NEW.tipo, ''), IFNULL(NEW.categoria, ''), IFNULL(NEW.monto, 0), 1)
+                ON CONFLICT (user_id, mes, tipo, categoria) DO UPDATE SET total = total + excluded.total, cantidad = cantidad + 1;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_transacciones_resumen_delete AFTER DELETE ON transacciones BEGIN
+                UPDATE resumen_mensual SET total = total - IFNULL(OLD.monto, 0), cantidad = cantidad - 1
+                WHERE user_id = OLD.user_id AND mes = IFNULL(substr(OLD.fecha, 1, 7), '')
+                  AND tipo = IFNULL(OLD.tipo, '') AND categoria = IFNULL(OLD.categoria, '');
+                DELETE FROM resumen_mensual
+                WHERE user_id = OLD.user_id AND mes = IFNULL(substr(OLD.fecha, 1, 7), '')
+                  AND tipo = IFNULL(OLD.tipo, '') AND categoria = IFNULL(OLD.categoria, '') AND cantidad <= 0;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_transacciones_resumen_update AFTER UPDATE OF user_id, fecha, tipo, categoria, monto ON transacciones BEGIN
+                UPDATE resumen_mensual SET total = total - IFNULL(OLD.monto, 0), cantidad = cantidad - 1
+                WHERE user_id = OLD.user_id AND mes = IFNULL(substr(OLD.fecha, 1, 7), '')
+                  AND tipo = IFNULL(OLD.tipo, '') AND categoria = IFNULL(OLD.categoria, '');
+                DELETE FROM resumen_mensual
+                WHERE user_id = OLD.user_id AND mes = IFNULL(substr(OLD.fecha, 1, 7), '')
+                  AND tipo = IFNULL(OLD.tipo, '') AND categoria = IFNULL(OLD.categoria, '') AND cantidad <= 0;
+                INSERT INTO resumen_mensual (user_id, mes, tipo, categoria, total, cantidad)
+                VALUES (NEW.user_id, IFNULL(substr(NEW.fecha, 1, 7), ''), IFNULL(NEW.tipo, ''), IFNULL(NEW.categoria, ''), IFNULL(NEW.monto, 0), 1)
+                ON CONFLICT (user_id, mes, tipo, categoria) DO UPDATE SET total = total + excluded.total, cantidad = cantidad + 1;
+            END;
+
+            -- Backfill con el historial existente (formato de entonces: fecha TEXT, monto REAL)
+            DELETE FROM resumen_mensual;
+            INSERT INTO resumen_mensual (user_id, mes, tipo, categoria, total, cantidad)
+            SELECT user_id, IFNULL(substr(fecha, 1, 7), ''), IFNULL(tipo, ''), IFNULL(categoria, ''), TOTAL(monto), COUNT(*)
+            FROM transacciones GROUP BY 1, 2, 3, 4;
+        `
+    },
+    {
+        version: 3,
+        description: 'Tabla de sesiones con expiración (reemplaza sessions.json)',
+        sql: `
+            CREATE TABLE IF NOT EXISTS sesiones (
+                token TEXT PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                username TEXT NOT NULL,
+                created INTEGER NOT NULL,
+                expires INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_sesiones_expires ON sesiones (expires);
+        `
+    },
+    {
+        version: 4,
+        description: 'Fechas como entero yyyymmdd y montos en céntimos (SUM exacto, rangos de mes por índice)',
+        // Filas que la conversión perdería: fecha que no empieza con un día válido 'YYYY-MM-DD'
+        // o monto no numérico. Hay que corregirlas a mano antes de migrar.
+        check: `
+            SELECT id, user_id, fecha, monto FROM transacciones
+            WHERE (fecha IS NOT NULL AND (fecha NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'
+                                          OR date(substr(fecha, 1, 10), '+0 days') IS NOT substr(fecha, 1, 10)))
+               OR typeof(monto) NOT IN ('integer', 'real', 'null')
+            ORDER BY id
+        `,
+        sql: `
+            ${rebuildTableSQL('transacciones', `
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL DEFAULT 1,
+                fecha INTEGER, tipo TEXT, categoria TEXT, monto INTEGER, descripcion TEXT`, `
+                SELECT id, user_id,
+                       CAST(substr(fecha, 1, 4) || substr(fecha, 6, 2) || substr(fecha, 9, 2) AS INTEGER),
+                       tipo, categoria, CAST(ROUND(monto * 100) AS INTEGER), descripcion
+                FROM transacciones`)}
+            CREATE INDEX IF NOT EXISTS idx_transacciones_user_fecha ON transacciones (user_id, fecha);
+            CREATE INDEX IF NOT EXISTS idx_transacciones_user_tipo_monto ON transacciones (user_id, tipo, monto);
+
+            ${rebuildTableSQL('sobres', `
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL DEFAULT 1,
+                nombre TEXT,
+                saldo INTEGER DEFAULT 0,
+                icono TEXT,
+                UNIQUE(user_id, nombre)`, `
+                SELECT id, user_id, nombre, CAST(ROUND(IFNULL(saldo, 0) * 100) AS INTEGER), icono FROM sobres`)}
+
+            ${rebuildTableSQL('presupuestos_categoria', `
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL DEFAULT 1,
+                categoria TEXT,
+                limite INTEGER DEFAULT 0,
+                UNIQUE(user_id, categoria)`, `
+                SELECT id, user_id, categoria, CAST(ROUND(IFNULL(limite, 0) * 100) AS INTEGER) FROM presupuestos_categoria`)}
+
+            -- Agregados: mes yyyymm y total en céntimos
+            DROP TABLE resumen_mensual;
+            CREATE TABLE resumen_mensual (
+                user_id INTEGER NOT NULL,
+                mes INTEGER NOT NULL,
+                tipo TEXT NOT NULL,
+                categoria TEXT NOT NULL,
+                total INTEGER NOT NULL DEFAULT 0,
+                cantidad INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, mes, tipo, categoria)
+            ) WITHOUT ROWID;
+
+            CREATE TRIGGER trg_transacciones_resumen_insert AFTER INSERT ON transacciones BEGIN
+                INSERT INTO resumen_mensual (user_id, mes, tipo, categoria, total, cantidad)
+                VALUES (NEW.user_id, IFNULL(NEW.fecha / 100, 0), IFNULL(NEW.tipo, ''), IFNULL(NEW.categoria, ''), IFNULL(NEW.monto, 0), 1)
+                ON CONFLICT (user_id, mes, tipo, categoria) DO UPDATE SET total = total + excluded.total, cantidad = cantidad + 1;
+            END;
+
+            CREATE TRIGGER trg_transacciones_resumen_delete AFTER DELETE ON transacciones BEGIN
+                UPDATE resumen_mensual SET total = total - IFNULL(OLD.monto, 0), cantidad = cantidad - 1
+                WHERE user_id = OLD.user_id AND mes = IFNULL(OLD.fecha / 100, 0)
+                  AND tipo = IFNULL(OLD.tipo, '') AND categoria = IFNULL(OLD.categoria, '');
+                DELETE FROM resumen_mensual
+                WHERE user_id = OLD.user_id AND mes = IFNULL(OLD.fecha / 100, 0)
+                  AND tipo = IFNULL(OLD.tipo, '') AND categoria = IFNULL(OLD.categoria, '') AND cantidad <= 0;
+            END;
+
+            CREATE TRIGGER trg_transacciones_resumen_update AFTER UPDATE OF user_id, fecha, tipo, categoria, monto ON transacciones BEGIN
+                UPDATE resumen_mensual SET total = total - IFNULL(OLD.monto, 0), cantidad = cantidad - 1
+                WHERE user_id = OLD.user_id AND mes = IFNULL(OLD.fecha / 100, 0)
+                  AND tipo = IFNULL(OLD.tipo, '') AND categoria = IFNULL(OLD.categoria, '');
+                DELETE FROM resumen_mensual
+                WHERE user_id = OLD.user_id AND mes = IFNULL(OLD.fecha / 100, 0)
+                  AND tipo = IFNULL(OLD.tipo, '') AND categoria = IFNULL(OLD.categoria, '') AND cantidad <= 0;
+                INSERT INTO resumen_mensual (user_id, mes, tipo, categoria, total, cantidad)
+                VALUES (NEW.user_id, IFNULL(NEW.fecha / 100, 0), IFNULL(NEW.tipo, ''), IFNULL(NEW.categoria, ''), IFNULL(NEW.monto, 0), 1)
+                ON CONFLICT (user_id, mes, tipo, categoria) DO UPDATE SET total = total + excluded.total, cantidad = cantidad + 1;
+            END;
+
+            ${RESUMEN_REBUILD_SQL}
+        `
+    },
+    {
+        version: 5,
+        description: 'Búsqueda de texto completo (FTS5) sobre descripción y categoría',
+        sql: `
+            -- Índice externo sobre transacciones (no duplica el texto). user_id se indexa como token
+            -- para acotar cada búsqueda a un usuario dentro del MATCH; los prefijos de 2 a 4 letras
+            -- tienen índice propio (lib/transaction_search.js).
+            CREATE VIRTUAL TABLE transacciones_fts USING fts5(
+                user_id, descripcion, categoria,
+                content = 'transacciones', content_rowid = 'id',
+                tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4'
+            );
+
+            CREATE TRIGGER trg_transacciones_fts_insert AFTER INSERT ON transacciones BEGIN
+                INSERT INTO transacciones_fts (rowid, user_id, descripcion, categoria)
+                VALUES (NEW.id, NEW.user_id, NEW.descripcion, NEW.categoria);
+            END;
+
+            CREATE TRIGGER trg_transacciones_fts_delete AFTER DELETE ON transacciones BEGIN
+                INSERT INTO transacciones_fts (transacciones_fts, rowid, user_id, descripcion, categoria)
+                VALUES ('delete', OLD.id, OLD.user_id, OLD.descripcion, OLD.categoria);
+            END;
+
+            CREATE TRIGGER trg_transacciones_fts_update AFTER UPDATE OF user_id, descripcion, categoria ON transacciones BEGIN
+                INSERT INTO transacciones_fts (transacciones_fts, rowid, user_id, descripcion, categoria)
+                VALUES ('delete', OLD.id, OLD.user_id, OLD.descripcion, OLD.categoria);
+                INSERT INTO transacciones_fts (rowid, user_id, descripcion, categoria)
+                VALUES (NEW.id, NEW.user_id, NEW.descripcion, NEW.categoria);
+            END;
+
+            -- Indexa el historial existente
+            INSERT INTO transacciones_fts (transacciones_fts) VALUES ('rebuild');
+        `
+    },
+    {
+        version: 6,
+        description: 'Registro de transacciones borradas para sincronización incremental',
+        sql: `
+            -- Tombstones para GET /api/transactions/changes (lib/transaction_changes.js): los clientes
+            -- piden las filas con id mayor al último que vieron y las bajas con seq mayor a la última.
+            -- Un UPDATE también deja registro: el cliente borra la fila y recibe la versión nueva.
+            CREATE TABLE transacciones_borradas (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                tx_id INTEGER NOT NULL
+            );
+            CREATE INDEX idx_transacciones_borradas_user_seq ON transacciones_borradas (user_id, seq);
+
+            CREATE TRIGGER trg_transacciones_borradas_delete AFTER DELETE ON transacciones BEGIN
+                INSERT INTO transacciones_borradas (user_id, tx_id) VALUES (OLD.user_id, OLD.id);
+            END;
+
+            CREATE TRIGGER trg_transacciones_borradas_update AFTER UPDATE ON transacciones BEGIN
+                INSERT INTO transacciones_borradas (user_id, tx_id) VALUES (OLD.user_id, OLD.id);
+                INSERT INTO transacciones_borradas (user_id, tx_id) SELECT NEW.user_id, NEW.id WHERE NEW.user_id IS NOT OLD.user_id;
+            END;
+        `
+    }
+];
+
+module.exports = { TABLES, MIGRATIONS, RESUMEN_EXPECTED_SQL, RESUMEN_REBUILD_SQL };
@@ -0,0 +1,200 @@
+/**
+ * Store de Sesiones
+ * - Persistencia en la tabla `sesiones` (SQLite) con escritura diferida (write-behind):
+ *   login/logout solo tocan memoria; los cambios se vuelcan en lote cada `flushIntervalMs`.
+ * - Lecturas servidas desde un LRU en memoria; un miss consulta SQLite una vez.
+ * - Expiración por TTL, con barrido periódico en memoria y en la tabla.
+ * - En cluster cada worker tiene su LRU: `remember`/`forget` aplican altas y bajas hechas en otro
+ *   worker (aún sin volcar); una baja queda como marca `null` para no revivirla desde la tabla ni
+ *   desde un alta propia todavía pendiente de volcar.
+ */
+const crypto = require('crypto');
+const fs = require('fs');
+
+const DEFAULT_TTL_MS = 7 * 24 * 60 * 60 * 1000; // 7 días
+const BATCH_SIZE = 100; // filas por sentencia multi-VALUES (5 parámetros c/u)
+
+class SessionStore {
+    constructor(db, { ttlMs = DEFAULT_TTL_MS, maxCached = 10000, flushIntervalMs = 1000, sweepIntervalMs = 10 * 60 * 1000 } = {}) {
+        this.db = db;
+        this.ttlMs = ttlMs;
+        this.maxCached = maxCached;
+        this.flushIntervalMs = flushIntervalMs;
+        this.sweepIntervalMs = sweepIntervalMs;
+        this.cache = new Map();         // token -> sesión (orden de inserción = recencia)
+        this.pending = new Map();       // token -> sesión | null (null = borrar) aún no persistido
+        this.flushing = new Map();      // lote en vuelo hacia SQLite
+        this.timers = [];
+    }
+
+    /** Arranca los timers de volcado y barrido (no mantienen vivo el proceso). */
+    start() {
+        this.timers.push(setInterval(() => this.flush(), this.flushIntervalMs).unref());
+        this.timers.push(setInterval(() => this.sweep(), this.sweepIntervalMs).unref());
+        this.sweep();
+    }
+
+    stop(callback) {
+        this.timers.forEach(clearInterval);
+        this.timers = [];
+        this.flush(callback);
+    }
+
+    _remember(token, session) {
+        this.cache.delete(token);
+        this.cache.set(token, session);
+        if (this.cache.size > this.maxCached) this.cache.delete(this.cache.keys().next().value);
+    }
+
+    /** Lo último escrito para el token (pendiente o en vuelo); undefined si no hay cambios locales. */
+    _unflushed(token) {
+        if (this.pending.has(token)) return this.pending.get(token);
+        if (this.flushing.has(token)) return this.flushing.get(token);
+        return undefined;
+    }
+
+    /**
+     * Crea una sesión nueva para el usuario.
+     * @returns {string} token
+     */
+    create(user) {
+        const token = crypto.randomUUID();
+        const now = Date.now();
+        const session = { userId: user.id, username: user.username, created: now, expires: now + this.ttlMs };
+        this._remember(token, session);
+        this.pending.set(token, session);
+        return token;
+    }
+
+    /** Sesión en memoria del token (sin consultar SQLite), ej. recién creada. */
+    entry(token) {
+        const local = this._unflushed(token);
+        return local !== undefined ? local : (this.cache.get(token) || null);
+    }
+
+    destroy(token) {
+        this.cache.delete(token);
+        this.pending.set(token, null);
+    }
+
+    /** Sesión creada en otro proceso: solo memoria (la persiste quien la creó). */
+    remember(token, session) {
+        if (this._unflushed(token) === undefined) this._remember(token, session);
+    }
+
+    /**
+     * Sesión cerrada en otro proceso: marca en el LRU hasta el próximo barrido. Si este proceso la
+     * creó y aún no la volcó (o el INSERT está en vuelo), la baja reemplaza al alta pendiente: si no,
+     * el volcado la reviviría en la tabla después del DELETE del otro proceso.
+     */
+    forget(token) {
+        if (this._unflushed(token) !== undefined) this.pending.set(token, null);
+        this._remember(token, null);
+    }
+
+    /**
+     * Recupera una sesión vigente.
+     * @returns {Promise<Object|null>} { userId, username, created, expires }
+     */
+    get(token) {
+        if (!token) return Promise.resolve(null);
+        const now = Date.now();
+
+        const local = this._unflushed(token);
+        const session = local !== undefined ? local : this.cache.get(token);
+        if (session === null) return Promise.resolve(null);
+        if (session) {
+            if (session.expires <= now) {
+                this.destroy(token);
+                return Promise.resolve(null);
+            }
+            this._remember(token, session);
+            return Promise.resolve(session);
+        }
+
+        return new Promise(resolve => {
+            this.db.get("SELECT user_id, username, created, expires FROM sesiones WHERE token = ? AND expires > ?", [token, now], (err, row) => {
+                // Un logout pudo ocurrir mientras se consultaba
+                if (err || !row || this._unflushed(token) === null) return resolve(null);
+                const found = { userId: row.user_id, username: row.username, created: row.created, expires: row.expires };
+                this._remember(token, found);
+                resolve(found);
+            });
+        });
+    }
+
+    /** Vuelca a SQLite los cambios pendientes con sentencias multi-fila. */
+    flush(callback) {
+        if (this.pending.size === 0 || this.flushing.size > 0) {
+            if (callback) setImmediate(callback);
+            return;
+        }
+        this.flushing = this.pending;
+        this.pending = new Map();
+
+        const upserts = [], deletes = [];
+        this.flushing.forEach((s, token) => {
+            if (s) upserts.push([token, s.userId, s.username, s.created, s.expires]);
+            else deletes.push(token);
+        });
+
+        const statements = [];
+        for (let i = 0; i < upserts.length; i += BATCH_SIZE) {
+            const chunk = upserts.slice(i, i + BATCH_SIZE);
+            statements.push([
+                `INSERT OR REPLACE INTO sesiones (token, user_id, username, created, expires) VALUES ${chunk.map(() => '(?,?,?,?,?)').join(',')}`,
+                chunk.flat()
+            ]);
+        }
+        for (let i = 0; i < deletes.length; i += BATCH_SIZE) {
+            const chunk = deletes.slice(i, i + BATCH_SIZE);
+            statements.push([`DELETE FROM sesiones WHERE token IN (${chunk.map(() => '?').join(',')})`, chunk]);
+        }
+
+        let remaining = statements.length, failed = null;
+        statements.forEach(([sql, params]) => {
+            this.db.run(sql, params, (err) => {
+                if (err) failed = err;
+                if (--remaining > 0) return;
+                if (failed) {
+                    console.error('[Sessions] Error al persistir sesiones, se reintentará:', failed.message);
+                    // Reencolar lo que no fue reemplazado por un cambio más nuevo
+                    this.flushing.forEach((s, token) => { if (!this.pending.has(token)) this.pending.set(token, s); });
+                }
+                this.flushing = new Map();
+                if (callback) callback(failed);
+            });
+        });
+    }
+
+    /** Elimina sesiones expiradas de memoria y de SQLite. */
+    sweep() {
+        const now = Date.now();
+        this.cache.forEach((s, token) => { if (!s || s.expires <= now) this.cache.delete(token); });
+        this.db.run("DELETE FROM sesiones WHERE expires <= ?", [now], function (err) {
+            if (err) return console.error('[Sessions] Error en barrido:', err.message);
+            if (this.changes) console.log(`[Sessions] ${this.changes} sesiones expiradas eliminadas`);
+        });
+    }
+
+    /**
+     * Importa el antiguo `sessions.json` (una sola vez) y lo renombra a `.migrated`.
+     */
+    importLegacyFile(file) {
+        if (!fs.existsSync(file)) return;
+        let legacy = {};
+        try { legacy = JSON.parse(fs.readFileSync(file)); } catch (e) { legacy = {}; }
+        const now = Date.now();
+        let imported = 0;
+        Object.entries(legacy).forEach(([token, s]) => {
+            const created = s.created || now;
+            if (!s.userId || created + this.ttlMs <= now) return;
+            this.pending.set(token, { userId: s.userId, username: s.username, created, expires: created + this.ttlMs });
+            imported++;
+        });
+        fs.renameSync(file, `${file}.migrated`);
+        console.log(`[Sessions] ${imported} sesiones importadas desde ${file}`);
+    }
+}
+
+module.exports = { SessionStore, DEFAULT_TTL_MS };
@@ -0,0 +1,173 @@
+/**
+ * Capa de Archivos Estáticos
+ * - Cada archivo se lee una sola vez y queda en memoria junto a sus versiones gzip/brotli
+ *   precalculadas; `fs.watch` lo invalida cuando cambia en disco.
+ * - ETag fuerte por hash de contenido; `If-None-Match` coincidente responde 304 sin cuerpo.
+ * - Solo sirve extensiones conocidas (MIME_TYPES); nunca `data/`, `node_modules/`, `lib/`,
+ *   dotfiles ni los .js de servidor de la raíz.
+ */
+const crypto = require('crypto');
+const fs = require('fs');
+const path = require('path');
+const zlib = require('zlib');
+const { promisify } = require('util');
+
+const gzip = promisify(zlib.gzip);
+const brotli = promisify(zlib.brotliCompress);
+
+const MIME_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.js': 'text/javascript; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.png': 'image/png',
+    '.svg': 'image/svg+xml',
+    '.ico': 'image/x-icon'
+};
+const COMPRESSIBLE = new Set(['.html', '.js', '.css', '.svg']);
+const MIN_COMPRESS_BYTES = 1024;
+const BLOCKED_SEGMENTS = new Set(['data', 'node_modules', 'lib', 'tests']);
+
+/** Codificación preferida según Accept-Encoding (br > gzip), ignorando las de q=0. */
+function pickEncoding(acceptEncoding) {
+    const accepted = new Set();
+    (acceptEncoding || '').split(',').forEach(part => {
+        const [name, ...params] = part.trim().split(';');
+        const q = params.map(p => p.trim()).find(p => p.startsWith('q='));
+        if (!q || parseFloat(q.slice(2)) > 0) accepted.add(name.trim().toLowerCase());
+    });
+    if (accepted.has('br')) return 'br';
+    if (accepted.has('gzip') || accepted.has('*')) return 'gzip';
+    return null;
+}
+
+function etagMatches(ifNoneMatch, etag) {
+    if (!ifNoneMatch) return false;
+    return ifNoneMatch.split(',').some(tag => {
+        const t = tag.trim();
+        return t === '*' || t.replace(/^W\//, '') === etag;
+    });
+}
+
+class StaticAssets {
+    constructor(rootDir) {
+        this.rootDir = rootDir;
+        this.cache = new Map();    // ruta absoluta -> Promise<asset | null>
+        this.watchers = new Map(); // ruta absoluta -> FSWatcher
+    }
+
+    /** Ruta absoluta servible para una URL, o null si está prohibida. */
+    resolve(urlPath) {
+        const realPath = path.join(this.rootDir, urlPath);
+        if (!realPath.startsWith(this.rootDir + path.sep)) return null;
+        const segments = path.relative(this.rootDir, realPath).split(path.sep);
+        if (segments.some(s => s.startsWith('.')) || BLOCKED_SEGMENTS.has(segments[0])) return null;
+        const ext = path.extname(realPath);
+        if (!MIME_TYPES[ext]) return null;
+        // Los .js de la raíz son código de servidor (server.js, CLIs); el cliente vive en js/
+        if (segments.length === 1 && ext === '.js') return null;
+        return realPath;
+    }
+
+    _invalidate(realPath) {
+        this.cache.delete(realPath);
+        const watcher = this.watchers.get(realPath);
+        if (watcher) watcher.close();
+        this.watchers.delete(realPath);
+    }
+
+    _watch(realPath) {
+        if (this.watchers.has(realPath)) return;
+        try {
+            // 'change' o 'rename' (editores que reemplazan el archivo): recargar en el próximo request
+            const watcher = fs.watch(realPath, { persistent: false }, () => this._invalidate(realPath));
+            watcher.on('error', () => this._invalidate(realPath));
+            this.watchers.set(realPath, watcher);
+        } catch (e) {
+            // Sin watch no hay invalidación: no cachear
+            this.cache.delete(realPath);
+        }
+    }
+
+    async _load(realPath) {
+        let body;
+        try {
+            body = await fs.promises.readFile(realPath);
+        } catch (e) {
+            return null;
+        }
+        const ext = path.extname(realPath);
+        const asset = {
+            body,
+            type: MIME_TYPES[ext],
+            etag: `"${crypto.createHash('sha1').update(body).digest('base64url').slice(0, 20)}"`,
+            gzip: null,
+            br: null
+        };
+        if (COMPRESSIBLE.has(ext) && body.length >= MIN_COMPRESS_BYTES) {
+            try {
+                const [gz, br] = await Promise.all([
+                    gzip(body, { level: zlib.constants.Z_BEST_COMPRESSION }),
+                    brotli(body, { params: { [zlib.constants.BROTLI_PARAM_QUALITY]: zlib.constants.BROTLI_MAX_QUALITY } })
+                ]);
+                if (gz.length < body.length) asset.gzip = gz;
+                if (br.length < body.length) asset.br = br;
+            } catch (e) {
+                console.error(`[Static] No se pudo comprimir ${realPath}:`, e.message);
+            }
+        }
+        return asset;
+    }
+
+    get(realPath) {
+        let pending = this.cache.get(realPath);
+        if (!pending) {
+            pending = this._load(realPath);
+            this.cache.set(realPath, pending);
+            pending.then(asset => asset ? this._watch(realPath) : this.cache.delete(realPath));
+        }
+        return pending;
+    }
+
+    /** Precarga archivos (relativos a rootDir) y los directorios indicados, recursivamente. */
+    warm(entries) {
+        const files = [];
+        const walk = (rel) => {
+            const abs = path.join(this.rootDir, rel);
+            let stat;
+            try { stat = fs.statSync(abs); } catch (e) { return; }
+            if (stat.isDirectory()) fs.readdirSync(abs).forEach(name => walk(path.join(rel, name)));
+            else if (this.resolve('/' + rel)) files.push(abs);
+        };
+        entries.forEach(walk);
+        return Promise.all(files.map(f => this.get(f))).then(() => files.length);
+    }
+
+    async serve(req, res, urlPath) {
+        const realPath = this.resolve(urlPath);
+        const asset = realPath && await this.get(realPath);
+        if (!asset) return (res.writeHead(404), res.end('Not Found'));
+
+        const headers = {
+            'Content-Type': asset.type,
+            'ETag': asset.etag,
+            'Cache-Control': 'no-cache', // Siempre revalidar; el 304 hace la revalidación casi gratis
+            'Vary': 'Accept-Encoding'
+        };
+        if (etagMatches(req.headers['if-none-match'], asset.etag)) {
+            res.writeHead(304, headers);
+            return res.end();
+        }
+
+        const encoding = pickEncoding(req.headers['accept-encoding']);
+        let body = asset.body;
+        if (encoding && asset[encoding]) {
+            body = asset[encoding];
+            headers['Content-Encoding'] = encoding;
+        }
+        headers['Content-Length'] = body.length;
+        res.writeHead(200, headers);
+        res.end(req.method === 'HEAD' ? undefined : body);
+    }
+}
+
+module.exports = { StaticAssets, MIME_TYPES };
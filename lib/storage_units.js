@@ -0,0 +1,91 @@
+/**
+ * Formato de Almacenamiento de Fechas y Montos (migración 4)
+ * - Fechas como entero `yyyymmdd` (20250315): ordenan igual que 'YYYY-MM-DD', el mes es
+ *   `fecha / 100` y un rango de mes es un BETWEEN sobre el índice (user_id, fecha).
+ * - Montos como entero en céntimos (`monto`, `saldo`, `limite`, `resumen_mensual.total`):
+ *   SUM exacto, sin deriva de punto flotante.
+ * - La API no cambia: entra y sale 'YYYY-MM-DD' y montos con decimales; la conversión se hace
+ *   solo en el borde (validación de entrada y armado de la respuesta).
+ */
+
+const DATE_RE = /^\d{4}-\d{2}-\d{2}$/;
+const MONTH_RE = /^\d{4}-\d{2}$/;
+// Hasta 12 dígitos enteros: cualquier monto (y sus sumas) queda muy por debajo de 2^53 céntimos
+const AMOUNT_RE = /^(-)?(\d{1,12})(?:\.(\d{1,2}))?$/;
+
+/** 'YYYY-MM-DD' -> yyyymmdd; null si el formato no es válido o la fecha no existe (2025-02-30). */
+function toDay(fecha) {
+    if (typeof fecha !== 'string' || !DATE_RE.test(fecha)) return null;
+    const date = new Date(`${fecha}T00:00:00Z`);
+    if (isNaN(date) || date.toISOString().slice(0, 10) !== fecha) return null;
+    return Number(fecha.replace(/-/g, ''));
+}
+
+/** yyyymmdd -> 'YYYY-MM-DD' (null se mantiene). */
+function fromDay(day) {
+    if (day === null || day === undefined) return null;
+    const text = String(day).padStart(8, '0');
+    return `${text.slice(0, 4)}-${text.slice(4, 6)}-${text.slice(6, 8)}`;
+}
+
+/** 'YYYY-MM' -> yyyymm; null si no es válido. */
+function toMonth(month) {
+    if (typeof month !== 'string' || !MONTH_RE.test(month)) return null;
+    const value = Number(month.replace('-', ''));
+    const m = value % 100;
+    return m >= 1 && m <= 12 ? value : null;
+}
+
+/** Rango de días [primero, último] del mes yyyymm (cubre cualquier día 01..31). */
+function monthDays(month) {
+    return [month * 100 + 1, month * 100 + 31];
+}
+
+/**
+ * Monto de la API (número o texto decimal, hasta 2 decimales) -> céntimos; null si no es válido.
+ * Se convierte desde los dígitos del texto, no multiplicando el float: 1.005 no es un monto
+ * (se rechaza en vez de redondear) y '0x10', '1e3' o Infinity no pasan.
+ */
+function toCents(monto) {
+    const text = typeof monto === 'number' ? String(monto) : (typeof monto === 'string' ? monto.trim() : '');
+    const match = AMOUNT_RE.exec(text);
+    if (!match) return null;
+    const [, sign, units, decimals = ''] = match;
+    const cents = Number(units) * 100 + Number(decimals.padEnd(2, '0'));
+    return sign && cents !== 0 ? -cents : cents;
+}
+
+/** Céntimos -> monto de la API (null se mantiene). */
+function fromCents(cents) {
+    return cents === null || cents === undefined ? cents : cents / 100;
+}
+
+/**
+ * Página keyset de `transacciones` en orden (fecha DESC, id DESC) después de `cursor` ({ fecha, id }
+ * con la fecha almacenada, o null para la primera página). Las fechas NULL (filas legadas que la
+ * migración 4 conserva) van al final del orden: después de una fecha siguen las fechas menores y
+ * luego todas las NULL (UNION ALL de dos rangos del índice (user_id, fecha), que SQLite mezcla sin
+ * ordenar); después de una NULL, solo las NULL con id menor.
+ * @returns {Object} { sql, params } con `LIMIT ?` al final
+ */
+function transactionPageSQL(columns, where, params, cursor, limit) {
+    const select = (extra) => `SELECT ${columns} FROM transacciones WHERE ${[...where, ...extra].join(' AND ')}`;
+    const order = 'ORDER BY fecha DESC, id DESC LIMIT ?';
+    if (!cursor) return { sql: `${select([])} ${order}`, params: [...params, limit] };
+    if (cursor.fecha === null) {
+        return { sql: `${select(['fecha IS NULL AND id < ?'])} ${order}`, params: [...params, cursor.id, limit] };
+    }
+    return {
+        sql: `${select(['(fecha < ? OR (fecha = ? AND id < ?))'])} UNION ALL ${select(['fecha IS NULL'])} ${order}`,
+        params: [...params, cursor.fecha, cursor.fecha, cursor.id, ...params, limit]
+    };
+}
+
+/** Fila de `transacciones` a la forma de la API (en el lugar, para no copiar listados grandes). */
+function toApiTransaction(row) {
+    row.fecha = fromDay(row.fecha);
+    row.monto = fromCents(row.monto);
+    return row;
+}
+
+module.exports = { DATE_RE, MONTH_RE, toDay, fromDay, toMonth, monthDays, toCents, fromCents, transactionPageSQL, toApiTransaction };
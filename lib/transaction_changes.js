@@ -0,0 +1,49 @@
+/**
+ * Sincronización Incremental de Transacciones (migración 6)
+ * - El cliente guarda su copia (IndexedDB, js/core/store.js) y dos marcas: el último id recibido y
+ *   la última baja (`transacciones_borradas.seq`). Cada llamada devuelve solo lo posterior.
+ * - Los ids son AUTOINCREMENT y las escrituras se confirman de a una: una fila nueva siempre tiene
+ *   id mayor a todas las ya visibles, así `id > since_id` no se saltea ninguna.
+ * - Las bajas se leen antes que las filas: si algo se borra entre las dos consultas, la próxima
+ *   sincronización lo informa (borrar un id que el cliente no tiene no hace nada).
+ * - Un UPDATE deja una baja: su id llega en `deleted` y la fila actual en `data` (aplicar primero
+ *   `deleted` y después `data`).
+ */
+
+const CHANGES_PAGE_MAX = 5000;
+
+/**
+ * @param {Object} opts { userId, sinceId, sinceDeleted }
+ * @param {Function} cb (err, { data, deleted, lastId, lastDeleted, more }) con filas crudas (fecha/monto almacenados)
+ */
+function transactionChanges(db, { userId, sinceId, sinceDeleted }, cb) {
+    // Primera sincronización: todo el historial; de las bajas solo interesa la última marca
+    const first = sinceId === 0 && sinceDeleted === 0;
+    const tombstones = first
+        ? 'SELECT MAX(seq) AS seq, NULL AS tx_id FROM transacciones_borradas WHERE user_id = ?'
+        : 'SELECT seq, tx_id FROM transacciones_borradas WHERE user_id = ? AND seq > ? ORDER BY seq';
+    db.all(tombstones, first ? [userId] : [userId, sinceDeleted], (err, gone) => {
+        if (err) return cb(err);
+        const lastDeleted = gone.length && gone[gone.length - 1].seq !== null ? gone[gone.length - 1].seq : sinceDeleted;
+        const deleted = [...new Set(gone.filter(g => g.tx_id !== null).map(g => g.tx_id))];
+
+        db.all('SELECT * FROM transacciones WHERE user_id = ? AND id > ? ORDER BY id LIMIT ?',
+            [userId, sinceId, CHANGES_PAGE_MAX + 1], (err, rows) => {
+                if (err) return cb(err);
+                const more = rows.length > CHANGES_PAGE_MAX;
+                const data = more ? rows.slice(0, CHANGES_PAGE_MAX) : rows;
+                const lastId = data.length ? data[data.length - 1].id : sinceId;
+
+                // Filas modificadas (id ya visto con baja nueva) que siguen existiendo
+                const changed = deleted.filter(id => id <= sinceId);
+                if (!changed.length) return cb(null, { data, deleted, lastId, lastDeleted, more });
+                db.all('SELECT * FROM transacciones WHERE user_id = ? AND id IN (SELECT value FROM json_each(?)) ORDER BY id',
+                    [userId, JSON.stringify(changed)], (err, current) => {
+                        if (err) return cb(err);
+                        cb(null, { data: current.concat(data), deleted, lastId, lastDeleted, more });
+                    });
+            });
+    });
+}
+
+module.exports = { transactionChanges, CHANGES_PAGE_MAX };
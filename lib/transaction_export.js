@@ -0,0 +1,74 @@
+/**
+ * Exportación de Transacciones en Stream
+ * - Recorre el resultado por páginas keyset sobre (fecha DESC, id DESC), las mismas que el listado
+ *   paginado (`transactionPageSQL`, fechas NULL legadas al final), y escribe cada fila directo
+ *   en la respuesta (CSV o NDJSON).
+ * - Backpressure: si `res.write` devuelve false se espera 'drain' antes de pedir la siguiente
+ *   página, así la memoria queda acotada a una página sin importar el tamaño del historial.
+ * - Cada página es una consulta corta: no se mantiene abierta una lectura durante toda la descarga
+ *   (filas insertadas durante la exportación pueden aparecer o no).
+ */
+
+const { transactionPageSQL, toApiTransaction } = require('./storage_units');
+
+const EXPORT_PAGE_SIZE = 1000;
+const CSV_COLUMNS = ['id', 'fecha', 'tipo', 'categoria', 'monto', 'descripcion'];
+
+const FORMATS = {
+    csv: {
+        contentType: 'text/csv; charset=utf-8',
+        header: CSV_COLUMNS.join(',') + '\n',
+        row: r => CSV_COLUMNS.map(c => csvField(r[c])).join(',') + '\n'
+    },
+    ndjson: {
+        contentType: 'application/x-ndjson; charset=utf-8',
+        header: '',
+        row: r => JSON.stringify({ id: r.id, fecha: r.fecha, tipo: r.tipo, categoria: r.categoria, monto: r.monto, descripcion: r.descripcion }) + '\n'
+    }
+};
+
+function csvField(value) {
+    if (value === null || value === undefined) return '';
+    const text = String(value);
+    return /[",\r\n]/.test(text) ? `"${text.replace(/"/g, '""')}"` : text;
+}
+
+/**
+ * Escribe en `res` las transacciones que cumplen `where`/`params` (de buildTransactionFilters).
+ * @param {string} format 'csv' | 'ndjson' (validado por el llamador)
+ */
+function exportTransactions(db, res, { where, params, format, filename = 'transacciones' }) {
+    const fmt = FORMATS[format];
+    let closed = false;
+    res.on('close', () => { closed = true; });
+
+    res.writeHead(200, {
+        'Content-Type': fmt.contentType,
+        'Content-Disposition': `attachment; filename="${filename}.${format === 'csv' ? 'csv' : 'ndjson'}"`,
+        'Cache-Control': 'no-store'
+    });
+    if (fmt.header) res.write(fmt.header);
+
+    const nextPage = (cursor) => {
+        if (closed) return;
+        const page = transactionPageSQL('id, fecha, tipo, categoria, monto, descripcion', where, params, cursor, EXPORT_PAGE_SIZE);
+        db.all(page.sql, page.params, (err, rows) => {
+            if (closed) return;
+            // Los headers ya salieron: cortar la conexión para que el cliente vea la descarga incompleta
+            if (err) return res.destroy(err);
+
+            // El cursor usa la fecha almacenada (yyyymmdd), antes de pasar las filas al formato de la API
+            const last = rows.length ? { fecha: rows[rows.length - 1].fecha, id: rows[rows.length - 1].id } : null;
+            let chunk = '';
+            for (const row of rows) chunk += fmt.row(toApiTransaction(row));
+            if (rows.length < EXPORT_PAGE_SIZE) return res.end(chunk);
+
+            const next = () => nextPage(last);
+            if (res.write(chunk)) setImmediate(next);
+            else res.once('drain', next);
+        });
+    };
+    nextPage(null);
+}
+
+module.exports = { exportTransactions, EXPORT_FORMATS: Object.keys(FORMATS) };
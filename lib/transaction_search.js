@@ -0,0 +1,106 @@
+/**
+ * Búsqueda de Texto Completo en Transacciones (FTS5, migración 5)
+ * - `transacciones_fts` indexa descripción y categoría sin acentos ni mayúsculas ("fisica" encuentra
+ *   "Física") y el user_id como token: el MATCH ya viene acotado al usuario.
+ * - Cada palabra de `q` se busca como prefijo ("libro" encuentra "Libros") y todas deben aparecer.
+ *   En el MATCH va a lo sumo su prefijo de FTS_PREFIX letras (prefix = '2 3 4' en el índice): un
+ *   prefijo más largo haría que FTS5 recorra la lista de esa palabra de todos los usuarios. Los
+ *   candidatos (solo del usuario) se verifican después con la palabra completa.
+ * - Ranking: primero las filas donde todas las palabras están en la descripción, luego las que
+ *   coinciden por categoría; dentro de cada grupo, más recientes primero. No se usa bm25: calcula
+ *   frecuencias sobre todo el índice en cada consulta y su costo crece con la base, no con el usuario.
+ * - El texto del usuario nunca llega como sintaxis FTS: se parte en palabras y cada una va entre comillas.
+ */
+
+const SEARCH_PAGE_DEFAULT = 50;
+const SEARCH_PAGE_MAX = 200;
+const SEARCH_MAX_TERMS = 8;
+const SEARCH_MAX_CANDIDATES = 5000; // coincidencias más recientes que se rankean por búsqueda
+const FTS_PREFIX = 4;
+
+/** Minúsculas sin acentos, como el tokenizer `unicode61 remove_diacritics 2`. */
+function normalize(text) {
+    return String(text || '').normalize('NFD').replace(/\p{M}/gu, '').toLowerCase();
+}
+
+function words(text) {
+    return normalize(text).split(/[^\p{L}\p{N}]+/u).filter(Boolean);
+}
+
+/** Palabras buscables de `q` (normalizadas); [] si no hay ninguna. */
+function parseQuery(q) {
+    return [...new Set(words(q))].slice(0, SEARCH_MAX_TERMS);
+}
+
+/** Expresión MATCH acotada al usuario. Palabras de una letra van exactas (como prefijo coincidirían con casi todo). */
+function buildMatchQuery(userId, terms) {
+    const phrases = terms.map(t => t.length > 1 ? `"${t.slice(0, FTS_PREFIX)}"*` : `"${t}"`);
+    return `user_id : "${userId}" AND {descripcion categoria} : (${phrases.join(' ')})`;
+}
+
+/** 0: todas las palabras en la descripción, 1: alguna solo en la categoría, -1: no coincide. */
+function rankRow(row, terms) {
+    const descripcion = words(row.descripcion);
+    const categoria = words(row.categoria);
+    const has = (list, term) => list.some(w => term.length > 1 ? w.startsWith(term) : w === term);
+    let tier = 0;
+    for (const term of terms) {
+        if (has(descripcion, term)) continue;
+        if (!has(categoria, term)) return -1;
+        tier = 1;
+    }
+    return tier;
+}
+
+// Cursor opaco keyset sobre (grupo, fecha, id) con la fecha almacenada (yyyymmdd)
+function encodeSearchCursor(tier, row) {
+    return Buffer.from(JSON.stringify([tier, row.fecha, row.id])).toString('base64url');
+}
+
+function decodeSearchCursor(cursor) {
+    try {
+        const [tier, fecha, id] = JSON.parse(Buffer.from(cursor, 'base64url').toString());
+        if ((tier === 0 || tier === 1) && (fecha === null || Number.isInteger(fecha)) && Number.isInteger(id)) return { tier, fecha, id };
+    } catch { }
+    return null;
+}
+
+// Mismo orden que el listado (fecha DESC, id DESC; fecha NULL al final) dentro de cada grupo
+function isAfter(tier, row, cursor) {
+    if (tier !== cursor.tier) return tier > cursor.tier;
+    const fecha = row.fecha ?? -1, cursorFecha = cursor.fecha ?? -1;
+    return fecha < cursorFecha || (fecha === cursorFecha && row.id < cursor.id);
+}
+
+/**
+ * Una página de resultados (filas crudas de transacciones, con `fecha`/`monto` almacenados).
+ * @param {Object} opts { userId, terms, where, params, cursor, limit } (`where`/`params` de buildTransactionFilters)
+ * @param {Function} cb (err, { rows, nextCursor, truncated }) `truncated`: había más de SEARCH_MAX_CANDIDATES
+ */
+function searchTransactions(db, { userId, terms, where, params, cursor, limit }, cb) {
+    // CROSS JOIN fija el orden: primero el MATCH y luego cada fila por id. Con JOIN el planificador
+    // prefiere recorrer las transacciones del usuario por índice y consultar FTS fila por fila.
+    db.all(`SELECT t.* FROM (SELECT rowid AS fts_id FROM transacciones_fts WHERE transacciones_fts MATCH ?) m
+            CROSS JOIN transacciones t ON t.id = m.fts_id
+            WHERE ${where.join(' AND ')}
+            ORDER BY t.fecha DESC, t.id DESC LIMIT ?`,
+        [buildMatchQuery(userId, terms), ...params, SEARCH_MAX_CANDIDATES + 1], (err, rows) => {
+            if (err) return cb(err);
+            const truncated = rows.length > SEARCH_MAX_CANDIDATES;
+            const ranked = [[], []];
+            for (const row of truncated ? rows.slice(0, SEARCH_MAX_CANDIDATES) : rows) {
+                const tier = rankRow(row, terms);
+                if (tier >= 0 && (!cursor || isAfter(tier, row, cursor))) ranked[tier].push(row);
+            }
+            const matches = ranked[0].length + ranked[1].length;
+            const page = [...ranked[0], ...ranked[1]].slice(0, limit);
+            const last = page[page.length - 1];
+            const nextCursor = matches > limit ? encodeSearchCursor(page.length > ranked[0].length ? 1 : 0, last) : null;
+            cb(null, { rows: page, nextCursor, truncated });
+        });
+}
+
+module.exports = {
+    SEARCH_PAGE_DEFAULT, SEARCH_PAGE_MAX,
+    parseQuery, buildMatchQuery, decodeSearchCursor, searchTransactions
+};
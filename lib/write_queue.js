@@ -0,0 +1,129 @@
+/**
+ * Cola de Escrituras (group commit)
+ * - Todas las escrituras de negocio pasan por una conexión dedicada (`writer`) en modo WAL;
+ *   las lecturas siguen en la conexión principal y solo ven datos ya confirmados.
+ * - Los trabajos que llegan mientras otro lote está en curso se agrupan en una única
+ *   transacción `BEGIN IMMEDIATE` (un solo fsync por lote en vez de uno por sentencia).
+ * - Cada trabajo corre dentro de su propio SAVEPOINT: si falla, se deshace solo ese trabajo
+ *   y el resto del lote se confirma igual.
+ * - Los callbacks se invocan recién después del COMMIT, nunca antes de que el dato sea durable.
+ */
+
+const DEFAULT_MAX_BATCH = 256;
+
+/** Error de negocio con status HTTP (ej. 400 "Fondos insuficientes"); deshace el trabajo. */
+class WriteRejected extends Error {
+    constructor(message, status = 400) {
+        super(message);
+        this.status = status;
+    }
+}
+
+class WriteQueue {
+    constructor(db, { maxBatch = DEFAULT_MAX_BATCH } = {}) {
+        this.db = db;
+        this.maxBatch = maxBatch;
+        this.queue = [];        // { work, callback }
+        this.running = false;
+        this.scheduled = false;
+        this.stats = { batches: 0, jobs: 0, failed: 0 };
+    }
+
+    /**
+     * Encola una unidad de trabajo atómica.
+     * @param {Function} work (db, done) => void. Usa `db.run/get/all` en secuencia y llama
+     *        `done(err, result)` una sola vez; con error se deshace todo lo que hizo.
+     * @param {Function} callback (err, result), después del COMMIT del lote.
+     */
+    transaction(work, callback) {
+        this.queue.push({ work, callback });
+        this._schedule();
+    }
+
+    /** Atajo para una sola sentencia; el callback recibe `this` = { lastID, changes } como en sqlite3. */
+    run(sql, params, callback) {
+        this.transaction((db, done) => {
+            db.run(sql, params, function (err) {
+                done(err, { lastID: this && this.lastID, changes: this && this.changes });
+            });
+        }, (err, result) => callback && callback.call(result || {}, err));
+    }
+
+    /** Espera a que se vacíe la cola (cierre ordenado). */
+    drain(callback) {
+        if (!this.running && this.queue.length === 0) return callback();
+        this.transaction((db, done) => done(), () => callback());
+    }
+
+    _schedule() {
+        if (this.running || this.scheduled) return;
+        this.scheduled = true;
+        // setImmediate: lo que llega en el mismo tick del event loop entra en el mismo lote
+        setImmediate(() => {
+            this.scheduled = false;
+            this._runBatch();
+        });
+    }
+
+    _runBatch() {
+        if (this.running || this.queue.length === 0) return;
+        this.running = true;
+        const batch = this.queue.splice(0, this.maxBatch);
+        const results = [];
+
+        const finish = (commitErr) => {
+            this.running = false;
+            this.stats.batches++;
+            this.stats.jobs += batch.length;
+            batch.forEach((job, i) => {
+                const [err, result] = commitErr ? [commitErr] : results[i];
+                if (err) this.stats.failed++;
+                if (job.callback) job.callback(err || null, result);
+            });
+            if (this.queue.length) this._schedule();
+        };
+
+        const abort = (err) => this.db.run('ROLLBACK', () => finish(err));
+
+        this.db.run('BEGIN IMMEDIATE', (err) => {
+            if (err) return finish(err);
+            const next = (i) => {
+                if (i === batch.length) {
+                    return this.db.run('COMMIT', (err) => err ? abort(err) : finish(null));
+                }
+                this._runJob(batch[i], (fatal, err, result) => {
+                    if (fatal) return abort(fatal);
+                    results[i] = [err, result];
+                    next(i + 1);
+                });
+            };
+            next(0);
+        });
+    }
+
+    /** Corre un trabajo en su SAVEPOINT. `fatal` indica que la transacción del lote quedó inutilizable. */
+    _runJob(job, callback) {
+        this.db.run('SAVEPOINT job', (err) => {
+            if (err) return callback(err);
+            let called = false;
+            const done = (err, result) => {
+                if (called) return;
+                called = true;
+                if (!err) {
+                    return this.db.run('RELEASE job', (releaseErr) => releaseErr ? callback(releaseErr) : callback(null, null, result));
+                }
+                this.db.run('ROLLBACK TO job', (rollbackErr) => {
+                    if (rollbackErr) return callback(rollbackErr);
+                    this.db.run('RELEASE job', (releaseErr) => releaseErr ? callback(releaseErr) : callback(null, err));
+                });
+            };
+            try {
+                job.work(this.db, done);
+            } catch (e) {
+                done(e);
+            }
+        });
+    }
+}
+
+module.exports = { WriteQueue, WriteRejected };
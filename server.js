@@ -2,24 +2,76 @@
  * Servidor API REST Multi-Usuario Nivel 3 (SQLite Server-Side)
  * Soporte para aislamiento de datos por usuario (Row-Level Security)
  */
+// Antes de cualquier require: libuv fija el tamaño de su threadpool (4 hilos por defecto, compartidos
+// con fs/zlib) la primera vez que lo usa, y el pool de lectura corre ahí.
+const READ_POOL_SIZE = parseInt(process.env.READ_POOL_SIZE, 10) || 4; // conexiones de solo lectura por proceso
+process.env.UV_THREADPOOL_SIZE = process.env.UV_THREADPOOL_SIZE || String(READ_POOL_SIZE + 4);
+
 const http = require('http');
+const cluster = require('cluster');
+const crypto = require('crypto');
 const fs = require('fs');
 const path = require('path');
-const bcrypt = require('bcryptjs');
 const cookie = require('cookie');
-const crypto = require('crypto');
 const sqlite3 = require('sqlite3').verbose();
-
-const PORT = 3000;
+const { SessionStore, DEFAULT_TTL_MS } = require('./lib/session_store');
+const { PasswordPool, PoolBusyError } = require('./lib/password_pool');
+const { StaticAssets } = require('./lib/static_assets');
+const { WriteQueue, WriteRejected } = require('./lib/write_queue');
+const { importTransactions, detectFormat } = require('./lib/bulk_import');
+const { exportTransactions, EXPORT_FORMATS } = require('./lib/transaction_export');
+const { SEARCH_PAGE_DEFAULT, SEARCH_PAGE_MAX, parseQuery, decodeSearchCursor, searchTransactions } = require('./lib/transaction_search');
+const { transactionChanges } = require('./lib/transaction_changes');
+const { Metrics, mergeExpositions } = require('./lib/metrics');
+const { DataVersions } = require('./lib/data_versions');
+const { ChangeEvents } = require('./lib/change_events');
+const { ReadPool } = require('./lib/read_pool');
+const { runPrimary, ClusterBus } = require('./lib/cluster');
+const { toDay, toMonth, monthDays, toCents, fromCents, transactionPageSQL, toApiTransaction } = require('./lib/storage_units');
+const { TABLES, MIGRATIONS } = require('./lib/schema');
+
+const PORT = parseInt(process.env.PORT, 10) || 3000;
 const DATA_DIR = path.join(__dirname, 'data');
-const DB_FILE = path.join(DATA_DIR, 'finanzas.sqlite');
-const SESSIONS_FILE = path.join(DATA_DIR, 'sessions.json');
+const DB_FILE = process.env.DB_FILE || path.join(DATA_DIR, 'finanzas.sqlite'); // DB_FILE: datasets de benchmark (tests/gen_dataset.py)
+const SESSIONS_FILE = path.join(DATA_DIR, 'sessions.json'); // Legado: se importa a la tabla sesiones
+const SESSION_TTL_MS = (parseFloat(process.env.SESSION_TTL_HOURS) * 60 * 60 * 1000) || DEFAULT_TTL_MS;
+const METRICS_TOKEN = process.env.METRICS_TOKEN || ''; // Bearer para scrapers sin sesión (Prometheus)
+const WORKERS = parseInt(process.env.WORKERS, 10) || 1; // >1: modo cluster (un proceso por worker)
+
+// --- Modo cluster: el primario solo supervisa workers (no abre la base ni escucha) ---
+if (WORKERS > 1 && cluster.isPrimary) return runPrimary(WORKERS);
 
 // --- Asegurar directorio data ---
 if (!fs.existsSync(DATA_DIR)) fs.mkdirSync(DATA_DIR, { recursive: true });
 
 // --- Inicializar DB SQLite ---
+// `db`: migraciones, login y sesiones. `readPool`: lecturas de la API (conexiones de solo lectura).
+// `writer`: escrituras de negocio vía `writeQueue` (group commit).
+// En WAL los lectores no bloquean al escritor ni ven transacciones sin confirmar.
 const db = new sqlite3.Database(DB_FILE);
+const writer = new sqlite3.Database(DB_FILE);
+db.configure('busyTimeout', 5000);
+writer.configure('busyTimeout', 5000);
+const writeQueue = new WriteQueue(writer);
+
+// Mensajes entre workers (local si no hay cluster): versiones de datos, sesiones y métricas
+const bus = new ClusterBus();
+const dataVersions = new DataVersions(bus); // ETag de listados por usuario (sube con cada escritura)
+const changeEvents = new ChangeEvents(dataVersions); // Streams SSE por usuario (GET /api/events)
+
+// --- Instrumentación (GET /api/metrics) ---
+const metrics = new Metrics({ slowQueryMs: process.env.SLOW_QUERY_MS ? parseFloat(process.env.SLOW_QUERY_MS) : null });
+metrics.instrumentDatabase(db, 'main');
+metrics.instrumentDatabase(writer, 'writer');
+const readPool = new ReadPool(DB_FILE, { size: READ_POOL_SIZE, instrument: (conn, name) => metrics.instrumentDatabase(conn, name) });
+metrics.addCollector(() => [
+    '# TYPE write_queue_batches_total counter', `write_queue_batches_total ${writeQueue.stats.batches}`,
+    '# TYPE write_queue_jobs_total counter', `write_queue_jobs_total ${writeQueue.stats.jobs}`,
+    '# TYPE write_queue_failed_total counter', `write_queue_failed_total ${writeQueue.stats.failed}`,
+    '# TYPE write_queue_pending gauge', `write_queue_pending ${writeQueue.queue.length}`,
+    '# TYPE sse_streams_open gauge', `sse_streams_open ${changeEvents.size}`
+]);
+bus.on('metrics', () => metrics.render());
 
 /**
  * Define las categorías por defecto para nuevos usuarios.
@@ -31,48 +83,61 @@ const DEFAULT_CATEGORIES = [
     { nombre: 'Otros', tipo: 'gasto' }
 ];
 
+const MIGRATION_CHECK_SHOWN = 20; // filas listadas cuando un `check` bloquea una migración
+
+/**
+ * Aplica las migraciones pendientes. Si una migración define `check` (consulta de filas que no
+ * puede convertir sin perder datos) y devuelve filas, las lista y termina sin tocar la base.
+ */
+function runMigrations(done) {
+    db.get('PRAGMA user_version', (err, row) => {
+        if (err) {
+            console.error('[DB] No se pudo leer user_version:', err.message);
+            process.exit(1);
+        }
+        const pending = MIGRATIONS.filter(m => m.version > row.user_version);
+
+        const apply = (i) => {
+            if (i >= pending.length) return done();
+            const m = pending[i];
+            if (!m.check) return migrate(m, i);
+            db.all(m.check, (err, rows) => {
+                if (err || rows.length > 0) {
+                    console.error(`[DB] No se puede aplicar la migración ${m.version} (${m.description}):`,
+                        err ? err.message : `${rows.length} filas con datos que se perderían`);
+                    (rows || []).slice(0, MIGRATION_CHECK_SHOWN).forEach(r => console.error('  ', JSON.stringify(r)));
+                    if (rows && rows.length > MIGRATION_CHECK_SHOWN) console.error(`   ... y ${rows.length - MIGRATION_CHECK_SHOWN} más`);
+                    return process.exit(1);
+                }
+                migrate(m, i);
+            });
+        };
+        const migrate = (m, i) => {
+            db.exec(`BEGIN; ${m.sql}; PRAGMA user_version = ${m.version}; COMMIT;`, (err) => {
+                if (err) {
+                    // Sin el esquema esperado el servidor no puede atender requests
+                    console.error(`[DB] Falló migración ${m.version} (${m.description}):`, err.message);
+                    return db.exec('ROLLBACK', () => process.exit(1));
+                }
+                console.log(`[DB] Migración ${m.version} aplicada: ${m.description}`);
+                apply(i + 1);
+            });
+        };
+        apply(0);
+    });
+}
+
 /**
  * Inicializa y migra la estructura de la base de datos.
+ * @param {Function} done Se llama cuando todas las migraciones fueron aplicadas.
  */
-function initDB() {
+function initDB(done) {
     db.serialize(() => {
-        // 1. Tabla de Usuarios
-        db.run(`CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )`);
-
-        // 2. Tablas de Negocio con user_id
-        db.run(`CREATE TABLE IF NOT EXISTS transacciones (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL DEFAULT 1,
-            fecha TEXT, tipo TEXT, categoria TEXT, monto REAL, descripcion TEXT
-        )`);
-
-        db.run(`CREATE TABLE IF NOT EXISTS categorias (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL DEFAULT 1,
-            nombre TEXT, tipo TEXT
-        )`);
-
-        db.run(`CREATE TABLE IF NOT EXISTS presupuestos_categoria (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL DEFAULT 1,
-            categoria TEXT, 
-            limite REAL DEFAULT 0,
-            UNIQUE(user_id, categoria)
-        )`);
-
-        db.run(`CREATE TABLE IF NOT EXISTS sobres (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL DEFAULT 1,
-            nombre TEXT, 
-            saldo REAL DEFAULT 0, 
-            icono TEXT,
-            UNIQUE(user_id, nombre)
-        )`);
+        // WAL es persistente en el archivo; lectores concurrentes con un único escritor
+        db.run('PRAGMA journal_mode = WAL');
+
+        // 1. Usuarios, 2. tablas de negocio con user_id (lib/schema.js)
+        TABLES.forEach(sql => db.run(sql));
 
         // Migración: Asegurar columnas user_id en tablas existentes (si vienen de v2)
         const tables = ['transacciones', 'categorias', 'presupuestos_categoria', 'sobres'];
@@ -85,35 +150,57 @@ function initDB() {
             });
         });
 
-        // Crear usuario admin default si no existe (Migración de users.json si es necesario)
-        // Nota: Si ya existía lógica auth anterior, asumimos que ID 1 es admin.
-        const adminPass = process.env.ADMIN_PASSWORD || 'Saul123!';
-        const hash = bcrypt.hashSync(adminPass, 10);
-        db.run(`INSERT OR IGNORE INTO users (id, username, password_hash) VALUES (1, 'admin', ?)`, [hash]);
+        // Migraciones versionadas (índices, etc.)
+        runMigrations(() => ensureAdminUser(() => {
+            console.log('[DB] Base de datos Multi-Usuario inicializada');
+            done();
+        }));
     });
-    console.log('[DB] Base de datos Multi-Usuario inicializada');
 }
-initDB();
 
-// --- Auth System (Sessions Memory) ---
-let sessions = {};
-if (fs.existsSync(SESSIONS_FILE)) {
-    try { sessions = JSON.parse(fs.readFileSync(SESSIONS_FILE)); } catch (e) { sessions = {}; }
+/**
+ * Crear usuario admin default si no existe (Migración de users.json si es necesario)
+ * Nota: Si ya existía lógica auth anterior, asumimos que ID 1 es admin.
+ * Solo se calcula el hash (costoso) cuando la fila realmente falta.
+ */
+function ensureAdminUser(done) {
+    db.get("SELECT id FROM users WHERE id = 1", (err, row) => {
+        if (err || row) return done();
+        const adminPass = process.env.ADMIN_PASSWORD || 'Saul123!';
+        passwordPool.hash(adminPass, 10).then(hash => {
+            db.run(`INSERT OR IGNORE INTO users (id, username, password_hash) VALUES (1, 'admin', ?)`, [hash], () => done());
+        }).catch(err => {
+            // Sin admin no hay con qué entrar: mejor no arrancar
+            console.error('[Auth] No se pudo crear el usuario admin:', err.message);
+            process.exit(1);
+        });
+    });
 }
-function saveSessions() { fs.writeFileSync(SESSIONS_FILE, JSON.stringify(sessions, null, 2)); }
+
+// --- Password Hashing (worker_threads, fuera del event loop) ---
+const passwordPool = new PasswordPool({
+    size: parseInt(process.env.BCRYPT_WORKERS, 10) || undefined
+});
+
+// --- Auth System (Session Store: SQLite + LRU + write-behind) ---
+const sessionStore = new SessionStore(db, { ttlMs: SESSION_TTL_MS });
+bus.on('session', ({ token, session }) => {
+    if (session) return sessionStore.remember(token, session);
+    sessionStore.forget(token);
+    changeEvents.closeSession(token);
+});
 
 /**
  * Recupera la sesión activa.
- * @returns {Object|null} { userId, username, created }
+ * @returns {Promise<Object|null>} { userId, username, created, expires }
  */
 function getSession(req) {
     const cookies = cookie.parse(req.headers.cookie || '');
-    const token = cookies.auth_token;
-    return (token && sessions[token]) ? sessions[token] : null;
+    return sessionStore.get(cookies.auth_token);
 }
 
 // --- Helpers HTTP ---
-const MIME_TYPES = { '.html': 'text/html', '.js': 'text/javascript', '.css': 'text/css', '.png': 'image/png' };
+const staticAssets = new StaticAssets(__dirname);
 
 function parseJSON(req) {
     return new Promise(resolve => {
@@ -125,9 +212,134 @@ function parseJSON(req) {
     });
 }
 
-function sendJSON(res, data, status = 200) {
-    res.writeHead(status, { 'Content-Type': 'application/json' });
-    res.end(JSON.stringify(data));
+// En cluster junta las exposiciones de todos los workers (label `worker`)
+function sendMetrics(res) {
+    bus.publish('metrics', {}, (payload, replies) => {
+        res.writeHead(200, { 'Content-Type': 'text/plain; version=0.0.4; charset=utf-8', 'Cache-Control': 'no-store' });
+        res.end(bus.enabled ? mergeExpositions(replies.map(r => ({ worker: r.worker, text: r.reply }))) : replies[0].reply);
+    });
+}
+
+function hasMetricsToken(req) {
+    if (!METRICS_TOKEN) return false;
+    const given = Buffer.from(req.headers.authorization || '');
+    const expected = Buffer.from(`Bearer ${METRICS_TOKEN}`);
+    return given.length === expected.length && crypto.timingSafeEqual(given, expected);
+}
+
+// Arreglos más grandes que esto se serializan por tramos, cediendo el event loop entre tramos
+const JSON_STREAM_THRESHOLD = 2000;
+const JSON_CHUNK_ROWS = 500;
+
+function sendJSON(res, data, status = 200, headers = {}) {
+    res.writeHead(status, { 'Content-Type': 'application/json', ...headers });
+    if (!Array.isArray(data) || data.length <= JSON_STREAM_THRESHOLD) return res.end(JSON.stringify(data));
+
+    // Un JSON.stringify de decenas de miles de filas bloquea a todos los demás requests:
+    // tramos de JSON_CHUNK_ROWS con setImmediate (y 'drain' si el cliente lee lento)
+    let closed = false;
+    res.on('close', () => { closed = true; });
+    const writeFrom = (start) => {
+        if (closed) return;
+        const end = Math.min(start + JSON_CHUNK_ROWS, data.length);
+        const chunk = (start === 0 ? '[' : ',') + JSON.stringify(data.slice(start, end)).slice(1, -1);
+        if (end === data.length) return res.end(chunk + ']');
+        if (res.write(chunk)) setImmediate(writeFrom, end);
+        else res.once('drain', () => writeFrom(end));
+    };
+    writeFrom(0);
+}
+
+/**
+ * GET condicional de listados: si `If-None-Match` coincide con la versión de datos del usuario
+ * responde 304 (sin tocar SQLite) y devuelve null; si no, los headers de caché para la respuesta.
+ */
+function conditionalGet(req, res, userId) {
+    const headers = { 'ETag': dataVersions.etag(userId), 'Cache-Control': 'private, no-cache' };
+    if (!dataVersions.matches(req, headers.ETag)) return headers;
+    res.writeHead(304, headers);
+    res.end();
+    return null;
+}
+
+/**
+ * Después de confirmar una escritura: sube la versión de datos y publica `events` en los streams
+ * SSE del usuario. Si cambian transacciones se agrega el balance global (O(meses) sobre
+ * resumen_mensual); sin cluster y sin streams abiertos esa lectura se omite.
+ */
+function publishChange(userId, events, done) {
+    const affectsBalance = events.some(e => e.type === 'transaccion');
+    if (!affectsBalance || (!bus.enabled && !changeEvents.has(userId))) return dataVersions.bump(userId, events, done);
+    readPool.get(`SELECT SUM(CASE WHEN tipo = 'ingreso' THEN total ELSE 0 END) AS income,
+                         SUM(CASE WHEN tipo = 'gasto' THEN total ELSE 0 END) AS expense
+                  FROM resumen_mensual WHERE user_id = ?`, [userId], (err, row) => {
+        // Sin balance el resto de los eventos igual sale: el cliente puede pedir /api/stats
+        if (!err && row) {
+            const income = row.income || 0, expense = row.expense || 0;
+            events.push({ type: 'balance', data: { income: fromCents(income), expense: fromCents(expense), balance: fromCents(income - expense) } });
+        }
+        dataVersions.bump(userId, events, done);
+    });
+}
+
+// --- Filtros de Transacciones ---
+const TX_PAGE_DEFAULT = 100;
+const TX_PAGE_MAX = 500;
+
+/**
+ * Traduce los query params (month, from, to, tipo, categoria) a un WHERE parametrizado.
+ * Las fechas son enteros yyyymmdd: un mes es un BETWEEN sobre el índice (user_id, fecha).
+ * @returns {Object} { where, params } o { error }
+ */
+function buildTransactionFilters(userId, query) {
+    const where = ['user_id = ?'];
+    const params = [userId];
+
+    if (query.get('month')) {
+        const month = toMonth(query.get('month'));
+        if (month === null) return { error: 'month debe ser YYYY-MM' };
+        where.push('fecha BETWEEN ? AND ?');
+        params.push(...monthDays(month));
+    }
+    if (query.get('from')) {
+        const from = toDay(query.get('from'));
+        if (from === null) return { error: 'from debe ser YYYY-MM-DD' };
+        where.push('fecha >= ?');
+        params.push(from);
+    }
+    if (query.get('to')) {
+        const to = toDay(query.get('to'));
+        if (to === null) return { error: 'to debe ser YYYY-MM-DD' };
+        where.push('fecha <= ?');
+        params.push(to);
+    }
+    const tipo = query.get('tipo');
+    if (tipo) {
+        if (tipo !== 'ingreso' && tipo !== 'gasto') return { error: 'tipo debe ser ingreso o gasto' };
+        where.push('tipo = ?');
+        params.push(tipo);
+    }
+    const categoria = query.get('categoria');
+    if (categoria) {
+        where.push('categoria = ?');
+        params.push(categoria);
+    }
+    return { where, params };
+}
+
+// Cursor opaco de paginación keyset sobre (fecha, id); `row` con la fecha almacenada (yyyymmdd)
+function encodeCursor(row) {
+    return Buffer.from(JSON.stringify([row.fecha, row.id])).toString('base64url');
+}
+
+function decodeCursor(cursor) {
+    try {
+        let [fecha, id] = JSON.parse(Buffer.from(cursor, 'base64url').toString());
+        if (typeof fecha === 'string') fecha = toDay(fecha) || undefined; // cursores emitidos antes de la migración 4
+        // fecha null: la página terminó en una fila legada sin fecha (ver transactionPageSQL)
+        if ((fecha === null || Number.isInteger(fecha)) && Number.isInteger(id)) return { fecha, id };
+    } catch { }
+    return null;
 }
 
 // --- Servidor HTTP ---
@@ -137,11 +349,14 @@ const server = http.createServer(async (req, res) => {
     res.setHeader('X-Frame-Options', 'DENY');
     res.setHeader('X-XSS-Protection', '1; mode=block');
 
-    const url = req.url.split('?')[0];
+    const [url, queryString] = req.url.split('?');
+    const query = new URLSearchParams(queryString || '');
     const method = req.method;
+    metrics.trackRequest(req, res, url);
 
     // --- PUBLIC ENDPOINTS ---
     if (url === '/api/login' && method === 'POST') return handleLogin(req, res);
+    if (url === '/api/metrics' && method === 'GET' && hasMetricsToken(req)) return sendMetrics(res);
 
     // Registro público deshabilitado por seguridad (Usar CLI: node create_user.js)
     if (url === '/api/register') {
@@ -150,54 +365,183 @@ const server = http.createServer(async (req, res) => {
 
     // --- PROTECTED ENDPOINTS ---
     if (url.startsWith('/api/')) {
-        const session = getSession(req);
+        const session = await getSession(req);
         if (!session) return sendJSON(res, { error: 'Unauthorized' }, 401);
         const userId = session.userId;
 
         if (url === '/api/me') return sendJSON(res, { username: session.username, id: userId });
+
+        // Stream de cambios del usuario (Server-Sent Events, lib/change_events.js)
+        if (url === '/api/events' && method === 'GET') {
+            const token = cookie.parse(req.headers.cookie || '').auth_token;
+            if (!changeEvents.subscribe(req, res, { userId, token })) {
+                return sendJSON(res, { error: 'Demasiados streams abiertos para este usuario' }, 429);
+            }
+            return;
+        }
+
+        // Métricas globales del proceso: solo admin (user 1) o Bearer METRICS_TOKEN
+        if (url === '/api/metrics' && method === 'GET') {
+            if (userId !== 1) return sendJSON(res, { error: 'Solo el administrador puede ver las métricas' }, 403);
+            return sendMetrics(res);
+        }
         if (url === '/api/logout') return handleLogout(req, res);
 
         // --- TRANSACTIONS ---
         if (url === '/api/transactions') {
             if (method === 'GET') {
-                db.all("SELECT * FROM transacciones WHERE user_id = ? ORDER BY fecha DESC, id DESC", [userId], (err, rows) => {
+                const filters = buildTransactionFilters(userId, query);
+                if (filters.error) return sendJSON(res, { error: filters.error }, 400);
+                const { where, params } = filters;
+                const cache = conditionalGet(req, res, userId);
+                if (!cache) return;
+
+                // Sin limit/cursor: lista completa (filtrada) como arreglo, compatible con clientes previos
+                const paginate = query.has('limit') || query.has('cursor');
+                if (!paginate) {
+                    readPool.all(`SELECT * FROM transacciones WHERE ${where.join(' AND ')} ORDER BY fecha DESC, id DESC`, params, (err, rows) => {
+                        if (err) return sendJSON(res, { error: err.message }, 500);
+                        rows.forEach(toApiTransaction);
+                        sendJSON(res, rows, 200, cache);
+                    });
+                    return;
+                }
+
+                const limit = Math.min(Math.max(parseInt(query.get('limit'), 10) || TX_PAGE_DEFAULT, 1), TX_PAGE_MAX);
+                const cursor = query.get('cursor') ? decodeCursor(query.get('cursor')) : null;
+                if (query.get('cursor') && !cursor) return sendJSON(res, { error: 'Cursor inválido' }, 400);
+                const page = transactionPageSQL('*', where, params, cursor, limit + 1);
+                readPool.all(page.sql, page.params, (err, rows) => {
                     if (err) return sendJSON(res, { error: err.message }, 500);
-                    sendJSON(res, rows);
+                    const hasMore = rows.length > limit;
+                    const data = hasMore ? rows.slice(0, limit) : rows;
+                    const nextCursor = hasMore ? encodeCursor(data[data.length - 1]) : null;
+                    sendJSON(res, { data: data.map(toApiTransaction), nextCursor }, 200, cache);
                 });
                 return;
             }
             if (method === 'POST') {
                 const data = await parseJSON(req);
-                const { fecha, tipo, categoria, monto, descripcion } = data;
-                db.run("INSERT INTO transacciones (user_id, fecha, tipo, categoria, monto, descripcion) VALUES (?,?,?,?,?,?)",
+                const { tipo, categoria, descripcion } = data;
+                const fecha = toDay(data.fecha);
+                const monto = toCents(data.monto);
+                if (fecha === null) return sendJSON(res, { error: 'fecha debe ser YYYY-MM-DD' }, 400);
+                if (monto === null) return sendJSON(res, { error: 'Monto inválido' }, 400);
+                writeQueue.run("INSERT INTO transacciones (user_id, fecha, tipo, categoria, monto, descripcion) VALUES (?,?,?,?,?,?)",
                     [userId, fecha, tipo, categoria, monto, descripcion],
                     function (err) {
                         if (err) return sendJSON(res, { error: err.message }, 500);
-                        sendJSON(res, { id: this.lastID, success: true });
+                        const transaccion = toApiTransaction({ id: this.lastID, fecha, tipo, categoria, monto, descripcion });
+                        publishChange(userId, [{ type: 'transaccion', data: { accion: 'alta', transaccion } }],
+                            () => sendJSON(res, { id: transaccion.id, success: true }));
                     }
                 );
                 return;
             }
         }
 
+        // Búsqueda de texto completo (FTS5) con los mismos filtros que el listado
+        if (url === '/api/transactions/search' && method === 'GET') {
+            const terms = parseQuery(query.get('q'));
+            if (!terms.length) return sendJSON(res, { error: 'q es obligatorio (al menos una palabra)' }, 400);
+            const filters = buildTransactionFilters(userId, query);
+            if (filters.error) return sendJSON(res, { error: filters.error }, 400);
+            let cursor = null;
+            if (query.get('cursor')) {
+                cursor = decodeSearchCursor(query.get('cursor'));
+                if (!cursor) return sendJSON(res, { error: 'Cursor inválido' }, 400);
+            }
+            const limit = Math.min(Math.max(parseInt(query.get('limit'), 10) || SEARCH_PAGE_DEFAULT, 1), SEARCH_PAGE_MAX);
+            const cache = conditionalGet(req, res, userId);
+            if (!cache) return;
+            searchTransactions(readPool, { userId, terms, ...filters, cursor, limit }, (err, page) => {
+                if (err) return sendJSON(res, { error: err.message }, 500);
+                sendJSON(res, { data: page.rows.map(toApiTransaction), nextCursor: page.nextCursor, truncated: page.truncated }, 200, cache);
+            });
+            return;
+        }
+
+        // Sincronización incremental: filas nuevas/modificadas y bajas desde las marcas del cliente
+        if (url === '/api/transactions/changes' && method === 'GET') {
+            const marks = ['since_id', 'since_deleted'].map(name => {
+                const value = query.get(name) || '0';
+                return /^\d{1,15}$/.test(value) ? Number(value) : null;
+            });
+            if (marks.includes(null)) return sendJSON(res, { error: 'since_id y since_deleted deben ser enteros >= 0' }, 400);
+            const cache = conditionalGet(req, res, userId);
+            if (!cache) return;
+            transactionChanges(readPool, { userId, sinceId: marks[0], sinceDeleted: marks[1] }, (err, changes) => {
+                if (err) return sendJSON(res, { error: err.message }, 500);
+                changes.data.forEach(toApiTransaction);
+                sendJSON(res, changes, 200, cache);
+            });
+            return;
+        }
+
+        // Exportación en stream (mismos filtros que el listado), memoria constante
+        if (url === '/api/transactions/export' && method === 'GET') {
+            const format = query.get('format') || 'csv';
+            if (!EXPORT_FORMATS.includes(format)) return sendJSON(res, { error: 'format debe ser csv o ndjson' }, 400);
+            const filters = buildTransactionFilters(userId, query);
+            if (filters.error) return sendJSON(res, { error: filters.error }, 400);
+            exportTransactions(readPool, res, { ...filters, format });
+            return;
+        }
+
+        // Carga masiva: NDJSON o CSV en stream, lotes transaccionales, errores por fila
+        if (url === '/api/transactions/bulk' && method === 'POST') {
+            const format = detectFormat(req.headers['content-type'], query.get('format'));
+            if (!format) return sendJSON(res, { error: 'Formato no soportado: use NDJSON (application/x-ndjson) o CSV (text/csv)' }, 415);
+            importTransactions(req, { queue: writeQueue, userId, format }, (err, result) => {
+                // Aun con error pueden haber quedado lotes confirmados
+                const { inserted } = result;
+                const events = inserted ? [{ type: 'transaccion', data: { accion: 'carga', insertadas: inserted } }] : [];
+                publishChange(userId, events, () => {
+                    if (err) return sendJSON(res, { error: err.message, inserted }, err.status || 500);
+                    sendJSON(res, result);
+                });
+            });
+            return;
+        }
+
         if (url.startsWith('/api/transactions/') && method === 'DELETE') {
             const id = url.split('/').pop();
-            db.run("DELETE FROM transacciones WHERE id = ? AND user_id = ?", [id, userId], (err) => {
+            writeQueue.run("DELETE FROM transacciones WHERE id = ? AND user_id = ?", [id, userId], function (err) {
                 if (err) return sendJSON(res, { error: err.message }, 500);
-                sendJSON(res, { success: true });
+                const events = this.changes ? [{ type: 'transaccion', data: { accion: 'baja', id: Number(id) } }] : [];
+                publishChange(userId, events, () => sendJSON(res, { success: true }));
             });
             return;
         }
 
         // --- STATS / DASHBOARD ---
         if (url === '/api/stats') {
-            db.all("SELECT tipo, SUM(monto) as total FROM transacciones WHERE user_id = ? GROUP BY tipo", [userId], (err, rows) => {
+            // O(meses) sobre los agregados mantenidos por triggers, no O(transacciones)
+            readPool.all("SELECT tipo, SUM(total) as total FROM resumen_mensual WHERE user_id = ? GROUP BY tipo", [userId], (err, rows) => {
+                if (err) return sendJSON(res, { error: err.message }, 500);
                 let income = 0, expense = 0;
                 rows.forEach(r => {
                     if (r.tipo === 'ingreso') income = r.total;
                     if (r.tipo === 'gasto') expense = r.total;
                 });
-                sendJSON(res, { income, expense, balance: income - expense });
+                sendJSON(res, { income: fromCents(income), expense: fromCents(expense), balance: fromCents(income - expense) });
+            });
+            return;
+        }
+
+        if (url === '/api/dashboard' && method === 'GET') {
+            const month = query.get('month') || new Date().toISOString().slice(0, 7);
+            if (toMonth(month) === null) return sendJSON(res, { error: 'month debe ser YYYY-MM' }, 400);
+
+            // Una pasada sobre resumen_mensual: totales globales y del mes por (tipo, categoría)
+            const sqlTotals = `SELECT tipo, categoria, SUM(total) AS global, SUM(CASE WHEN mes = ? THEN total ELSE 0 END) AS mes
+                FROM resumen_mensual WHERE user_id = ? GROUP BY tipo, categoria`;
+            readPool.all(sqlTotals, [toMonth(month), userId], (err, rows) => {
+                if (err) return sendJSON(res, { error: err.message }, 500);
+                readPool.all("SELECT categoria, limite FROM presupuestos_categoria WHERE user_id = ? ORDER BY id", [userId], (err, budgets) => {
+                    if (err) return sendJSON(res, { error: err.message }, 500);
+                    sendJSON(res, buildDashboard(month, rows, budgets));
+                });
             });
             return;
         }
@@ -205,27 +549,32 @@ const server = http.createServer(async (req, res) => {
         // --- CATEGORIES ---
         if (url === '/api/categories') {
             if (method === 'GET') {
-                db.all("SELECT * FROM categorias WHERE user_id = ? ORDER BY nombre", [userId], (err, rows) => {
+                const cache = conditionalGet(req, res, userId);
+                if (!cache) return;
+                readPool.all("SELECT * FROM categorias WHERE user_id = ? ORDER BY nombre", [userId], (err, rows) => {
                     if (err) return sendJSON(res, { error: err.message }, 500);
-                    sendJSON(res, rows);
+                    sendJSON(res, rows, 200, cache);
                 });
                 return;
             }
             if (method === 'POST') {
                 const data = await parseJSON(req);
-                db.run("INSERT INTO categorias (user_id, nombre, tipo) VALUES (?, ?, ?)",
+                writeQueue.run("INSERT INTO categorias (user_id, nombre, tipo) VALUES (?, ?, ?)",
                     [userId, data.nombre, data.tipo], function (err) {
                         if (err) return sendJSON(res, { error: err.message }, 500);
-                        sendJSON(res, { id: this.lastID, success: true });
+                        const categoria = { id: this.lastID, nombre: data.nombre, tipo: data.tipo };
+                        publishChange(userId, [{ type: 'categoria', data: { accion: 'alta', categoria } }],
+                            () => sendJSON(res, { id: categoria.id, success: true }));
                     });
                 return;
             }
         }
         if (url.startsWith('/api/categories/') && method === 'DELETE') {
             const id = url.split('/').pop();
-            db.run("DELETE FROM categorias WHERE id = ? AND user_id = ?", [id, userId], function (err) {
+            writeQueue.run("DELETE FROM categorias WHERE id = ? AND user_id = ?", [id, userId], function (err) {
                 if (err) return sendJSON(res, { error: err.message }, 500);
-                sendJSON(res, { success: true });
+                const events = this.changes ? [{ type: 'categoria', data: { accion: 'baja', id: Number(id) } }] : [];
+                publishChange(userId, events, () => sendJSON(res, { success: true }));
             });
             return;
         }
@@ -233,23 +582,30 @@ const server = http.createServer(async (req, res) => {
         // --- CATEGORY BUDGETS ---
         if (url === '/api/category-budgets') {
             if (method === 'GET') {
-                db.all("SELECT * FROM presupuestos_categoria WHERE user_id = ?", [userId], (err, rows) => {
+                const cache = conditionalGet(req, res, userId);
+                if (!cache) return;
+                readPool.all("SELECT * FROM presupuestos_categoria WHERE user_id = ?", [userId], (err, rows) => {
                     if (err) return sendJSON(res, { error: err.message }, 500);
-                    sendJSON(res, rows || []);
+                    rows.forEach(r => { r.limite = fromCents(r.limite); });
+                    sendJSON(res, rows, 200, cache);
                 });
                 return;
             }
             if (method === 'POST') {
                 const data = await parseJSON(req);
-                const stmt = db.prepare("INSERT OR REPLACE INTO presupuestos_categoria (user_id, categoria, limite) VALUES (?, ?, ?)");
-                for (const item of data) {
-                    if (item.categoria && typeof item.limite === 'number') {
-                        stmt.run([userId, item.categoria, item.limite]);
-                    }
-                }
-                stmt.finalize((err) => {
+                const items = (Array.isArray(data) ? data : []).filter(item => item.categoria && typeof item.limite === 'number' && toCents(item.limite) !== null);
+                // Todos los límites en una sola unidad atómica
+                writeQueue.transaction((tx, done) => {
+                    const next = (i) => {
+                        if (i === items.length) return done();
+                        tx.run("INSERT OR REPLACE INTO presupuestos_categoria (user_id, categoria, limite) VALUES (?, ?, ?)",
+                            [userId, items[i].categoria, toCents(items[i].limite)], (err) => err ? done(err) : next(i + 1));
+                    };
+                    next(0);
+                }, (err) => {
                     if (err) return sendJSON(res, { error: err.message }, 500);
-                    sendJSON(res, { success: true });
+                    const presupuestos = items.map(item => ({ categoria: item.categoria, limite: fromCents(toCents(item.limite)) }));
+                    publishChange(userId, [{ type: 'presupuesto', data: { presupuestos } }], () => sendJSON(res, { success: true }));
                 });
                 return;
             }
@@ -258,22 +614,27 @@ const server = http.createServer(async (req, res) => {
         // --- SAVINGS (SOBRES) ---
         if (url === '/api/savings') {
             if (method === 'GET') {
-                db.all("SELECT * FROM sobres WHERE user_id = ? ORDER BY nombre", [userId], (err, rows) => {
+                const cache = conditionalGet(req, res, userId);
+                if (!cache) return;
+                readPool.all("SELECT * FROM sobres WHERE user_id = ? ORDER BY nombre", [userId], (err, rows) => {
                     if (err) return sendJSON(res, { error: err.message }, 500);
-                    sendJSON(res, rows || []);
+                    rows.forEach(r => { r.saldo = fromCents(r.saldo); });
+                    sendJSON(res, rows, 200, cache);
                 });
                 return;
             }
             if (method === 'POST') {
                 const data = await parseJSON(req);
-                db.run("INSERT INTO sobres (user_id, nombre, saldo, icono) VALUES (?, ?, 0, ?)",
+                writeQueue.run("INSERT INTO sobres (user_id, nombre, saldo, icono) VALUES (?, ?, 0, ?)",
                     [userId, data.nombre, data.icono || '💰'],
                     function (err) {
                         if (err) {
                             if (err.message.includes('UNIQUE')) return sendJSON(res, { error: 'Ya existe un sobre con ese nombre' }, 400);
                             return sendJSON(res, { error: err.message }, 500);
                         }
-                        sendJSON(res, { id: this.lastID, success: true });
+                        const sobre = { id: this.lastID, nombre: data.nombre, saldo: 0, icono: data.icono || '💰' };
+                        publishChange(userId, [{ type: 'sobre', data: { accion: 'alta', sobre } }],
+                            () => sendJSON(res, { id: sobre.id, success: true }));
                     }
                 );
                 return;
@@ -287,40 +648,34 @@ const server = http.createServer(async (req, res) => {
             const action = savingsMatch[3];
 
             if (method === 'DELETE' && !action) {
-                db.get("SELECT saldo FROM sobres WHERE id = ? AND user_id = ?", [envelopeId, userId], (err, row) => {
-                    if (!row) return sendJSON(res, { error: 'Sobre no encontrado' }, 404);
-                    if (row.saldo > 0) return sendJSON(res, { error: 'No se puede eliminar un sobre con saldo' }, 400);
-
-                    db.run("DELETE FROM sobres WHERE id = ? AND user_id = ?", [envelopeId, userId], (err) => {
-                        if (err) return sendJSON(res, { error: err.message }, 500);
-                        sendJSON(res, { success: true });
+                // Verificación de saldo y borrado en la misma transacción (sin carrera con un depósito)
+                writeQueue.transaction((tx, done) => {
+                    tx.get("SELECT saldo FROM sobres WHERE id = ? AND user_id = ?", [envelopeId, userId], (err, row) => {
+                        if (err) return done(err);
+                        if (!row) return done(new WriteRejected('Sobre no encontrado', 404));
+                        if (row.saldo > 0) return done(new WriteRejected('No se puede eliminar un sobre con saldo'));
+                        tx.run("DELETE FROM sobres WHERE id = ? AND user_id = ?", [envelopeId, userId], done);
                     });
+                }, (err) => {
+                    if (err) return sendJSON(res, { error: err.message }, err.status || 500);
+                    publishChange(userId, [{ type: 'sobre', data: { accion: 'baja', id: Number(envelopeId) } }],
+                        () => sendJSON(res, { success: true }));
                 });
                 return;
             }
 
             if (method === 'PUT' && (action === 'deposit' || action === 'withdraw')) {
                 const data = await parseJSON(req);
-                const monto = parseFloat(data.monto);
+                const monto = toCents(data.monto);
                 if (!monto || monto <= 0) return sendJSON(res, { error: 'Monto inválido' }, 400);
 
-                // Validar propiedad del sobre
-                db.get("SELECT * FROM sobres WHERE id = ? AND user_id = ?", [envelopeId, userId], (err, envelope) => {
-                    if (!envelope) return sendJSON(res, { error: 'Sobre no encontrado' }, 404);
-
-                    if (action === 'deposit') {
-                        // Verificar fondos globales
-                        db.get("SELECT SUM(CASE WHEN tipo='ingreso' THEN monto ELSE -monto END) as total FROM transacciones WHERE user_id = ?", [userId], (err, row) => {
-                            const balance = (row && row.total) || 0;
-                            if (balance < monto) return sendJSON(res, { error: 'Fondos insuficientes' }, 400);
-
-                            // Ejecutar movimiento
-                            executeEnvelopeTransaction(userId, envelope, monto, 'deposit', res);
-                        });
-                    } else { // withdraw
-                        if (envelope.saldo < monto) return sendJSON(res, { error: 'Saldo insuficiente en sobre' }, 400);
-                        executeEnvelopeTransaction(userId, envelope, monto, 'withdraw', res);
-                    }
+                // Validación + UPDATE sobres + INSERT transacciones como una sola unidad atómica
+                writeQueue.transaction((tx, done) => executeEnvelopeTransaction(tx, userId, envelopeId, monto, action, done), (err, moved) => {
+                    if (err) return sendJSON(res, { error: err.message }, err.status || 500);
+                    publishChange(userId, [
+                        { type: 'sobre', data: { accion: 'saldo', id: moved.sobreId, saldo: fromCents(moved.saldo) } },
+                        { type: 'transaccion', data: { accion: 'alta', transaccion: toApiTransaction(moved.transaccion) } }
+                    ], () => sendJSON(res, { success: true }));
                 });
                 return;
             }
@@ -331,57 +686,127 @@ const server = http.createServer(async (req, res) => {
 
     // --- STATIC FILES ---
     let filePath = url === '/' ? '/index.html' : url;
-    if ((filePath === '/index.html' || filePath === '/') && !getSession(req)) {
+    if ((filePath === '/index.html' || filePath === '/') && !(await getSession(req))) {
         filePath = '/login.html';
     }
 
-    const realPath = path.join(__dirname, filePath);
-    if (!realPath.startsWith(__dirname)) return (res.writeHead(403), res.end());
+    // Servido desde memoria (ETag/304, gzip/brotli precalculados)
+    staticAssets.serve(req, res, filePath);
+});
 
-    fs.readFile(realPath, (err, content) => {
-        if (err) return (res.writeHead(404), res.end('Not Found'));
-        const ext = path.extname(realPath);
-        const headers = { 'Content-Type': MIME_TYPES[ext] || 'application/octet-stream' };
-        if (ext === '.js' || ext === '.css') headers['Cache-Control'] = 'no-cache, must-revalidate';
-        res.writeHead(200, headers);
-        res.end(content);
+/**
+ * Arma la respuesta de /api/dashboard a partir de los totales por (tipo, categoría).
+ * El gasto por categoría excluye 'Ahorro' (depósitos a sobres), que se reporta aparte en `savings`.
+ * Suma en céntimos (enteros, como están almacenados) y convierte solo al armar la respuesta.
+ */
+function buildDashboard(month, rows, budgets) {
+    let globalIncome = 0, globalExpense = 0, income = 0, expense = 0, savings = 0;
+    const spentByCategory = new Map();
+    rows.forEach(r => {
+        if (r.tipo === 'ingreso') { globalIncome += r.global; income += r.mes; }
+        if (r.tipo !== 'gasto') return;
+        globalExpense += r.global;
+        expense += r.mes;
+        if (r.categoria === 'Ahorro') savings += r.mes;
+        else if (r.mes) spentByCategory.set(r.categoria, r.mes);
     });
-});
 
-function executeEnvelopeTransaction(userId, envelope, monto, type, res) {
-    const isDeposit = type === 'deposit';
-    const sqlUpdate = `UPDATE sobres SET saldo = saldo ${isDeposit ? '+' : '-'} ? WHERE id = ?`;
+    const categories = budgets.map(b => ({ categoria: b.categoria, spent: fromCents(spentByCategory.get(b.categoria) || 0), limite: fromCents(b.limite) }));
+    [...spentByCategory.entries()]
+        .filter(([cat]) => !budgets.some(b => b.categoria === cat))
+        .sort((a, b) => b[1] - a[1])
+        .forEach(([categoria, spent]) => categories.push({ categoria, spent: fromCents(spent), limite: 0 }));
+
+    const spent = [...spentByCategory.values()].reduce((sum, v) => sum + v, 0);
+    const limit = budgets.reduce((sum, b) => sum + b.limite, 0);
+
+    return {
+        month,
+        income: fromCents(income),
+        expense: fromCents(expense),
+        balance: fromCents(globalIncome - globalExpense),
+        savings: fromCents(savings),
+        categories,
+        budget: { spent: fromCents(spent), limit: fromCents(limit), count: budgets.length }
+    };
+}
 
-    db.run(sqlUpdate, [monto, envelope.id], function (err) {
-        if (err) return sendJSON(res, { error: err.message }, 500);
+/**
+ * Depósito/retiro de un sobre dentro de un trabajo de `writeQueue` (BEGIN IMMEDIATE + SAVEPOINT).
+ * `monto` en céntimos, igual que `sobres.saldo` y `resumen_mensual.total`.
+ * Las verificaciones de saldo se leen en la misma transacción que escribe, así que dos
+ * movimientos concurrentes no pueden pasar ambos la verificación con el mismo saldo.
+ * `done(err, { sobreId, saldo, transaccion })` con el saldo nuevo y la fila insertada (almacenados).
+ */
+function executeEnvelopeTransaction(tx, userId, envelopeId, monto, type, done) {
+    const isDeposit = type === 'deposit';
 
-        const fecha = new Date().toISOString().split('T')[0];
-        const txType = isDeposit ? 'gasto' : 'ingreso'; // Depósito al sobre es gasto del balance disponible
-        const cat = isDeposit ? 'Ahorro' : 'Retiro Ahorro';
-        const desc = isDeposit ? `Depósito a sobre: ${envelope.nombre}` : `Retiro de sobre: ${envelope.nombre}`;
+    // Validar propiedad del sobre
+    tx.get("SELECT * FROM sobres WHERE id = ? AND user_id = ?", [envelopeId, userId], (err, envelope) => {
+        if (err) return done(err);
+        if (!envelope) return done(new WriteRejected('Sobre no encontrado', 404));
 
-        db.run("INSERT INTO transacciones (user_id, fecha, tipo, categoria, monto, descripcion) VALUES (?,?,?,?,?,?)",
-            [userId, fecha, txType, cat, monto, desc],
-            function (err) {
-                if (err) return sendJSON(res, { error: err.message }, 500);
-                sendJSON(res, { success: true });
+        const checkFunds = (next) => {
+            if (!isDeposit) {
+                return envelope.saldo < monto ? done(new WriteRejected('Saldo insuficiente en sobre')) : next();
             }
-        );
+            // Verificar fondos globales
+            tx.get("SELECT SUM(CASE WHEN tipo='ingreso' THEN total ELSE -total END) as total FROM resumen_mensual WHERE user_id = ?", [userId], (err, row) => {
+                if (err) return done(err);
+                const balance = (row && row.total) || 0;
+                if (balance < monto) return done(new WriteRejected('Fondos insuficientes'));
+                next();
+            });
+        };
+
+        checkFunds(() => {
+            const sqlUpdate = `UPDATE sobres SET saldo = saldo ${isDeposit ? '+' : '-'} ? WHERE id = ?`;
+            tx.run(sqlUpdate, [monto, envelope.id], (err) => {
+                if (err) return done(err);
+
+                const fecha = toDay(new Date().toISOString().split('T')[0]);
+                const txType = isDeposit ? 'gasto' : 'ingreso'; // Depósito al sobre es gasto del balance disponible
+                const cat = isDeposit ? 'Ahorro' : 'Retiro Ahorro';
+                const desc = isDeposit ? `Depósito a sobre: ${envelope.nombre}` : `Retiro de sobre: ${envelope.nombre}`;
+
+                tx.run("INSERT INTO transacciones (user_id, fecha, tipo, categoria, monto, descripcion) VALUES (?,?,?,?,?,?)",
+                    [userId, fecha, txType, cat, monto, desc], function (err) {
+                        if (err) return done(err);
+                        done(null, {
+                            sobreId: envelope.id,
+                            saldo: envelope.saldo + (isDeposit ? monto : -monto),
+                            transaccion: { id: this.lastID, fecha, tipo: txType, categoria: cat, monto, descripcion: desc }
+                        });
+                    });
+            });
+        });
     });
 }
 
 // --- Auth Handler (DB Based) ---
 async function handleLogin(req, res) {
     const { username, password } = await parseJSON(req);
-    db.get("SELECT * FROM users WHERE username = ?", [username], (err, user) => {
+    db.get("SELECT * FROM users WHERE username = ?", [username], async (err, user) => {
         if (err) return sendJSON(res, { error: err.message }, 500);
 
-        if (user && bcrypt.compareSync(password, user.password_hash)) {
-            const token = crypto.randomUUID();
-            sessions[token] = { userId: user.id, username: user.username, created: Date.now() }; // Store userId
-            saveSessions();
-            res.setHeader('Set-Cookie', cookie.serialize('auth_token', token, { httpOnly: true, path: '/' }));
-            sendJSON(res, { success: true });
+        let valid = false;
+        try {
+            valid = !!user && await passwordPool.compare(password, user.password_hash);
+        } catch (e) {
+            if (e instanceof PoolBusyError) {
+                res.setHeader('Retry-After', '1');
+                return sendJSON(res, { error: 'Servidor ocupado, intente de nuevo' }, 503);
+            }
+            return sendJSON(res, { error: e.message }, 500);
+        }
+
+        if (valid) {
+            const token = sessionStore.create(user);
+            // En cluster: responder cuando todos los workers conocen la sesión (aún no está en la tabla)
+            bus.publish('session', { token, session: sessionStore.entry(token) }, () => {
+                res.setHeader('Set-Cookie', cookie.serialize('auth_token', token, { httpOnly: true, path: '/', maxAge: Math.floor(SESSION_TTL_MS / 1000) }));
+                sendJSON(res, { success: true });
+            });
         } else {
             sendJSON(res, { error: 'Credenciales inválidas' }, 401);
         }
@@ -390,12 +815,33 @@ async function handleLogin(req, res) {
 
 function handleLogout(req, res) {
     const cookies = cookie.parse(req.headers.cookie || '');
-    if (cookies.auth_token) {
-        delete sessions[cookies.auth_token];
-        saveSessions();
-    }
-    res.setHeader('Set-Cookie', cookie.serialize('auth_token', '', { maxAge: 0, path: '/' }));
-    sendJSON(res, { success: true });
+    const done = () => {
+        res.setHeader('Set-Cookie', cookie.serialize('auth_token', '', { maxAge: 0, path: '/' }));
+        sendJSON(res, { success: true });
+    };
+    if (!cookies.auth_token) return done();
+    sessionStore.destroy(cookies.auth_token);
+    bus.publish('session', { token: cookies.auth_token, session: null }, done);
 }
 
-server.listen(PORT, '0.0.0.0', () => console.log(`Server Multi-User running on port ${PORT}`));
+initDB(() => readPool.open(err => {
+    if (err) {
+        console.error('[DB] No se pudo abrir el pool de lectura:', err.message);
+        process.exit(1);
+    }
+    sessionStore.importLegacyFile(SESSIONS_FILE);
+    sessionStore.start();
+    staticAssets.warm(['index.html', 'login.html', 'styles.css', 'js'])
+        .then(n => console.log(`[Static] ${n} archivos precargados`));
+    // En cluster: escuchar recién con el id de arranque y las versiones vigentes del primario
+    bus.ready(snapshot => {
+        dataVersions.restore(snapshot);
+        const worker = bus.enabled ? ` (worker ${bus.workerId}, pid ${process.pid})` : '';
+        server.listen(PORT, '0.0.0.0', () => console.log(`Server Multi-User running on port ${PORT}${worker}`));
+    });
+}));
+
+// Volcar sesiones pendientes antes de salir (docker stop envía SIGTERM)
+['SIGTERM', 'SIGINT'].forEach(signal => process.on(signal, () => {
+    sessionStore.stop(() => writeQueue.drain(() => readPool.close(() => writer.close(() => db.close(() => process.exit(0))))));
+}));
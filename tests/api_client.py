@@ -0,0 +1,357 @@
+"""
+API CLIENT - Cliente HTTP compartido para los scripts de prueba
+===============================================================
+Reemplaza las copias de `request()` de cada script:
+- Pool de conexiones persistentes (keep-alive) compartido por host:puerto.
+- Cookie jar por sesión (cada `Session` es un usuario/navegador distinto).
+- Hooks de medición alrededor de cada llamada (latencia, status, bytes).
+- Modo grabación: con `API_TRACE=/tmp/run.trace.gz` cualquier script graba cada
+  request (método, ruta, cuerpo, offset, sesión, status y latencia) en un trace
+  NDJSON compacto que reproduce `tests/replay_trace.py`.
+
+Uso:
+    from api_client import Session
+    s = Session('localhost', 3000)
+    s.add_hook(lambda sample: print(sample))
+    s.request('POST', '/login', {'username': 'admin', 'password': '...'})
+    s.request('GET', '/stats')  # -> {'status': 200, 'data': {...}, 'headers': {...}}
+    s.upload('POST', '/transactions/bulk', open('x.csv', 'rb'), 'text/csv')  # cuerpo en stream
+    stream = s.events(); read_event(stream)  # -> ('hola', {...}), SSE de /api/events
+
+    API_TRACE=/tmp/sim.trace.gz python3 tests/student_simulation.py --load 20   # grabar
+"""
+
+import atexit
+import gzip
+import http.client
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+# Muestra entregada a los hooks después de cada request
+Sample = namedtuple('Sample', 'method path status elapsed sent received')
+
+# Errores que indican que una conexión reutilizada fue cerrada por el servidor (keepAliveTimeout)
+STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                ConnectionResetError, BrokenPipeError, ConnectionAbortedError)
+
+
+class ConnectionPool:
+    """Pool thread-safe de `HTTPConnection` persistentes hacia un host:puerto."""
+
+    def __init__(self, host, port, maxsize=64, timeout=30):
+        self.host = host
+        self.port = port
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.idle = []
+        self.lock = threading.Lock()
+        self.created = 0
+
+    def acquire(self):
+        """Devuelve (conexión, reutilizada)."""
+        with self.lock:
+            if self.idle:
+                return self.idle.pop(), True
+        return self.connect(), False
+
+    def connect(self):
+        with self.lock:
+            self.created += 1
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def release(self, conn, reusable=True):
+        if reusable:
+            with self.lock:
+                if len(self.idle) < self.maxsize:
+                    self.idle.append(conn)
+                    return
+        conn.close()
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn in idle:
+            conn.close()
+
+
+def percentile(sorted_values, pct):
+    """Percentil `pct` (0-100) de una lista ya ordenada; 0.0 si está vacía."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def cents(amount):
+    """Monto de la API en céntimos enteros: el servidor suma en céntimos, los totales se comparan exactos."""
+    return round(amount * 100)
+
+
+def path_ids(path):
+    """('savings', [45]) para '/savings/45/deposit': recurso (primer segmento) e ids numéricos de la ruta."""
+    parts = path.split('?')[0].strip('/').split('/')
+    return parts[0], [int(p) for p in parts[1:] if p.isdigit()]
+
+def response_ids(data):
+    """Ids que devuelve una respuesta, en orden: `{"id"}`, `[{"id"}, ...]` o `{"data": [...]}`."""
+    if isinstance(data, dict):
+        if isinstance(data.get('data'), list):
+            data = data['data']
+        elif 'id' in data:
+            return [data['id']]
+        else:
+            return []
+    if isinstance(data, list):
+        return [row['id'] for row in data if isinstance(row, dict) and 'id' in row]
+    return []
+
+
+MAX_TRACED_UPLOAD = 1024 * 1024  # bytes de una carga que se guardan en el trace
+
+
+class Recorder:
+    """
+    Graba los requests de todas las sesiones en un trace NDJSON (gzip si termina en .gz).
+    Primera línea: encabezado. Luego un arreglo por request (el n-ésimo es el evento n):
+    [offset_ms, sesión, método, ruta, cuerpo, status, latencia_ms, refs]
+    `refs` = {"45": [evento, posición]}: de qué respuesta salió cada id usado en la ruta
+    (ej. el POST /savings que devolvió el sobre 45), para que el replayer use el id nuevo.
+    Las claves de login se guardan como null (el replayer las pide aparte).
+    Las cargas en stream (`Session.upload`) se graban con cuerpo
+    {"$upload": content-type, "bytes": n, "text": cuerpo | null}; el texto solo
+    si no pasa de MAX_TRACED_UPLOAD bytes (si no, el replayer no puede repetirla).
+    Solo graba en el proceso que lo creó (los hijos de multiprocessing no escriben).
+    """
+
+    def __init__(self, path, target=''):
+        self.path = path
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.sessions = 0
+        self.count = 0
+        self.seen = {}  # (recurso, id) -> [evento, posición] de la primera respuesta que lo trajo
+        self.t0 = time.perf_counter()
+        self.file = gzip.open(path, 'wt', encoding='utf-8') if path.endswith('.gz') else open(path, 'w', encoding='utf-8')
+        self.file.write(json.dumps({'format': 'saulfinanzas-trace', 'version': 1, 'target': target,
+                                    'recorded': datetime.now().isoformat(timespec='seconds')}) + '\n')
+
+    def record(self, session, method, path, body, started, status, elapsed, data):
+        if os.getpid() != self.pid or self.file is None:
+            return
+        if path == '/login' and isinstance(body, dict):
+            body = {**body, 'password': None}
+        with self.lock:
+            if session.trace_id is None:
+                session.trace_id = self.sessions
+                self.sessions += 1
+            resource, used = path_ids(path)
+            refs = {str(i): self.seen[(resource, i)] for i in used if (resource, i) in self.seen}
+            for pos, returned in enumerate(response_ids(data)):
+                self.seen.setdefault((resource, returned), [self.count, pos])
+            event = [round((started - self.t0) * 1000, 1), session.trace_id, method, path, body,
+                     status, round(elapsed * 1000, 2), refs or None]
+            self.file.write(json.dumps(event, ensure_ascii=False, separators=(',', ':')) + '\n')
+            self.count += 1
+
+    def close(self):
+        with self.lock:
+            if self.file is not None and os.getpid() == self.pid:
+                self.file.close()
+            self.file = None
+
+
+_RECORDER = None
+
+def start_recording(path, target=''):
+    """Graba desde ahora todas las `Session` nuevas (también lo activa la variable API_TRACE)."""
+    global _RECORDER
+    _RECORDER = Recorder(path, target)
+    atexit.register(_RECORDER.close)
+    return _RECORDER
+
+if os.environ.get('API_TRACE'):
+    start_recording(os.environ['API_TRACE'])
+
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+def get_pool(host, port):
+    """Pool compartido por todos los `Session` del mismo host:puerto."""
+    with _POOLS_LOCK:
+        key = (host, port)
+        if key not in _POOLS:
+            _POOLS[key] = ConnectionPool(host, port)
+        return _POOLS[key]
+
+
+class Session:
+    """Sesión de usuario: cookie jar propio sobre el pool compartido."""
+
+    def __init__(self, host='localhost', port=3000, prefix='/api', pool=None, recorder=None):
+        self.pool = pool or get_pool(host, port)
+        self.prefix = prefix
+        self.cookies = {}
+        self.hooks = []
+        self.recorder = recorder or _RECORDER
+        self.trace_id = None  # índice de sesión en el trace
+
+    def add_hook(self, hook):
+        """`hook(sample)` se llama tras cada request, también si falla (status None)."""
+        self.hooks.append(hook)
+        return hook
+
+    def _store_cookies(self, response):
+        for header in response.msg.get_all('Set-Cookie') or []:
+            name, _, value = header.split(';')[0].partition('=')
+            attrs = header.lower()
+            if not value or 'max-age=0' in attrs:
+                self.cookies.pop(name.strip(), None)
+            else:
+                self.cookies[name.strip()] = value.strip()
+
+    def _send(self, method, url, payload, headers):
+        conn, reused = self.pool.acquire()
+        try:
+            conn.request(method, url, body=payload, headers=headers)
+            res = conn.getresponse()
+            raw = res.read()
+        except STALE_ERRORS:
+            self.pool.release(conn, reusable=False)
+            if not reused:
+                raise
+            # El servidor cerró la conexión ociosa antes de leer el request: reintentar en una nueva
+            conn = self.pool.connect()
+            try:
+                conn.request(method, url, body=payload, headers=headers)
+                res = conn.getresponse()
+                raw = res.read()
+            except Exception:
+                conn.close()
+                raise
+        except Exception:
+            self.pool.release(conn, reusable=False)
+            raise
+        self.pool.release(conn, reusable=not res.will_close)
+        return res, raw
+
+    def _cookie_headers(self, headers):
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f"{k}={v}" for k, v in self.cookies.items())
+        return headers
+
+    def _result(self, res, raw):
+        self._store_cookies(res)
+        data = raw.decode('utf-8')
+        try: parsed = json.loads(data)
+        except ValueError: parsed = data
+        return {'status': res.status, 'data': parsed,
+                'headers': {k.lower(): v for k, v in res.getheaders()}}
+
+    def request(self, method, path, body=None, headers=None):
+        """
+        Ejecuta `method prefix+path` con `body` serializado a JSON.
+        @returns {'status', 'data' (JSON o texto), 'headers' (claves en minúscula)}
+        @raises OSError / http.client.HTTPException si no hay conexión
+        """
+        send_headers = self._cookie_headers({'Content-Type': 'application/json'})
+        if headers:
+            send_headers.update(headers)
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+
+        started = time.perf_counter()
+        status, received, result = None, 0, None
+        try:
+            res, raw = self._send(method, self.prefix + path, payload, send_headers)
+            status, received = res.status, len(raw)
+            result = self._result(res, raw)
+            return result
+        finally:
+            if self.recorder:
+                self.recorder.record(self, method, path, body, started, status, time.perf_counter() - started,
+                                     result and result['data'])
+            if self.hooks:
+                sample = Sample(method, path, status, time.perf_counter() - started,
+                                len(payload) if payload else 0, received)
+                for hook in self.hooks:
+                    hook(sample)
+
+    def upload(self, method, path, chunks, content_type):
+        """
+        Envía `chunks` (iterable de bytes, ej. un archivo abierto en 'rb') con
+        Transfer-Encoding: chunked, sin armar el cuerpo completo en memoria.
+        Usa siempre una conexión nueva: un iterable no se puede reenviar si falla.
+        """
+        sent = 0
+        kept = [] if self.recorder else None  # copia para el trace, hasta MAX_TRACED_UPLOAD
+        def counted():
+            nonlocal sent, kept
+            for chunk in chunks:
+                sent += len(chunk)
+                if kept is not None and sent <= MAX_TRACED_UPLOAD:
+                    kept.append(chunk)
+                else:
+                    kept = None
+                yield chunk
+
+        headers = self._cookie_headers({'Content-Type': content_type})
+        conn = self.pool.connect()
+        started = time.perf_counter()
+        status, received, result = None, 0, None
+        try:
+            conn.request(method, self.prefix + path, body=counted(), headers=headers, encode_chunked=True)
+            res = conn.getresponse()
+            raw = res.read()
+            status, received = res.status, len(raw)
+            self.pool.release(conn, reusable=not res.will_close)
+            result = self._result(res, raw)
+            return result
+        except Exception:
+            conn.close()
+            raise
+        finally:
+            if self.recorder:
+                text = b''.join(kept).decode('utf-8', 'replace') if kept is not None else None
+                self.recorder.record(self, method, path, {'$upload': content_type, 'bytes': sent, 'text': text},
+                                     started, status, time.perf_counter() - started, result and result['data'])
+            if self.hooks:
+                sample = Sample(method, path, status, time.perf_counter() - started, sent, received)
+                for hook in self.hooks:
+                    hook(sample)
+
+    def events(self, path='/events', timeout=10):
+        """
+        Abre un stream Server-Sent Events en una conexión propia (no vuelve al pool).
+        Leer con `read_event(stream)`; `stream.close()` corta la conexión.
+        """
+        conn = self.pool.connect()
+        conn.timeout = timeout
+        conn.request('GET', self.prefix + path, headers=self._cookie_headers({'Accept': 'text/event-stream'}))
+        stream = conn.getresponse()
+        if stream.status != 200:
+            body = stream.read().decode('utf-8', 'replace')
+            conn.close()
+            raise RuntimeError(f"GET {path}: {stream.status} {body[:200]}")
+        stream.close = conn.close  # cerrar también el socket (si no el servidor mantiene el stream)
+        return stream
+
+    def login(self, username, password):
+        return self.request('POST', '/login', {'username': username, 'password': password})
+
+
+def read_event(stream):
+    """Lee de un stream SSE (`Session.events`) hasta el próximo evento; devuelve (tipo, data JSON)."""
+    fields = {}
+    while True:
+        line = stream.readline()
+        if not line:
+            raise ConnectionError('Stream SSE cerrado por el servidor')
+        line = line.decode('utf-8').rstrip('\n')
+        if not line and 'event' in fields:
+            return fields['event'], json.loads(fields.get('data', 'null'))
+        if ': ' in line and not line.startswith(':'):
+            key, value = line.split(': ', 1)
+            fields[key] = value
@@ -0,0 +1,398 @@
+"""
+BENCHMARK - Suite de Endpoints con Baseline y Gate de Regresión
+===============================================================
+Mide cada ruta de .docs/API_REFERENCE.md (falla si alguna ruta documentada no
+tiene caso) contra datasets reproducibles de varios tamaños (tests/gen_dataset.py).
+Por cada tamaño: genera el dataset (con cache), levanta `node server.js` sobre
+una copia de trabajo (DB_FILE/PORT), hace iteraciones de calentamiento y luego
+las medidas, y guarda p50/p95/p99/media y bytes de respuesta en un historial JSON.
+
+Gate: compara con el baseline guardado y sale con código 1 si una métrica
+empeora más que --threshold (y más que --min-delta-ms, para ignorar ruido).
+
+Uso: python3 tests/bench_endpoints.py --sizes s,m --save-baseline     # fijar baseline
+     python3 tests/bench_endpoints.py --sizes s,m                     # comparar
+     python3 tests/bench_endpoints.py --live --iterations 50          # servidor ya levantado (sin gate de tamaño)
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import gen_dataset
+from api_client import Session, percentile, read_event
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_REFERENCE = os.path.join(REPO_DIR, '.docs', 'API_REFERENCE.md')
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_history.json')
+
+CONFIG = {
+    'host': 'localhost',
+    'port': 3100,
+    'user': 'admin',
+    'pass': gen_dataset.DEFAULT_PASSWORD
+}
+
+# Tamaño -> (usuarios, años). El benchmark usa al usuario 1 (admin).
+SIZES = {
+    's': (10, 1),
+    'm': (100, 2),
+    'l': (1000, 5),
+}
+MONTH = gen_dataset.DEFAULT_END[:7]
+
+class Colors:
+    PASS = '\033[92m'
+    FAIL = '\033[91m'
+    INFO = '\033[96m'
+    WARN = '\033[93m'
+    HEADER = '\033[95m'
+    ENDC = '\033[0m'
+
+def log(msg, color=Colors.INFO): print(f"{color}{msg}{Colors.ENDC}")
+
+def documented_routes():
+    """{(MÉTODO, /api/ruta)} de API_REFERENCE.md, sin query string."""
+    with open(API_REFERENCE, encoding='utf-8') as f:
+        return {(m, p.split('?')[0]) for m, p in re.findall(r'^\*\*([A-Z]+)\*\* `(/api/[^`]*)`', f.read(), re.M)}
+
+
+class Bench:
+    """Sesión del usuario de benchmark + registro de muestras por etiqueta."""
+
+    def __init__(self, session):
+        self.session = session
+        self.samples = {}    # etiqueta -> [(ms, bytes, status)]
+        self.recording = False
+        self.last = None
+        self.counter = 0
+        session.add_hook(self._hook)
+
+    def _hook(self, sample):
+        self.last = sample
+
+    def measure(self, label, method, path, body=None, expect=200, session=None):
+        session = session or self.session
+        if self._hook not in session.hooks:
+            session.add_hook(self._hook)
+        res = session.request(method, path, body)
+        if self.recording:
+            self.samples.setdefault(label, []).append((self.last.elapsed * 1000, self.last.received, res['status']))
+        if res['status'] != expect:
+            raise RuntimeError(f"{label}: status {res['status']} (esperado {expect}): {str(res['data'])[:200]}")
+        return res
+
+    def unique(self, prefix):
+        self.counter += 1
+        return f"{prefix}_{os.getpid()}_{self.counter}"
+
+
+# --- Casos: cada uno cubre una o más rutas documentadas ---
+# (rutas cubiertas, factor de iteraciones, función(bench, ctx))
+
+def case_login(b, ctx):
+    b.measure('POST /api/login', 'POST', '/login', {'username': CONFIG['user'], 'password': CONFIG['pass']},
+              session=Session(CONFIG['host'], CONFIG['port']))
+
+def case_logout(b, ctx):
+    session = Session(CONFIG['host'], CONFIG['port'])
+    session.login(CONFIG['user'], CONFIG['pass'])
+    b.measure('GET /api/logout', 'GET', '/logout', session=session)
+
+def case_reads(b, ctx):
+    b.measure('GET /api/me', 'GET', '/me')
+    b.measure('GET /api/transactions', 'GET', '/transactions')
+    b.measure('GET /api/transactions?month', 'GET', f'/transactions?month={MONTH}')
+    b.measure('GET /api/transactions?limit=100', 'GET', '/transactions?limit=100')
+    b.measure('GET /api/stats', 'GET', '/stats')
+    b.measure('GET /api/dashboard', 'GET', f'/dashboard?month={MONTH}')
+    b.measure('GET /api/categories', 'GET', '/categories')
+    b.measure('GET /api/category-budgets', 'GET', '/category-budgets')
+    b.measure('GET /api/savings', 'GET', '/savings')
+    b.measure('GET /api/metrics', 'GET', '/metrics')
+
+def case_search(b, ctx):
+    b.measure('GET /api/transactions/search?q', 'GET', '/transactions/search?q=almuerzo')
+    b.measure('GET /api/transactions/search?q&month', 'GET', f'/transactions/search?q=cena&month={MONTH}')
+
+def case_changes(b, ctx):
+    res = b.measure('GET /api/transactions/changes (completo)', 'GET', '/transactions/changes?since_id=0&since_deleted=0')
+    marks = f"since_id={res['data']['lastId']}&since_deleted={res['data']['lastDeleted']}"
+    b.measure('GET /api/transactions/changes (delta)', 'GET', f'/transactions/changes?{marks}')
+
+def case_events(b, ctx):
+    # Stream SSE: no termina, se mide hasta el primer evento y la entrega de una escritura
+    started = time.perf_counter()
+    stream = b.session.events()
+    if read_event(stream)[0] != 'hola':
+        raise RuntimeError("GET /api/events: falta el evento inicial")
+    connected = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    res = b.session.request('POST', '/transactions', {'fecha': f'{MONTH}-15', 'tipo': 'gasto', 'categoria': 'Otros',
+                                                      'monto': 1, 'descripcion': 'bench sse'})
+    while read_event(stream)[0] != 'transaccion':
+        pass
+    delivered = (time.perf_counter() - started) * 1000
+    stream.close()
+    b.session.request('DELETE', f"/transactions/{res['data']['id']}")
+    if b.recording:
+        b.samples.setdefault('GET /api/events (hola)', []).append((connected, 0, 200))
+        b.samples.setdefault('GET /api/events (entrega)', []).append((delivered, 0, 200))
+
+def case_export(b, ctx):
+    b.measure('GET /api/transactions/export?month', 'GET', f'/transactions/export?format=csv&month={MONTH}')
+
+def case_transaction_write(b, ctx):
+    res = b.measure('POST /api/transactions', 'POST', '/transactions', {
+        'fecha': f'{MONTH}-15', 'tipo': 'gasto', 'categoria': 'Otros', 'monto': 1, 'descripcion': 'bench'})
+    b.measure('DELETE /api/transactions/:id', 'DELETE', f"/transactions/{res['data']['id']}")
+
+def case_bulk(b, ctx):
+    rows = ''.join(json.dumps({'fecha': '1999-01-01', 'tipo': 'gasto', 'categoria': 'Otros', 'monto': 1,
+                               'descripcion': f'bulk {i}'}) + '\n' for i in range(100))
+    res = b.session.upload('POST', '/transactions/bulk', [rows.encode()], 'application/x-ndjson')
+    if b.recording:
+        b.samples.setdefault('POST /api/transactions/bulk (100)', []).append(
+            (b.last.elapsed * 1000, b.last.received, res['status']))
+    if res['status'] != 200 or res['data']['inserted'] != 100:
+        raise RuntimeError(f"bulk: {res['status']} {str(res['data'])[:200]}")
+
+def case_categories_write(b, ctx):
+    res = b.measure('POST /api/categories', 'POST', '/categories', {'nombre': b.unique('Bench'), 'tipo': 'gasto'})
+    b.measure('DELETE /api/categories/:id', 'DELETE', f"/categories/{res['data']['id']}")
+
+def case_budgets_write(b, ctx):
+    budgets = b.session.request('GET', '/category-budgets')['data']
+    b.measure('POST /api/category-budgets', 'POST', '/category-budgets',
+              [{'categoria': x['categoria'], 'limite': x['limite']} for x in budgets])
+
+def case_savings_write(b, ctx):
+    res = b.measure('POST /api/savings', 'POST', '/savings', {'nombre': b.unique('Bench'), 'icono': '🧪'})
+    b.measure('DELETE /api/savings/:id', 'DELETE', f"/savings/{res['data']['id']}")
+
+def case_envelope_moves(b, ctx):
+    if 'envelope' not in ctx:
+        res = b.session.request('POST', '/savings', {'nombre': b.unique('BenchSobre'), 'icono': '🧪'})
+        ctx['envelope'] = res['data']['id']
+    b.measure('PUT /api/savings/:id/deposit', 'PUT', f"/savings/{ctx['envelope']}/deposit", {'monto': 1})
+    b.measure('PUT /api/savings/:id/withdraw', 'PUT', f"/savings/{ctx['envelope']}/withdraw", {'monto': 1})
+
+# Lecturas primero: los casos de escritura agregan filas (al final no alteran lo ya medido)
+CASES = [
+    ({('POST', '/api/login')}, 0.2, case_login),
+    ({('GET', '/api/logout')}, 0.2, case_logout),
+    ({('GET', '/api/me'), ('GET', '/api/transactions'), ('GET', '/api/stats'), ('GET', '/api/dashboard'),
+      ('GET', '/api/categories'), ('GET', '/api/category-budgets'), ('GET', '/api/savings'), ('GET', '/api/metrics')},
+     1, case_reads),
+    ({('GET', '/api/transactions/search')}, 1, case_search),
+    ({('GET', '/api/transactions/changes')}, 0.5, case_changes),
+    ({('GET', '/api/transactions/export')}, 0.5, case_export),
+    ({('POST', '/api/transactions'), ('DELETE', '/api/transactions/:id')}, 1, case_transaction_write),
+    ({('GET', '/api/events')}, 0.5, case_events),
+    ({('POST', '/api/transactions/bulk')}, 0.2, case_bulk),
+    ({('POST', '/api/categories'), ('DELETE', '/api/categories/:id')}, 1, case_categories_write),
+    ({('POST', '/api/category-budgets')}, 1, case_budgets_write),
+    ({('POST', '/api/savings'), ('DELETE', '/api/savings/:id')}, 1, case_savings_write),
+    ({('PUT', '/api/savings/:id/deposit'), ('PUT', '/api/savings/:id/withdraw')}, 1, case_envelope_moves),
+]
+
+
+# --- Dataset y servidor ---
+
+def dataset_for(size, args):
+    users, years = SIZES[size]
+    os.makedirs(args.data_dir, exist_ok=True)
+    cached = os.path.join(args.data_dir, f"dataset_{size}_{users}u_{years}y_seed{args.seed}.sqlite")
+    if not os.path.exists(cached):
+        log(f"Generando dataset '{size}' ({users} usuarios x {years} años)...", Colors.HEADER)
+        subprocess.run([sys.executable, os.path.join(REPO_DIR, 'tests', 'gen_dataset.py'), '--out', cached,
+                        '--users', str(users), '--years', str(years), '--seed', str(args.seed), '--force'], check=True)
+    # Copia de trabajo: las escrituras del benchmark no contaminan el dataset cacheado
+    work = os.path.join(args.data_dir, f"work_{size}.sqlite")
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(work + suffix):
+            os.remove(work + suffix)
+    shutil.copyfile(cached, work)
+    return work
+
+class ServerProcess:
+    def __init__(self, db_file, port, env=None):
+        env = dict(os.environ, DB_FILE=db_file, PORT=str(port), **(env or {}))
+        self.log = tempfile.TemporaryFile()
+        self.proc = subprocess.Popen(['node', 'server.js'], cwd=REPO_DIR, env=env, stdout=self.log, stderr=subprocess.STDOUT)
+        self.port = port
+
+    def wait_ready(self, timeout=60):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.proc.poll() is not None:
+                break
+            try:
+                socket.create_connection(('localhost', self.port), timeout=0.5).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        self.log.seek(0)
+        raise RuntimeError(f"El servidor no arrancó:\n{self.log.read().decode(errors='replace')}")
+
+    def stop(self):
+        if self.proc.poll() is None:
+            self.proc.send_signal(signal.SIGTERM)
+            try:
+                self.proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        self.log.close()
+
+
+def run_cases(args):
+    session = Session(CONFIG['host'], CONFIG['port'])
+    if session.login(CONFIG['user'], CONFIG['pass'])['status'] != 200:
+        raise RuntimeError("Login del usuario de benchmark fallido")
+    bench, ctx = Bench(session), {}
+    for routes, factor, case in CASES:
+        iterations = max(3, int(args.iterations * factor))
+        warmup = max(1, int(args.warmup * factor))
+        bench.recording = False
+        for _ in range(warmup):
+            case(bench, ctx)
+        bench.recording = True
+        for _ in range(iterations):
+            case(bench, ctx)
+
+    results = {}
+    for label, samples in bench.samples.items():
+        timings = sorted(s[0] for s in samples)
+        results[label] = {
+            'n': len(samples),
+            'p50': round(percentile(timings, 50), 3),
+            'p95': round(percentile(timings, 95), 3),
+            'p99': round(percentile(timings, 99), 3),
+            'mean': round(sum(timings) / len(timings), 3),
+            'bytes': round(sum(s[1] for s in samples) / len(samples)),
+        }
+    return results
+
+def print_results(size, results, baseline):
+    log(f"\n=== Dataset '{size}' ===", Colors.HEADER)
+    log(f"  {'Endpoint':<42}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'bytes':>11}{'vs base p50':>13}")
+    for label, r in results.items():
+        base = (baseline or {}).get(label)
+        delta = f"{(r['p50'] / base['p50'] - 1) * 100:+.0f}%" if base and base['p50'] else ''
+        log(f"  {label:<42}{r['p50']:>9.2f}{r['p95']:>9.2f}{r['p99']:>9.2f}{r['bytes']:>11,}{delta:>13}")
+
+
+# --- Historial y gate ---
+
+def load_history(path):
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    return {'baseline': None, 'runs': []}
+
+def save_history(path, history, keep):
+    history['runs'] = history['runs'][-keep:]
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=1, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except OSError:
+        return None
+
+def regressions(run, baseline, args):
+    """[(tamaño, endpoint, métrica, base, actual)] que empeoran más allá del umbral."""
+    found = []
+    for size, results in run['results'].items():
+        for label, r in results.items():
+            base = baseline['results'].get(size, {}).get(label)
+            if not base:
+                continue
+            for metric in ('p50', 'p95'):
+                if r[metric] > base[metric] * (1 + args.threshold) and r[metric] - base[metric] > args.min_delta_ms:
+                    found.append((size, label, metric, base[metric], r[metric]))
+            if r['bytes'] > base['bytes'] * (1 + args.threshold):
+                found.append((size, label, 'bytes', base['bytes'], r['bytes']))
+    return found
+
+def run(args):
+    uncovered = documented_routes() - set().union(*(routes for routes, _, _ in CASES))
+    if uncovered:
+        log(f"Rutas documentadas sin caso de benchmark: {sorted(uncovered)}", Colors.FAIL)
+        sys.exit(2)
+
+    history = load_history(args.history)
+    baseline = history['baseline']
+    run_record = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'label': args.label,
+        'iterations': args.iterations,
+        'results': {}
+    }
+
+    sizes = ['live'] if args.live else args.sizes.split(',')
+    for size in sizes:
+        server = None
+        if not args.live:
+            server = ServerProcess(dataset_for(size, args), CONFIG['port'])
+        try:
+            if server:
+                server.wait_ready()
+            results = run_cases(args)
+        finally:
+            if server:
+                server.stop()
+        run_record['results'][size] = results
+        print_results(size, results, baseline and baseline['results'].get(size))
+
+    history['runs'].append(run_record)
+    if args.save_baseline or not baseline:
+        history['baseline'] = run_record
+        log(f"\nBaseline guardado ({run_record['commit'] or 'sin commit'}) en {args.history}", Colors.PASS)
+    save_history(args.history, history, args.keep_runs)
+    if args.save_baseline or not baseline:
+        return
+
+    found = regressions(run_record, baseline, args)
+    log(f"\n--- Gate vs baseline {baseline.get('commit') or ''} ({baseline['timestamp']}), umbral +{args.threshold * 100:.0f}% ---", Colors.HEADER)
+    for size, label, metric, before, after in found:
+        log(f"  [REGRESIÓN] {size} {label} {metric}: {before} -> {after}", Colors.FAIL)
+    if found and not args.no_gate:
+        sys.exit(1)
+    if not found:
+        log("  Sin regresiones", Colors.PASS)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark de todos los endpoints con historial y gate de regresión')
+    parser.add_argument('--sizes', default='s,m', help=f"Tamaños de dataset separados por coma ({', '.join(f'{k}={u}x{y}a' for k, (u, y) in SIZES.items())})")
+    parser.add_argument('--iterations', type=int, default=100, help='Iteraciones medidas por endpoint')
+    parser.add_argument('--warmup', type=int, default=10, help='Iteraciones de calentamiento (no medidas)')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Empeoramiento relativo tolerado (0.25 = +25%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help='Ignorar regresiones menores a esto en ms (ruido)')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='Archivo JSON de historial/baseline')
+    parser.add_argument('--keep-runs', type=int, default=100, help='Corridas a conservar en el historial')
+    parser.add_argument('--save-baseline', action='store_true', help='Guardar esta corrida como baseline')
+    parser.add_argument('--no-gate', action='store_true', help='Reportar regresiones sin fallar')
+    parser.add_argument('--label', default='', help='Etiqueta libre para la corrida')
+    parser.add_argument('--seed', type=int, default=42, help='Semilla de los datasets')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'saulfinanzas-bench'),
+                        help='Cache de datasets generados')
+    parser.add_argument('--live', action='store_true', help='Medir el servidor ya levantado (default :3000) con sus datos')
+    parser.add_argument('--port', type=int, help=f"Puerto (default {CONFIG['port']}, o 3000 con --live)")
+    args = parser.parse_args()
+    CONFIG['port'] = args.port or (3000 if args.live else CONFIG['port'])
+    run(args)
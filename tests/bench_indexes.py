@@ -0,0 +1,131 @@
+"""
+BENCHMARK - Índices de transacciones (antes / después de la migración)
+======================================================================
+Crea una base SQLite temporal con el esquema de server.js, la llena con
+transacciones de muchos usuarios intercaladas (1.2M filas por defecto) y mide
+las consultas calientes del servidor sin índices y luego con la migración 1
+(índices por user_id) aplicada; las posteriores no entran en la comparación.
+Muestra el plan de ejecución (EXPLAIN QUERY PLAN) y la mediana de tiempos.
+
+Uso: python3 tests/bench_indexes.py
+     python3 tests/bench_indexes.py --rows 3000000 --users 2000 --keep /tmp/bench.sqlite
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+
+import db_schema
+
+class Colors:
+    PASS = '\033[92m'
+    INFO = '\033[96m'
+    WARN = '\033[93m'
+    HEADER = '\033[95m'
+    ENDC = '\033[0m'
+
+def log(msg, color=Colors.INFO): print(f"{color}{msg}{Colors.ENDC}")
+
+# Consultas calientes de server.js con el esquema de la migración 1 (fechas en texto, sin
+# paginación keyset ni resumen_mensual): lo que mide es el efecto de los índices, no la forma actual
+QUERIES = [
+    ('Listado completo', "SELECT * FROM transacciones WHERE user_id = ? ORDER BY fecha DESC, id DESC", 'user'),
+    ('Listado del mes', "SELECT * FROM transacciones WHERE user_id = ? AND fecha BETWEEN ? AND ? ORDER BY fecha DESC, id DESC", 'month'),
+    ('Primera página (100)', "SELECT * FROM transacciones WHERE user_id = ? ORDER BY fecha DESC, id DESC LIMIT 101", 'user'),
+    ('Stats por tipo', "SELECT tipo, SUM(monto) as total FROM transacciones WHERE user_id = ? GROUP BY tipo", 'user'),
+    ('Fondos (depósito)', "SELECT SUM(CASE WHEN tipo='ingreso' THEN monto ELSE -monto END) as total FROM transacciones WHERE user_id = ?", 'user'),
+    ('Categorías', "SELECT * FROM categorias WHERE user_id = ? ORDER BY nombre", 'user'),
+    ('Presupuestos', "SELECT * FROM presupuestos_categoria WHERE user_id = ?", 'user'),
+    ('Sobres', "SELECT * FROM sobres WHERE user_id = ? ORDER BY nombre", 'user'),
+]
+
+GASTOS = [('Comida', 1500, 4500), ('Transporte', 350, 500), ('Libros', 5000, 25000), ('Otros', 1000, 10000)]
+
+def populate(con, rows, users, seed):
+    rng = random.Random(seed)
+    first_day = date.today() - timedelta(days=5 * 365)
+
+    def tx_rows():
+        for _ in range(rows):
+            user = rng.randint(1, users)
+            day = (first_day + timedelta(days=rng.randint(0, 5 * 365))).isoformat()
+            if rng.random() < 0.05:
+                yield (user, day, 'ingreso', 'Salario', rng.randint(200000, 600000), 'Salario')
+            else:
+                cat, low, high = rng.choice(GASTOS)
+                yield (user, day, 'gasto', cat, rng.randint(low, high), cat)
+
+    con.execute('BEGIN')
+    con.executemany("INSERT INTO users (id, username, password_hash) VALUES (?, ?, 'x')",
+                    ((u, f'bench{u}') for u in range(1, users + 1)))
+    con.executemany("INSERT INTO categorias (user_id, nombre, tipo) VALUES (?, ?, ?)",
+                    ((u, c, 'gasto') for u in range(1, users + 1) for c, _, _ in GASTOS))
+    con.executemany("INSERT INTO presupuestos_categoria (user_id, categoria, limite) VALUES (?, ?, ?)",
+                    ((u, c, 50000) for u in range(1, users + 1) for c, _, _ in GASTOS))
+    con.executemany("INSERT INTO sobres (user_id, nombre, saldo, icono) VALUES (?, ?, 0, '💰')",
+                    ((u, n) for u in range(1, users + 1) for n in ('Alquiler', 'Emergencias')))
+    con.executemany("INSERT INTO transacciones (user_id, fecha, tipo, categoria, monto, descripcion) VALUES (?,?,?,?,?,?)",
+                    tx_rows())
+    con.execute('COMMIT')
+
+def params_for(kind, user):
+    return (user, '2024-03-01', '2024-03-31') if kind == 'month' else (user,)
+
+def measure(con, users, iterations, seed):
+    rng = random.Random(seed)
+    sample_users = [rng.randint(1, users) for _ in range(iterations)]
+    results = {}
+    for name, sql, kind in QUERIES:
+        plan = ' | '.join(r[3] for r in con.execute('EXPLAIN QUERY PLAN ' + sql, params_for(kind, 1)))
+        timings = []
+        for user in sample_users:
+            started = time.perf_counter()
+            con.execute(sql, params_for(kind, user)).fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = (statistics.median(timings), plan)
+    return results
+
+def run(args):
+    path = args.keep or os.path.join(tempfile.mkdtemp(prefix='bench_idx_'), 'bench.sqlite')
+    if os.path.exists(path):
+        os.remove(path)
+    con = sqlite3.connect(path, isolation_level=None)
+    db_schema.create_tables(con)
+
+    log(f"--- Poblando {args.rows:,} transacciones para {args.users:,} usuarios en {path} ---", Colors.HEADER)
+    started = time.perf_counter()
+    populate(con, args.rows, args.users, args.seed)
+    log(f"Datos listos en {time.perf_counter() - started:.1f}s")
+
+    log("\n[ANTES] Sin índices (user_version 0)", Colors.HEADER)
+    before = measure(con, args.users, args.iterations, args.seed)
+    for name, (ms, plan) in before.items():
+        log(f"  {name:<22}{ms:>10.2f} ms   {plan}")
+
+    started = time.perf_counter()
+    version = db_schema.migrate(con, target=1)
+    log(f"\nMigración aplicada hasta user_version {version} en {time.perf_counter() - started:.1f}s", Colors.WARN)
+
+    log("\n[DESPUÉS] Con índices", Colors.HEADER)
+    after = measure(con, args.users, args.iterations, args.seed)
+    for name, (ms, plan) in after.items():
+        speedup = before[name][0] / ms if ms else float('inf')
+        log(f"  {name:<22}{ms:>10.2f} ms  x{speedup:<8.1f}{plan}", Colors.PASS if speedup > 1 else Colors.INFO)
+
+    con.close()
+    if not args.keep:
+        os.remove(path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark de índices (antes/después de la migración)')
+    parser.add_argument('--rows', type=int, default=1_200_000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--iterations', type=int, default=20, help='Consultas por medición (usuarios aleatorios)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--keep', default=None, metavar='PATH', help='Conservar la base generada en PATH')
+    run(parser.parse_args())
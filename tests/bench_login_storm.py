@@ -0,0 +1,119 @@
+"""
+BENCHMARK - Tormenta de Logins
+==============================
+Lanza logins concurrentes durante varios segundos y, en paralelo, una sonda que
+consulta un endpoint normal (GET /api/stats) con una sesión ya abierta.
+Reporta el throughput de logins y la latencia de la sonda en reposo vs durante
+la tormenta. Con bcrypt fuera del event loop la sonda no debe degradarse.
+
+Uso: python3 tests/bench_login_storm.py
+     python3 tests/bench_login_storm.py --threads 32 --duration 15 --probe /transactions?limit=50
+     python3 tests/bench_login_storm.py --metrics     # + diff de /api/metrics durante la tormenta
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import server_metrics
+from api_client import Session, percentile
+
+# TEST_PORT: el mismo que usan las suites de run_tests.py (o --port)
+CONFIG = {
+    'host': 'localhost',
+    'port': int(os.environ.get('TEST_PORT', 3000)),
+    'user': 'admin',
+    'pass': 'Saul123!'
+}
+
+class Colors:
+    PASS = '\033[92m'
+    FAIL = '\033[91m'
+    INFO = '\033[96m'
+    HEADER = '\033[95m'
+    ENDC = '\033[0m'
+
+def log(msg, color=Colors.INFO): print(f"{color}{msg}{Colors.ENDC}")
+
+def probe(session, path, stop, interval):
+    """Consulta `path` cada `interval` segundos hasta `stop`; devuelve latencias en ms."""
+    timings = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        session.request('GET', path)
+        timings.append((time.perf_counter() - started) * 1000)
+        time.sleep(interval)
+    return sorted(timings)
+
+def storm(stop, counters, lock):
+    session = Session(CONFIG['host'], CONFIG['port'])
+    while not stop.is_set():
+        started = time.perf_counter()
+        status = session.login(CONFIG['user'], CONFIG['pass'])['status']
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            counters['latencies'].append(elapsed)
+            counters['status'][status] = counters['status'].get(status, 0) + 1
+
+def report(label, timings):
+    log(f"  {label:<22} n={len(timings):<6} p50 {percentile(timings, 50):7.2f} ms  "
+        f"p95 {percentile(timings, 95):7.2f} ms  p99 {percentile(timings, 99):7.2f} ms")
+
+def run(args):
+    prober = Session(CONFIG['host'], CONFIG['port'])
+    if prober.login(CONFIG['user'], CONFIG['pass'])['status'] != 200:
+        log("Login fallido", Colors.FAIL)
+        sys.exit(1)
+
+    log(f"--- Sonda en reposo ({args.baseline}s) sobre GET {args.probe} ---", Colors.HEADER)
+    stop = threading.Event()
+    timer = threading.Timer(args.baseline, stop.set)
+    timer.start()
+    baseline = probe(prober, args.probe, stop, args.interval)
+
+    log(f"--- Tormenta: {args.threads} hilos haciendo login durante {args.duration}s ---", Colors.HEADER)
+    stop = threading.Event()
+    counters, lock = {'latencies': [], 'status': {}}, threading.Lock()
+    before = server_metrics.scrape(prober) if args.metrics else None
+    with ThreadPoolExecutor(max_workers=args.threads + 1) as pool:
+        stormers = [pool.submit(storm, stop, counters, lock) for _ in range(args.threads)]
+        during = pool.submit(probe, prober, args.probe, stop, args.interval)
+        time.sleep(args.duration)
+        stop.set()
+        for f in stormers:
+            f.result()
+        during = during.result()
+    after = server_metrics.scrape(prober) if before else None
+
+    logins = sorted(counters['latencies'])
+    log("\n=== RESULTADOS ===", Colors.HEADER)
+    log(f"  Logins: {len(logins)} en {args.duration}s = {len(logins) / args.duration:.1f} logins/s  (status: {counters['status']})")
+    report('Latencia login', logins)
+    report('Sonda en reposo', baseline)
+    report('Sonda en tormenta', during)
+    if before:
+        server_metrics.report(server_metrics.diff(before, after))
+
+    degradation = percentile(during, 95) / percentile(baseline, 95) if baseline else 1
+    color = Colors.PASS if degradation < args.max_degradation else Colors.FAIL
+    log(f"\n  Degradación p95 de la sonda: x{degradation:.1f} (límite x{args.max_degradation})", color)
+    if degradation >= args.max_degradation:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Throughput de login y latencia de otros endpoints durante una tormenta de logins')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--baseline', type=float, default=3.0, help='Segundos de sonda sin carga')
+    parser.add_argument('--probe', default='/stats', help='Endpoint de la sonda (relativo a /api)')
+    parser.add_argument('--interval', type=float, default=0.02, help='Pausa entre requests de la sonda')
+    parser.add_argument('--max-degradation', type=float, default=10.0,
+                        help='Falla si la p95 de la sonda en tormenta supera este múltiplo del reposo')
+    parser.add_argument('--metrics', action='store_true', help='Mostrar el diff de /api/metrics durante la tormenta')
+    parser.add_argument('--port', type=int, default=CONFIG['port'])
+    args = parser.parse_args()
+    CONFIG['port'] = args.port
+    run(args)
@@ -0,0 +1,179 @@
+"""
+BENCHMARK - Escalado con Número de Workers
+==========================================
+Levanta `node server.js` con WORKERS=1, 2, 4... sobre el mismo dataset
+reproducible (tests/gen_dataset.py, cache compartido con bench_endpoints.py)
+y le aplica la misma carga de lazo cerrado: varios procesos generadores (para
+que el GIL de Python no sea el cuello de botella), cada uno con hilos que son
+usuarios distintos del dataset con su propia sesión. Reporta requests/s,
+speedup respecto de 1 worker y latencias p50/p95/p99.
+
+Mezcla de lectura (default): listado paginado, dashboard, stats, categorías,
+sobres y el mes completo de transacciones (respuesta grande). Con --mix mixed
+se agrega alta + baja de transacciones (pasan por la cola de escrituras y el
+lock de escritura de SQLite, compartido por todos los workers).
+
+Uso: python3 tests/bench_scaling.py
+     python3 tests/bench_scaling.py --workers 1,2,4,8 --size l --clients 64 --duration 20
+     python3 tests/bench_scaling.py --mix mixed --read-pool 8
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from api_client import Session, percentile
+from bench_endpoints import CONFIG, MONTH, SIZES, ServerProcess, dataset_for
+
+# (peso, método, ruta) — ruta con {month}
+READ_MIX = [
+    (35, 'GET', '/transactions?limit=100'),
+    (20, 'GET', '/dashboard?month={month}'),
+    (15, 'GET', '/stats'),
+    (10, 'GET', '/categories'),
+    (10, 'GET', '/savings'),
+    (10, 'GET', '/transactions?month={month}'),
+]
+WRITE_SHARE = 10  # % de iteraciones que hacen POST + DELETE en --mix mixed
+
+class Colors:
+    PASS = '\033[92m'
+    FAIL = '\033[91m'
+    INFO = '\033[96m'
+    WARN = '\033[93m'
+    HEADER = '\033[95m'
+    ENDC = '\033[0m'
+
+def log(msg, color=Colors.INFO): print(f"{color}{msg}{Colors.ENDC}")
+
+def username(user_id):
+    return 'admin' if user_id == 1 else f'bench{user_id:05d}'
+
+def client_thread(user_id, port, mix, seed, start_at, stop_at, results, lock):
+    """Un usuario: login (fuera de la medición) y requests sin pausa hasta `stop_at`."""
+    rng = random.Random(seed)
+    session = Session(CONFIG['host'], port)
+    if session.login(username(user_id), CONFIG['pass'])['status'] != 200:
+        with lock:
+            results['errors'] += 1
+        return
+    weights = [w for w, _, _ in READ_MIX]
+    latencies, errors, count = [], 0, 0
+    while time.time() < start_at:
+        time.sleep(0.01)
+    while time.time() < stop_at:
+        steps = []
+        if mix == 'mixed' and rng.randrange(100) < WRITE_SHARE:
+            steps.append(('POST', '/transactions', {'fecha': f'{MONTH}-15', 'tipo': 'gasto', 'categoria': 'Otros',
+                                                     'monto': 1, 'descripcion': 'bench_scaling'}))
+        else:
+            _, method, path = rng.choices(READ_MIX, weights)[0]
+            steps.append((method, path.format(month=MONTH), None))
+        for method, path, body in steps:
+            started = time.perf_counter()
+            try:
+                res = session.request(method, path, body)
+                status = res['status']
+            except Exception:
+                status = None
+            latencies.append((time.perf_counter() - started) * 1000)
+            count += 1
+            if status != 200:
+                errors += 1
+            elif method == 'POST':
+                steps.append(('DELETE', f"/transactions/{res['data']['id']}", None))
+    with lock:
+        results['latencies'].extend(latencies)
+        results['errors'] += errors
+        results['count'] += count
+
+def generator_process(users, port, mix, seed, start_at, stop_at, queue):
+    results, lock = {'latencies': [], 'errors': 0, 'count': 0}, threading.Lock()
+    threads = [threading.Thread(target=client_thread, args=(u, port, mix, seed * 1000 + u, start_at, stop_at, results, lock))
+               for u in users]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    queue.put(results)
+
+def run_load(args, user_count):
+    """Reparte `--clients` usuarios entre `--procs` procesos; devuelve (req/s, latencias, errores)."""
+    users = [1 + i % user_count for i in range(args.clients)]
+    groups = [users[i::args.procs] for i in range(args.procs)]
+    # Margen para que todos hagan login (bcrypt) antes de empezar a medir
+    start_at = time.time() + args.warmup + args.clients * 0.02
+    stop_at = start_at + args.duration
+    queue = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=generator_process,
+                                     args=(g, CONFIG['port'], args.mix, args.seed, start_at, stop_at, queue))
+             for g in groups if g]
+    for p in procs:
+        p.start()
+    merged = {'latencies': [], 'errors': 0, 'count': 0}
+    for _ in procs:
+        r = queue.get()
+        merged['latencies'].extend(r['latencies'])
+        merged['errors'] += r['errors']
+        merged['count'] += r['count']
+    for p in procs:
+        p.join()
+    return merged['count'] / args.duration, sorted(merged['latencies']), merged['errors']
+
+def run(args):
+    counts = [int(w) for w in args.workers.split(',')]
+    cores = os.cpu_count() or 1
+    log(f"--- Dataset '{args.size}', {args.clients} clientes en {args.procs} procesos, {args.duration}s por corrida, "
+        f"mezcla {args.mix}, {cores} CPUs ---", Colors.HEADER)
+    if max(counts) > cores:
+        log(f"  Aviso: más workers que CPUs ({cores}); el speedup se aplana por encima de {cores}", Colors.WARN)
+
+    rows = []
+    user_count = SIZES[args.size][0]
+    for workers in counts:
+        env = {'WORKERS': str(workers)}
+        if args.read_pool:
+            env['READ_POOL_SIZE'] = str(args.read_pool)
+        server = ServerProcess(dataset_for(args.size, args), CONFIG['port'], env=env)
+        try:
+            server.wait_ready()
+            time.sleep(0.5 * workers)  # los workers arrancan después del primero
+            rps, latencies, errors = run_load(args, user_count)
+        finally:
+            server.stop()
+        rows.append((workers, rps, latencies, errors))
+        log(f"  WORKERS={workers}: {rps:,.0f} req/s, p95 {percentile(latencies, 95):.1f} ms, {errors} errores")
+
+    base = rows[0][1] or 1
+    log("\n=== ESCALADO ===", Colors.HEADER)
+    log(f"  {'workers':>8}{'req/s':>10}{'speedup':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errores':>9}")
+    for workers, rps, latencies, errors in rows:
+        color = Colors.FAIL if errors else Colors.INFO
+        log(f"  {workers:>8}{rps:>10,.0f}{rps / base:>8.2f}x{percentile(latencies, 50):>9.2f}"
+            f"{percentile(latencies, 95):>9.2f}{percentile(latencies, 99):>9.2f}{errors:>9}", color)
+    if any(r[3] for r in rows):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Throughput del servidor según el número de workers (WORKERS)')
+    parser.add_argument('--workers', default=','.join(str(w) for w in (1, 2, 4) if w <= max(os.cpu_count() or 1, 2)),
+                        help='Cantidades de workers a probar, separadas por coma')
+    parser.add_argument('--size', default='m', choices=sorted(SIZES), help='Dataset (ver bench_endpoints.py)')
+    parser.add_argument('--clients', type=int, default=32, help='Usuarios concurrentes (lazo cerrado, sin pausa)')
+    parser.add_argument('--procs', type=int, default=max(1, (os.cpu_count() or 2) // 2), help='Procesos generadores de carga')
+    parser.add_argument('--duration', type=float, default=10.0, help='Segundos medidos por corrida')
+    parser.add_argument('--warmup', type=float, default=2.0, help='Segundos de margen antes de medir (logins)')
+    parser.add_argument('--mix', choices=('read', 'mixed'), default='read')
+    parser.add_argument('--read-pool', type=int, help='READ_POOL_SIZE del servidor (default del servidor)')
+    parser.add_argument('--seed', type=int, default=42, help='Semilla del dataset y de la carga')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'saulfinanzas-bench'),
+                        help='Cache de datasets generados (compartido con bench_endpoints.py)')
+    parser.add_argument('--port', type=int, default=CONFIG['port'])
+    args = parser.parse_args()
+    CONFIG['port'] = args.port
+    run(args)
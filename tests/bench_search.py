@@ -0,0 +1,147 @@
+"""
+BENCHMARK - Búsqueda de texto completo (GET /api/transactions/search)
+=====================================================================
+Mide la latencia de la búsqueda sobre un dataset grande de tests/gen_dataset.py
+(se genera si no existe; por defecto 500 usuarios x 2 años, ~1.6M transacciones),
+con varios usuarios a la vez y contra la alternativa previa: bajar el listado
+completo (GET /api/transactions) para filtrarlo en el navegador.
+
+Levanta `node server.js` sobre el dataset (DB_FILE/PORT; si la base es anterior
+a la migración 5, el arranque construye el índice FTS y se informa cuánto tardó).
+Por cada búsqueda: p50/p95/máx en ms, filas de la primera página y bytes.
+
+Uso: python3 tests/bench_search.py
+     python3 tests/bench_search.py --db /tmp/bench_10m.sqlite --iterations 100
+     python3 tests/bench_search.py --users 1000 --years 5 --db /tmp/search_9m.sqlite   # ~9M filas
+     python3 tests/bench_search.py --live --port 3000 --sessions 1                     # servidor ya levantado
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode
+
+import gen_dataset
+from api_client import Session, percentile
+from bench_endpoints import ServerProcess
+
+CONFIG = {
+    'host': 'localhost',
+    'port': 3200,
+    'db': '/tmp/bench_search.sqlite',
+    'pass': gen_dataset.DEFAULT_PASSWORD
+}
+
+# (nombre, query) - descripciones y categorías de gen_dataset.py
+SEARCHES = [
+    ('Palabra frecuente', {'q': 'almuerzo'}),
+    ('Prefijo corto', {'q': 'alm'}),
+    ('Prefijo largo', {'q': 'almuerz'}),
+    ('Dos palabras', {'q': 'libro semestre'}),
+    ('Sin acentos', {'q': 'deposito sobre'}),
+    ('Por categoría', {'q': 'transporte'}),
+    ('Frecuente + mes', {'q': 'cena', 'month': gen_dataset.DEFAULT_END[:7]}),
+    ('Frecuente + gastos', {'q': 'bus', 'tipo': 'gasto', 'from': f"{gen_dataset.DEFAULT_END[:4]}-01-01"}),
+    ('Sin resultados', {'q': 'criptomonedas'}),
+]
+
+class Colors:
+    PASS = '\033[92m'
+    FAIL = '\033[91m'
+    INFO = '\033[96m'
+    WARN = '\033[93m'
+    HEADER = '\033[95m'
+    ENDC = '\033[0m'
+
+def log(msg, color=Colors.INFO): print(f"{color}{msg}{Colors.ENDC}")
+
+def prepare(args):
+    if not os.path.exists(args.db):
+        log(f"--- Generando {args.db} ({args.users} usuarios x {args.years} años) ---", Colors.HEADER)
+        subprocess.run([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gen_dataset.py'),
+                        '--out', args.db, '--users', str(args.users), '--years', str(args.years),
+                        '--seed', str(args.seed), '--password', args.password], check=True)
+    con = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    rows = con.execute('SELECT IFNULL(MAX(id), 0) FROM transacciones').fetchone()[0]
+    users = [name for (name,) in con.execute('SELECT username FROM users ORDER BY id')]
+    con.close()
+    return rows, users
+
+def measure(session, path):
+    started = time.perf_counter()
+    res = session.request('GET', path)
+    elapsed = (time.perf_counter() - started) * 1000
+    if res['status'] != 200:
+        raise RuntimeError(f"{path}: {res['status']} {str(res['data'])[:200]}")
+    return elapsed, res['data']
+
+def report(name, detail, timings, rows, size, target_ms):
+    timings.sort()
+    p95 = percentile(timings, 95)
+    log(f"  {name:<22}{detail:<34}{percentile(timings, 50):>9.2f}{p95:>9.2f}{timings[-1]:>9.2f}{rows:>8,}{size / 1024:>10,.1f}",
+        Colors.PASS if p95 <= target_ms else Colors.WARN)
+
+def run(args):
+    rows, users = prepare(args)
+    server = None
+    if not args.live:
+        started = time.perf_counter()
+        server = ServerProcess(args.db, args.port)
+        server.wait_ready(timeout=1800)  # la primera vez puede incluir la migración 5 (índice FTS)
+        log(f"--- Servidor en :{args.port} listo en {time.perf_counter() - started:.1f}s ---", Colors.HEADER)
+
+    try:
+        rng = random.Random(args.seed)
+        sessions = []
+        for username in rng.sample(users, min(args.sessions, len(users))):
+            session = Session(CONFIG['host'], args.port)
+            if session.login(username, args.password)['status'] != 200:
+                raise RuntimeError(f"Login fallido para {username} (--password)")
+            sessions.append(session)
+
+        log(f"--- {args.db}: ~{rows:,} transacciones, {len(users):,} usuarios; {len(sessions)} sesiones, "
+            f"{args.iterations} requests por búsqueda ---", Colors.HEADER)
+        log(f"\n  {'Búsqueda':<22}{'Query':<34}{'p50 ms':>9}{'p95 ms':>9}{'máx ms':>9}{'filas':>8}{'KB':>10}")
+
+        for name, params in SEARCHES:
+            path = f"/transactions/search?{urlencode({**params, 'limit': args.limit})}"
+            for session in sessions:  # calentamiento (caché de páginas de SQLite)
+                measure(session, path)
+            timings, count, size = [], 0, 0
+            for i in range(args.iterations):
+                elapsed, data = measure(sessions[i % len(sessions)], path)
+                timings.append(elapsed)
+                count, size = len(data['data']), len(str(data))
+            report(name, urlencode(params), timings, count, size, args.target_ms)
+
+        # Alternativa previa: bajar todo el historial y buscar en el navegador
+        timings = []
+        for i in range(max(1, args.iterations // 5)):
+            elapsed, data = measure(sessions[i % len(sessions)], '/transactions')
+            timings.append(elapsed)
+        report('Listado completo', '(filtrar en el navegador)', timings, len(data), len(str(data)), args.target_ms)
+    finally:
+        if server:
+            server.stop()
+
+    log(f"\n  Verde: p95 <= {args.target_ms:g} ms (--target-ms). 'filas' y 'KB' de la última respuesta "
+        f"(primera página, --limit {args.limit}).")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Latencia de GET /api/transactions/search sobre un dataset grande')
+    parser.add_argument('--db', default=CONFIG['db'], help='Dataset de gen_dataset.py (se genera si no existe)')
+    parser.add_argument('--users', type=int, default=500, help='Usuarios al generar')
+    parser.add_argument('--years', type=float, default=2, help='Años al generar')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--password', default=CONFIG['pass'], help='Clave de los usuarios del dataset')
+    parser.add_argument('--port', type=int, default=CONFIG['port'])
+    parser.add_argument('--live', action='store_true', help='Usar un servidor ya levantado en --port (sobre --db)')
+    parser.add_argument('--sessions', type=int, default=10, help='Usuarios distintos que buscan')
+    parser.add_argument('--iterations', type=int, default=50, help='Requests medidos por búsqueda')
+    parser.add_argument('--limit', type=int, default=50, help='Tamaño de página')
+    parser.add_argument('--target-ms', type=float, default=50.0, help='p95 esperado por búsqueda')
+    run(parser.parse_args())
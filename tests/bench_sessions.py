@@ -0,0 +1,98 @@
+"""
+BENCHMARK - Store de Sesiones
+=============================
+Hace miles de logins seguidos y mide la latencia por tramos. Con el store de
+sesiones (SQLite + LRU + escritura diferida) la latencia debe mantenerse plana
+aunque crezca el número de sesiones activas (antes: sessions.json se reescribía
+completo en cada login).
+También mide la validación de sesión (GET /api/me) con sesiones viejas y nuevas.
+
+Uso: python3 tests/bench_sessions.py
+     python3 tests/bench_sessions.py --logins 10000 --bucket 1000 --threads 4
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api_client import Session, percentile
+
+# TEST_PORT: el mismo que usan las suites de run_tests.py (o --port)
+CONFIG = {
+    'host': 'localhost',
+    'port': int(os.environ.get('TEST_PORT', 3000)),
+    'user': 'admin',
+    'pass': 'Saul123!'
+}
+
+class Colors:
+    PASS = '\033[92m'
+    FAIL = '\033[91m'
+    INFO = '\033[96m'
+    HEADER = '\033[95m'
+    ENDC = '\033[0m'
+
+def log(msg, color=Colors.INFO): print(f"{color}{msg}{Colors.ENDC}")
+
+def login_once(_):
+    session = Session(CONFIG['host'], CONFIG['port'])
+    started = time.perf_counter()
+    res = session.login(CONFIG['user'], CONFIG['pass'])
+    elapsed = (time.perf_counter() - started) * 1000
+    if res['status'] != 200:
+        log(f"Login fallido: {res['data']}", Colors.FAIL)
+        sys.exit(1)
+    return elapsed, session
+
+def me_latency(sessions):
+    timings = []
+    for session in sessions:
+        started = time.perf_counter()
+        session.request('GET', '/me')
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def run(args):
+    log(f"--- {args.logins} logins en tramos de {args.bucket} ({args.threads} hilo/s) ---", Colors.HEADER)
+    log(f"{'Tramo':<18}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'logins/s':>10}")
+
+    sessions, medians = [], []
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        for start in range(0, args.logins, args.bucket):
+            size = min(args.bucket, args.logins - start)
+            started = time.perf_counter()
+            results = list(pool.map(login_once, range(size)))
+            wall = time.perf_counter() - started
+
+            timings = sorted(r[0] for r in results)
+            p50 = statistics.median(timings)
+            p95 = percentile(timings, 95)
+            medians.append(p50)
+            log(f"{start + 1:>7}-{start + size:<10}{p50:>9.2f}{p95:>9.2f}{timings[-1]:>9.2f}{size / wall:>10.1f}")
+            sessions.extend(r[1] for r in results)
+
+    # Validación de sesión: primeras (posible miss del LRU) vs últimas (en cache)
+    sample = min(200, len(sessions))
+    log(f"\nGET /me (sesiones más antiguas): p50 {me_latency(sessions[:sample]):.2f} ms")
+    log(f"GET /me (sesiones más nuevas):   p50 {me_latency(sessions[-sample:]):.2f} ms")
+
+    growth = medians[-1] / medians[0] if medians[0] else 1
+    color = Colors.PASS if growth < args.max_growth else Colors.FAIL
+    log(f"\nCrecimiento p50 primer→último tramo: x{growth:.2f} (límite x{args.max_growth})", color)
+    if growth >= args.max_growth:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark de logins repetidos (latencia plana)')
+    parser.add_argument('--logins', type=int, default=5000)
+    parser.add_argument('--bucket', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--max-growth', type=float, default=1.5,
+                        help='Falla si la p50 del último tramo supera este múltiplo del primero')
+    parser.add_argument('--port', type=int, default=CONFIG['port'])
+    args = parser.parse_args()
+    CONFIG['port'] = args.port
+    run(args)
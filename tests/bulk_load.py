@@ -0,0 +1,146 @@
+"""
+BULK LOADER - Carga masiva de transacciones
+===========================================
+Envía un archivo NDJSON o CSV a POST /api/transactions/bulk en stream (chunked,
+sin leerlo entero en memoria) y reporta filas/segundo y los errores por fila.
+Con --generate N arma un historial sintético de N filas en vez de leer un archivo.
+
+Uso: python3 tests/bulk_load.py historial.csv
+     python3 tests/bulk_load.py movimientos.ndjson --format ndjson
+     python3 tests/bulk_load.py --generate 50000 --format csv --cleanup
+     python3 tests/bulk_load.py --generate 50000 --metrics   # + diff de /api/metrics (SQL y cola de escrituras)
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import server_metrics
+from api_client import Session
+
+# TEST_PORT: el mismo que usan las suites de run_tests.py (o --port)
+CONFIG = {
+    'host': 'localhost',
+    'port': int(os.environ.get('TEST_PORT', 3000)),
+    'user': 'admin',
+    'pass': 'Saul123!'
+}
+
+CONTENT_TYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+READ_SIZE = 64 * 1024
+COLUMNS = ['fecha', 'tipo', 'categoria', 'monto', 'descripcion']
+
+class Colors:
+    PASS = '\033[92m'
+    FAIL = '\033[91m'
+    INFO = '\033[96m'
+    HEADER = '\033[95m'
+    ENDC = '\033[0m'
+
+def log(msg, color=Colors.INFO): print(f"{color}{msg}{Colors.ENDC}")
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(READ_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+def generate(rows, fmt, tag, seed):
+    """Historial sintético: ~1 ingreso por cada 8 gastos, fechas hacia atrás desde hoy."""
+    rng = random.Random(seed)
+    gastos = ['Comida', 'Transporte', 'Otros']
+    start = date.today() - timedelta(days=rows // 20 + 1)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    if fmt == 'csv':
+        writer.writerow(COLUMNS)
+    for i in range(rows):
+        ingreso = rng.random() < 0.11
+        row = {
+            'fecha': (start + timedelta(days=i // 20)).isoformat(),
+            'tipo': 'ingreso' if ingreso else 'gasto',
+            'categoria': 'Salario' if ingreso else rng.choice(gastos),
+            'monto': round(rng.uniform(500, 3000) if ingreso else rng.uniform(2, 120), 2),
+            'descripcion': f'Importado {i} #{tag}'
+        }
+        if fmt == 'csv':
+            writer.writerow([row[c] for c in COLUMNS])
+        else:
+            buffer.write(json.dumps(row, ensure_ascii=False) + '\n')
+        if buffer.tell() >= READ_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+def cleanup(session, tag):
+    rows = [r for r in session.request('GET', '/transactions')['data']
+            if (r.get('descripcion') or '').endswith(f'#{tag}')]
+    for row in rows:
+        session.request('DELETE', f"/transactions/{row['id']}")
+    log(f"Eliminadas {len(rows)} filas importadas")
+
+def run(args):
+    if not args.file and not args.generate:
+        log("Indique un archivo o --generate N", Colors.FAIL)
+        sys.exit(2)
+    fmt = args.format or ('csv' if args.file and args.file.lower().endswith('.csv') else 'ndjson')
+
+    session = Session(CONFIG['host'], CONFIG['port'])
+    if session.login(CONFIG['user'], CONFIG['pass'])['status'] != 200:
+        log("Login fallido", Colors.FAIL)
+        sys.exit(1)
+
+    tag = f"bulk{int(time.time())}"
+    if args.file:
+        source, label = read_file(args.file), f"{args.file} ({os.path.getsize(args.file) / 1e6:.1f} MB)"
+    else:
+        source, label = generate(args.generate, fmt, tag, args.seed), f"{args.generate} filas sintéticas"
+
+    log(f"--- Cargando {label} como {fmt.upper()} ---", Colors.HEADER)
+    sent = []
+    session.add_hook(lambda sample: sent.append(sample.sent))
+    before = server_metrics.scrape(session) if args.metrics else None
+    started = time.perf_counter()
+    res = session.upload('POST', '/transactions/bulk', source, CONTENT_TYPES[fmt])
+    wall = time.perf_counter() - started
+
+    if res['status'] != 200:
+        log(f"Error {res['status']}: {res['data']}", Colors.FAIL)
+        sys.exit(1)
+    result = res['data']
+    total = result['inserted'] + result['failed']
+    log("\n=== RESULTADOS ===", Colors.HEADER)
+    log(f"  Insertadas: {result['inserted']}  Con error: {result['failed']}  ({sent[0] / 1e6:.1f} MB enviados)")
+    log(f"  Tiempo: {wall:.2f}s = {total / wall:,.0f} filas/s", Colors.PASS)
+    for error in result['errors'][:args.show_errors]:
+        log(f"  línea {error['line']}: {error['error']}", Colors.FAIL)
+    if result['failed'] > args.show_errors:
+        log(f"  ... y {result['failed'] - args.show_errors} errores más")
+    if before:
+        server_metrics.report(server_metrics.diff(before, server_metrics.scrape(session)))
+
+    if args.cleanup and args.generate:
+        cleanup(session, tag)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Carga masiva (NDJSON/CSV) contra POST /api/transactions/bulk')
+    parser.add_argument('file', nargs='?', help='Archivo .csv o .ndjson a cargar')
+    parser.add_argument('--format', choices=sorted(CONTENT_TYPES), help='Por defecto según la extensión')
+    parser.add_argument('--generate', type=int, default=0, help='Generar N filas sintéticas en vez de leer un archivo')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--show-errors', type=int, default=20, help='Errores por fila a mostrar')
+    parser.add_argument('--cleanup', action='store_true', help='Borrar las filas generadas al terminar')
+    parser.add_argument('--metrics', action='store_true', help='Mostrar el diff de /api/metrics de la carga')
+    parser.add_argument('--port', type=int, default=CONFIG['port'])
+    args = parser.parse_args()
+    CONFIG['port'] = args.port
+    run(args)
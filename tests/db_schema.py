@@ -0,0 +1,55 @@
+"""
+DB SCHEMA - Esquema SQLite de server.js para herramientas Python
+================================================================
+Aplica las tablas base y las `MIGRATIONS` de `lib/schema.js`, la misma definición
+que usa server.js: el SQL se lee con `node -e` (una vez por proceso), no se copia.
+Permite a los benchmarks y generadores trabajar directo sobre un archivo
+SQLite sin levantar el servidor.
+
+Uso:
+    import sqlite3, db_schema
+    con = sqlite3.connect('data/finanzas.sqlite')
+    db_schema.create_tables(con)
+    db_schema.migrate(con)
+"""
+
+import functools
+import json
+import os
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHECK_SHOWN = 20  # filas listadas cuando un `check` bloquea una migración (igual que server.js)
+
+
+@functools.lru_cache(maxsize=1)
+def schema():
+    """{'TABLES': [sql], 'MIGRATIONS': [{version, description, sql, check?}]} de lib/schema.js."""
+    out = subprocess.run(['node', '-e', "process.stdout.write(JSON.stringify(require('./lib/schema')))"],
+                         cwd=REPO_DIR, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"No se pudo leer lib/schema.js con node: {out.stderr.strip()}")
+    return json.loads(out.stdout)
+
+
+def create_tables(con):
+    for ddl in schema()['TABLES']:
+        con.execute(ddl)
+
+
+def migrate(con, target=None):
+    """Aplica las migraciones pendientes hasta `target` (default: todas). Devuelve la versión final.
+    Como server.js, no aplica una migración cuyo `check` encuentre filas: lanza RuntimeError con ellas."""
+    current = con.execute('PRAGMA user_version').fetchone()[0]
+    for m in schema()['MIGRATIONS']:
+        version = m['version']
+        if version <= current or (target is not None and version > target):
+            continue
+        if m.get('check'):
+            rows = con.execute(m['check']).fetchall()
+            if rows:
+                shown = '\n'.join(f'  {row}' for row in rows[:CHECK_SHOWN])
+                raise RuntimeError(f"Migración {version} ({m['description']}): {len(rows)} filas con datos que se perderían\n{shown}")
+        con.executescript(f"BEGIN; {m['sql']}; PRAGMA user_version = {version}; COMMIT;")
+        current = version
+    return current
@@ -0,0 +1,218 @@
+"""
+GENERADOR - Dataset sintético determinístico para benchmarks
+============================================================
+Escribe directo en un archivo SQLite nuevo con el esquema exacto de server.js
+(tablas y MIGRATIONS de lib/schema.js vía db_schema), sin pasar por la API. Misma semilla y mismos
+parámetros => mismas filas (salvo el salt del hash bcrypt), así los benchmarks
+son reproducibles. El rango de fechas termina en --end (fijo por defecto).
+
+Patrón diario por usuario (como student_simulation.py): desayuno, bus de ida,
+almuerzo, bus de vuelta y cena en días hábiles; fines de semana con menos
+comidas y sin bus. Cada mes: salario, alquiler vía sobre (depósito + retiro +
+pago), teléfono, internet, libros al inicio de semestre y, si alcanza,
+un depósito al sobre de Emergencias. Las filas de todos los usuarios quedan
+intercaladas por fecha, como en una base real.
+
+Las transacciones se insertan antes de crear índices y triggers; luego
+`db_schema.migrate` crea los índices y reconstruye `resumen_mensual` de una vez.
+
+Uso: python3 tests/gen_dataset.py --out /tmp/bench.sqlite
+     python3 tests/gen_dataset.py --out /tmp/bench_10m.sqlite --users 1000 --years 5 --seed 7
+     python3 tests/gen_dataset.py --out /tmp/demo.sqlite --users 5 --end today --force
+     DB_FILE=/tmp/bench.sqlite node server.js   # servir el dataset (usuarios admin, bench00002, ...)
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+from itertools import islice
+
+import db_schema
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PASSWORD = 'Saul123!'
+DEFAULT_END = '2025-12-31'
+CREATED_AT = '2020-01-01 00:00:00'
+BATCH_ROWS = 250000
+
+CATEGORIES = [('Comida', 'gasto'), ('Transporte', 'gasto'), ('Salario', 'ingreso'), ('Otros', 'gasto'),
+              ('Libros', 'gasto'), ('Telefono', 'gasto'), ('Internet', 'gasto'), ('Alquiler', 'gasto')]
+BUDGETS = [('Alquiler', 70000), ('Comida', 240000), ('Transporte', 20000),
+           ('Libros', 30000), ('Telefono', 10000), ('Internet', 15000)]
+ENVELOPES = [('Alquiler', '🏠'), ('Emergencias', '🚑')]
+
+class Colors:
+    PASS = '\033[92m'
+    FAIL = '\033[91m'
+    INFO = '\033[96m'
+    HEADER = '\033[95m'
+    ENDC = '\033[0m'
+
+def log(msg, color=Colors.INFO): print(f"{color}{msg}{Colors.ENDC}")
+
+def hash_password(password):
+    """
+    Hash bcrypt compatible con server.js. Usa el módulo `bcrypt` de Python si está
+    instalado; si no, el `bcryptjs` del propio proyecto vía node. None si no hay ninguno.
+    """
+    try:
+        import bcrypt
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(10)).decode()
+    except ImportError:
+        pass
+    try:
+        out = subprocess.run(['node', '-e', "process.stdout.write(require('bcryptjs').hashSync(process.argv[1], 10))", password],
+                             cwd=REPO_DIR, capture_output=True, text=True, timeout=30)
+        if out.returncode == 0 and out.stdout:
+            return out.stdout
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+    return None
+
+
+class UserLedger:
+    """Estado de un usuario a lo largo de la simulación (RNG propio => independiente del orden)."""
+
+    def __init__(self, user_id, seed):
+        self.id = user_id
+        self.rng = random.Random(f"{seed}:{user_id}")
+        self.salary = self.rng.randrange(420000, 700001, 5000)
+        self.balance = 0
+        self.envelopes = {name: 0 for name, _ in ENVELOPES}
+
+    def tx(self, day, tipo, categoria, monto, descripcion):
+        self.balance += monto if tipo == 'ingreso' else -monto
+        return (self.id, day, tipo, categoria, monto, descripcion)
+
+    def envelope(self, day, name, monto, deposit):
+        # Mismo par de filas y descripciones que executeEnvelopeTransaction en server.js
+        self.envelopes[name] += monto if deposit else -monto
+        if deposit:
+            return self.tx(day, 'gasto', 'Ahorro', monto, f'Depósito a sobre: {name}')
+        return self.tx(day, 'ingreso', 'Retiro Ahorro', monto, f'Retiro de sobre: {name}')
+
+    def day(self, current, day):
+        """Filas de un día para este usuario."""
+        rng = self.rng
+        rows = []
+        if current.day == 1:
+            rows.append(self.tx(day, 'ingreso', 'Salario', self.salary, 'Salario'))
+            rows.append(self.envelope(day, 'Alquiler', 70000, True))
+            rows.append(self.tx(day, 'gasto', 'Telefono', rng.choice((8000, 10000, 12000)), 'Plan celular'))
+            if current.month in (2, 8):
+                rows.append(self.tx(day, 'gasto', 'Libros', rng.randint(5000, 25000), 'Libros del semestre'))
+        if current.day == 5:
+            rows.append(self.envelope(day, 'Alquiler', 70000, False))
+            rows.append(self.tx(day, 'gasto', 'Alquiler', 70000, 'Pago alquiler'))
+        if current.day == 10:
+            rows.append(self.tx(day, 'gasto', 'Internet', 15000, 'Internet hogar'))
+        if current.day == 25 and self.balance > 60000 and rng.random() < 0.5:
+            rows.append(self.envelope(day, 'Emergencias', rng.choice((10000, 20000, 30000)), True))
+
+        weekday = current.weekday() < 5
+        if weekday or rng.random() < 0.6:
+            rows.append(self.tx(day, 'gasto', 'Comida', rng.randint(1500, 2500), 'Desayuno'))
+        if weekday:
+            rows.append(self.tx(day, 'gasto', 'Transporte', rng.randint(350, 500), 'Bus U'))
+        rows.append(self.tx(day, 'gasto', 'Comida', rng.randint(3000, 4500), 'Almuerzo Soda'))
+        if weekday:
+            rows.append(self.tx(day, 'gasto', 'Transporte', rng.randint(350, 500), 'Bus Casa'))
+        if weekday or rng.random() < 0.8:
+            rows.append(self.tx(day, 'gasto', 'Comida', rng.randint(2000, 3000), 'Cena'))
+        if rng.random() < 0.05:
+            rows.append(self.tx(day, 'gasto', 'Otros', rng.randint(1000, 10000), 'Varios'))
+        return rows
+
+
+def transactions(ledgers, days):
+    """Filas de todos los usuarios, intercaladas día por día."""
+    for current in days:
+        day = current.isoformat()
+        for ledger in ledgers:
+            yield from ledger.day(current, day)
+
+def generate(args):
+    if os.path.exists(args.out):
+        if not args.force:
+            log(f"{args.out} ya existe (use --force para reemplazarlo)", Colors.FAIL)
+            sys.exit(1)
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(args.out + suffix):
+                os.remove(args.out + suffix)
+
+    password_hash = args.password_hash or hash_password(args.password)
+    if not password_hash:
+        log("Sin bcrypt (ni Python ni node/bcryptjs): los usuarios no podrán hacer login (--password-hash para indicarlo)", Colors.FAIL)
+        password_hash = '!'
+
+    end = date.today() if args.end == 'today' else date.fromisoformat(args.end)
+    start = end - timedelta(days=int(args.years * 365.25) - 1)
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    users = range(1, args.users + 1)
+    ledgers = [UserLedger(u, args.seed) for u in users]
+
+    con = sqlite3.connect(args.out, isolation_level=None)
+    # Carga inicial: sin journal ni fsync (el archivo es descartable hasta terminar)
+    con.execute('PRAGMA journal_mode = OFF')
+    con.execute('PRAGMA synchronous = OFF')
+    con.execute('PRAGMA cache_size = -262144')
+    db_schema.create_tables(con)
+
+    log(f"--- {args.users} usuarios x {len(days)} días ({start} a {end}), semilla {args.seed} ---", Colors.HEADER)
+    started = time.perf_counter()
+    con.execute('BEGIN')
+    con.executemany("INSERT INTO users (id, username, password_hash, created_at) VALUES (?, ?, ?, ?)",
+                    ((u, 'admin' if u == 1 else f'bench{u:05d}', password_hash, CREATED_AT) for u in users))
+    con.executemany("INSERT INTO categorias (user_id, nombre, tipo) VALUES (?, ?, ?)",
+                    ((u, n, t) for u in users for n, t in CATEGORIES))
+    con.executemany("INSERT INTO presupuestos_categoria (user_id, categoria, limite) VALUES (?, ?, ?)",
+                    ((u, c, l) for u in users for c, l in BUDGETS))
+    con.execute('COMMIT')
+
+    rows = transactions(ledgers, days)
+    total = 0
+    while True:
+        batch = list(islice(rows, BATCH_ROWS))
+        if not batch:
+            break
+        con.execute('BEGIN')
+        con.executemany("INSERT INTO transacciones (user_id, fecha, tipo, categoria, monto, descripcion) VALUES (?,?,?,?,?,?)", batch)
+        con.execute('COMMIT')
+        total += len(batch)
+        elapsed = time.perf_counter() - started
+        print(f"\r  {total:>12,} filas  {total / elapsed:>10,.0f} filas/s", end='', flush=True)
+    print()
+
+    # Saldos de sobres coherentes con el libro (depósitos - retiros)
+    con.execute('BEGIN')
+    con.executemany("INSERT INTO sobres (user_id, nombre, saldo, icono) VALUES (?, ?, ?, ?)",
+                    ((l.id, name, l.envelopes[name], icon) for l in ledgers for name, icon in ENVELOPES))
+    con.execute('COMMIT')
+    inserted = time.perf_counter() - started
+
+    log("--- Índices y agregados (migraciones) ---", Colors.HEADER)
+    version = db_schema.migrate(con)
+    con.execute('PRAGMA journal_mode = WAL')
+    con.close()
+
+    wall = time.perf_counter() - started
+    log(f"\n  Transacciones: {total:,} en {inserted:.1f}s ({total / inserted:,.0f} filas/s)")
+    log(f"  Total con índices y agregados: {wall:.1f}s, esquema v{version}, {os.path.getsize(args.out) / 1e6:,.0f} MB", Colors.PASS)
+    log(f"  Servir con: DB_FILE={args.out} node server.js  (login: admin / bench00002... con la clave indicada)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Genera un dataset SQLite sintético y reproducible')
+    parser.add_argument('--out', required=True, help='Archivo SQLite a crear')
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--years', type=float, default=1.0)
+    parser.add_argument('--end', default=DEFAULT_END, help="Último día (YYYY-MM-DD) o 'today' (no reproducible entre días)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--password', default=DEFAULT_PASSWORD, help='Clave de todos los usuarios')
+    parser.add_argument('--password-hash', help='Hash bcrypt ya calculado (evita depender de bcrypt/node)')
+    parser.add_argument('--force', action='store_true', help='Reemplazar --out si existe')
+    generate(parser.parse_args())
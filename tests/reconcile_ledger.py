@@ -0,0 +1,248 @@
+"""
+CONCILIACIÓN - Libro de Transacciones vs Saldos Derivados (todos los usuarios)
+==============================================================================
+Lee el archivo SQLite directo (sin pasar por la API) y verifica, por usuario:
+1. Balance: ingresos - gastos del libro (`transacciones`) == balance que ve el
+   usuario (`resumen_mensual`, lo que devuelven /api/stats y /api/dashboard).
+2. Sobres: SUM(sobres.saldo) == depósitos ('Ahorro') - retiros ('Retiro Ahorro').
+
+Un solo recorrido en streaming de `transacciones` por id (lotes de --chunk
+filas), sumando en céntimos enteros sobre arreglos indexados por user_id:
+numpy (bincount) si está instalado, si no `array('q')`. Desde la migración 4
+los montos ya están en céntimos; con bases anteriores se convierten al leer.
+
+Checkpoint (--checkpoint, default <base>.reconcile.json): por usuario guarda el
+último id verificado y los totales acumulados; la próxima corrida solo lee las
+filas nuevas. Si un usuario no cuadra partiendo de su checkpoint (ej. borró o
+editó transacciones viejas), se recalcula solo ese usuario desde cero antes de
+reportarlo. --full ignora el checkpoint.
+
+Todo se lee dentro de una transacción de lectura: con el servidor escribiendo
+(WAL) el libro y los saldos se comparan sobre la misma foto.
+
+Uso: python3 tests/reconcile_ledger.py                         # data/finanzas.sqlite
+     python3 tests/reconcile_ledger.py --db /tmp/bench_10m.sqlite
+     python3 tests/reconcile_ledger.py --full --no-save
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CONFIG = {
+    'db': os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'finanzas.sqlite'),
+    'chunk': 100000
+}
+
+# Columnas ya codificadas como números para que el lote vaya directo a un arreglo
+STREAM_SQL = """
+    SELECT id, user_id,
+           CASE tipo WHEN 'ingreso' THEN 1 WHEN 'gasto' THEN 2 ELSE 0 END,
+           CASE categoria WHEN 'Ahorro' THEN 1 WHEN 'Retiro Ahorro' THEN 2 ELSE 0 END,
+           IFNULL(monto, 0)
+    FROM transacciones
+"""
+BALANCE_SQL = """
+    SELECT user_id, SUM(CASE tipo WHEN 'ingreso' THEN total WHEN 'gasto' THEN -total ELSE 0 END)
+    FROM resumen_mensual GROUP BY user_id
+"""
+SAVINGS_SQL = "SELECT user_id, TOTAL(saldo), COUNT(*) FROM sobres GROUP BY user_id"
+
+FIELDS = ('last_id', 'rows', 'income', 'expense', 'ahorro', 'retiro')
+
+class Colors:
+    PASS = '\033[92m'
+    FAIL = '\033[91m'
+    INFO = '\033[96m'
+    WARN = '\033[93m'
+    HEADER = '\033[95m'
+    ENDC = '\033[0m'
+
+def log(msg, color=Colors.INFO): print(f"{color}{msg}{Colors.ENDC}")
+
+SCHEMA_CENTS = 4  # user_version desde la que monto/saldo/total se guardan en céntimos
+
+def money(value):
+    return f"{value / 100:,.2f}"
+
+
+class Ledger:
+    """Totales por usuario en centavos, en arreglos indexados por user_id (uno por campo de FIELDS)."""
+
+    def __init__(self, size, scale):
+        self.size = size
+        self.scale = scale  # 1 si la base ya guarda céntimos, 100 si guarda montos REAL
+        if np is not None:
+            self.cols = {f: np.zeros(size, dtype=np.int64) for f in FIELDS}
+        else:
+            self.cols = {f: array('q', bytes(8 * size)) for f in FIELDS}
+
+    def add(self, rows):
+        """Suma un lote de filas (id, user_id, tipo, categoría, monto) de STREAM_SQL."""
+        if np is None:
+            c = self.cols
+            for row_id, uid, tipo, cat, monto in rows:
+                amount = int(round(monto * self.scale))
+                c['rows'][uid] += 1
+                if row_id > c['last_id'][uid]:
+                    c['last_id'][uid] = row_id
+                if tipo == 1:
+                    c['income'][uid] += amount
+                elif tipo == 2:
+                    c['expense'][uid] += amount
+                if cat == 1:
+                    c['ahorro'][uid] += amount
+                elif cat == 2:
+                    c['retiro'][uid] += amount
+            return
+        batch = np.array(rows, dtype=np.float64)
+        ids, uid = batch[:, 0].astype(np.int64), batch[:, 1].astype(np.intp)
+        tipo, cat = batch[:, 2], batch[:, 3]
+        amount = np.rint(batch[:, 4] * self.scale)
+        total = lambda weights: np.bincount(uid, weights=weights, minlength=self.size).astype(np.int64)
+        self.cols['rows'] += np.bincount(uid, minlength=self.size)
+        self.cols['income'] += total(amount * (tipo == 1))
+        self.cols['expense'] += total(amount * (tipo == 2))
+        self.cols['ahorro'] += total(amount * (cat == 1))
+        self.cols['retiro'] += total(amount * (cat == 2))
+        np.maximum.at(self.cols['last_id'], uid, ids)
+
+    def get(self, uid, field):
+        return int(self.cols[field][uid])
+
+    def reset(self, uids):
+        for field in FIELDS:
+            for uid in uids:
+                self.cols[field][uid] = 0
+
+    def load(self, users):
+        for uid, values in users.items():
+            for field, value in zip(FIELDS, values):
+                self.cols[field][int(uid)] = value
+
+    def dump(self):
+        return {str(uid): [self.get(uid, f) for f in FIELDS] for uid in range(self.size) if self.get(uid, 'rows')}
+
+
+def stream(con, ledger, where, params, chunk):
+    """Recorre STREAM_SQL en orden de id y acumula; devuelve las filas leídas."""
+    cur = con.execute(f"{STREAM_SQL} WHERE {where} ORDER BY id", params)
+    count = 0
+    while True:
+        rows = cur.fetchmany(chunk)
+        if not rows:
+            return count
+        ledger.add(rows)
+        count += len(rows)
+
+def load_checkpoint(path, db_file, max_id):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        data = json.load(f)
+    if data.get('db') != os.path.abspath(db_file) or data.get('last_id', 0) > max_id:
+        log(f"  Checkpoint {path} es de otra base (o la base se recreó): se ignora", Colors.WARN)
+        return None
+    return data
+
+def find_mismatches(ledger, uids, balances, savings):
+    """[(uid, problema, esperado_libro, actual)] para los usuarios indicados."""
+    found = []
+    for uid in uids:
+        ledger_balance = ledger.get(uid, 'income') - ledger.get(uid, 'expense')
+        if ledger_balance != balances.get(uid, 0):
+            found.append((uid, 'balance', ledger_balance, balances.get(uid, 0)))
+        flows = ledger.get(uid, 'ahorro') - ledger.get(uid, 'retiro')
+        saldo = savings.get(uid, (0, 0))[0]
+        if flows != saldo:
+            found.append((uid, 'sobres', flows, saldo))
+    return found
+
+def run(args):
+    if not os.path.exists(args.db):
+        log(f"No existe {args.db}", Colors.FAIL)
+        sys.exit(2)
+    checkpoint_path = args.checkpoint or f"{args.db}.reconcile.json"
+    started = time.perf_counter()
+
+    con = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True, isolation_level=None)
+    con.execute("BEGIN")  # misma foto para el libro, resumen_mensual y sobres
+    max_id = con.execute("SELECT IFNULL(MAX(id), 0) FROM transacciones").fetchone()[0]
+    size = 1 + max(con.execute("SELECT IFNULL(MAX(id), 0) FROM users").fetchone()[0],
+                   con.execute("SELECT IFNULL(MAX(user_id), 0) FROM transacciones").fetchone()[0],
+                   con.execute("SELECT IFNULL(MAX(user_id), 0) FROM sobres").fetchone()[0],
+                   con.execute("SELECT IFNULL(MAX(user_id), 0) FROM resumen_mensual").fetchone()[0])
+    scale = 1 if con.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_CENTS else 100
+    cents = lambda value: int(round((value or 0) * scale))
+    ledger = Ledger(size, scale)
+
+    checkpoint = None if args.full else load_checkpoint(checkpoint_path, args.db, max_id)
+    since = 0
+    if checkpoint:
+        ledger.load(checkpoint['users'])
+        since = checkpoint['last_id']
+    log(f"--- {args.db}: {max_id:,} ids, {'desde el checkpoint id ' + format(since, ',') if since else 'recorrido completo'}"
+        f" (sumas con {'numpy' if np is not None else 'array'}) ---", Colors.HEADER)
+
+    scanned = stream(con, ledger, "id > ?", (since,), args.chunk)
+    balances = {uid: cents(total) for uid, total in con.execute(BALANCE_SQL)}
+    savings = {uid: (cents(total), n) for uid, total, n in con.execute(SAVINGS_SQL)}
+    uids = sorted({uid for uid in range(size) if ledger.get(uid, 'rows')} | set(balances) | set(savings))
+    mismatches = find_mismatches(ledger, uids, balances, savings)
+
+    # Un checkpoint puede haber quedado viejo si el usuario borró/editó filas ya verificadas:
+    # esos usuarios se recalculan desde cero y solo se reporta lo que sigue sin cuadrar
+    rescanned = 0
+    stale = sorted({uid for uid, *_ in mismatches if since and checkpoint['users'].get(str(uid))})
+    if stale:
+        ledger.reset(stale)
+        marks = ','.join('?' * len(stale))
+        rescanned = stream(con, ledger, f"user_id IN ({marks}) AND id <= ?", (*stale, max_id), args.chunk)
+        mismatches = find_mismatches(ledger, uids, balances, savings)
+    con.execute("COMMIT")
+    con.close()
+    elapsed = time.perf_counter() - started
+
+    log(f"  {len(uids):,} usuarios, {sum(n for _, n in savings.values()):,} sobres")
+    log(f"  {scanned:,} filas nuevas{f' + {rescanned:,} recalculadas ({len(stale)} usuario(s) con cambios viejos)' if stale else ''}"
+        f" en {elapsed:.2f}s ({(scanned + rescanned) / elapsed if elapsed else 0:,.0f} filas/s)")
+
+    if not args.no_save:
+        tmp = f"{checkpoint_path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'db': os.path.abspath(args.db), 'last_id': max_id, 'fields': FIELDS, 'users': ledger.dump()}, f)
+        os.replace(tmp, checkpoint_path)
+        log(f"  Checkpoint guardado en {checkpoint_path} (id {max_id:,})")
+
+    if not mismatches:
+        log("\n--- LIBRO, BALANCES Y SOBRES CONSISTENTES ---", Colors.PASS)
+        return
+    log(f"\n  {len(mismatches)} diferencia(s):", Colors.FAIL)
+    for uid, kind, expected, actual in mismatches[:50]:
+        label = 'ingresos - gastos' if kind == 'balance' else 'depósitos - retiros'
+        stored = 'resumen_mensual' if kind == 'balance' else 'SUM(sobres.saldo)'
+        log(f"    user {uid}: {label} = {money(expected)} vs {stored} = {money(actual)} "
+            f"(dif {money(actual - expected)})", Colors.FAIL)
+    if len(mismatches) > 50:
+        log(f"    ... y {len(mismatches) - 50} más", Colors.FAIL)
+    if any(kind == 'balance' for _, kind, _, _ in mismatches):
+        log("  Para balance: node aggregates.js verify / rebuild", Colors.WARN)
+    sys.exit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Concilia el libro de transacciones contra balances y sobres (todos los usuarios)')
+    parser.add_argument('--db', default=CONFIG['db'], help='Archivo SQLite (default data/finanzas.sqlite)')
+    parser.add_argument('--checkpoint', help='Archivo de checkpoint (default <db>.reconcile.json)')
+    parser.add_argument('--full', action='store_true', help='Ignorar el checkpoint y recorrer todo el libro')
+    parser.add_argument('--no-save', action='store_true', help='No escribir el checkpoint')
+    parser.add_argument('--chunk', type=int, default=CONFIG['chunk'], help='Filas por lote')
+    run(parser.parse_args())
@@ -0,0 +1,236 @@
+"""
+REPLAY - Reproduce un trace grabado con API_TRACE
+=================================================
+Lee un trace de `api_client.Recorder` (cualquier script corrido con
+API_TRACE=archivo) y lo vuelve a ejecutar contra otro servidor (ej. staging):
+- Una sesión nueva (cookie jar propio) por cada sesión grabada, todas en
+  paralelo; dentro de una sesión los requests van en el orden grabado.
+- Ritmo: los offsets grabados divididos por --speed (1 = tiempo real,
+  4 = cuatro veces más rápido, max = sin esperas).
+- Ids generados en tiempo de ejecución (sobres, transacciones, categorías):
+  cada id usado en una ruta se reemplaza por el que devolvió, en esta
+  corrida, la misma respuesta que lo trajo en la grabación.
+- Las cargas masivas grabadas (`Session.upload`) se reenvían con el mismo
+  cuerpo; las que superaron MAX_TRACED_UPLOAD de api_client se grabaron sin
+  cuerpo y se omiten (se informan al final).
+- --copies N reproduce N copias simultáneas del trace (cada una con sus
+  sesiones y sus ids) para multiplicar la carga. Las copias usan las mismas
+  cuentas: lo que exige nombre único por usuario (sobres, categorías) da 400
+  en todas menos una.
+Al final compara por endpoint latencias p50/p95 y errores contra la grabación
+y lista los requests cuyo status cambió. Sale con 1 si aparecen errores
+(sin respuesta o 5xx) que no estaban en la grabación.
+
+Uso: API_TRACE=/tmp/sim.trace.gz python3 tests/student_simulation.py --load 20   # grabar
+     python3 tests/replay_trace.py /tmp/sim.trace.gz
+     python3 tests/replay_trace.py /tmp/sim.trace.gz --speed 4 --port 3100
+     python3 tests/replay_trace.py /tmp/sim.trace.gz --speed max --copies 10
+     python3 tests/replay_trace.py /tmp/sim.trace.gz --credentials ana:Pass1!,luis:Pass2!
+"""
+
+import argparse
+import gzip
+import json
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from api_client import Session, path_ids, percentile, response_ids
+
+CONFIG = {
+    'host': 'localhost',
+    'port': 3000,
+    'pass': 'Saul123!'
+}
+REF_TIMEOUT = 10.0  # segundos máximos esperando la respuesta de otra sesión que trae un id
+
+class Colors:
+    PASS = '\033[92m'
+    FAIL = '\033[91m'
+    INFO = '\033[96m'
+    WARN = '\033[93m'
+    HEADER = '\033[95m'
+    ENDC = '\033[0m'
+
+def log(msg, color=Colors.INFO): print(f"{color}{msg}{Colors.ENDC}")
+
+def route(path):
+    return re.sub(r'/\d+(?=/|$)', '/:id', path.split('?')[0])
+
+def is_error(status):
+    return status is None or status >= 500
+
+def load_trace(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get('format') != 'saulfinanzas-trace':
+            raise ValueError(f"{path} no es un trace de api_client")
+        events = [json.loads(line) for line in f if line.strip()]
+    return header, events
+
+
+class Replay:
+    """Estado de una copia del trace: ids devueltos por evento y resultados."""
+
+    def __init__(self, events, referenced):
+        self.events = events
+        self.ids = {}                                            # evento -> ids devueltos en esta corrida
+        self.ready = {n: threading.Event() for n in referenced}  # respuestas que otros eventos necesitan
+        self.results = {}                                        # evento -> (status, ms, atraso_ms)
+        self.unmapped = 0
+        self.skipped = 0                                         # cargas grabadas sin cuerpo
+
+    def remap(self, path, refs):
+        if not refs:
+            return path
+        _, used = path_ids(path)
+        for old in used:
+            ref = refs.get(str(old))
+            if not ref:
+                continue
+            event, pos = ref
+            if event in self.ready:
+                self.ready[event].wait(REF_TIMEOUT)
+            new_ids = self.ids.get(event) or []
+            if pos < len(new_ids):
+                path = re.sub(rf'/{old}(?=/|$|\?)', f'/{new_ids[pos]}', path, count=1)
+            else:
+                self.unmapped += 1
+        return path
+
+    def run_session(self, numbers, start, speed, credentials, port):
+        session = Session(CONFIG['host'], port)
+        for n in numbers:
+            offset, _, method, path, body, _, _, refs = self.events[n]
+            if speed:
+                delay = start + offset / 1000 / speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            if path == '/login' and isinstance(body, dict):
+                body = {**body, 'password': credentials.get(body.get('username'), CONFIG['pass'])}
+            path = self.remap(path, refs)
+            upload = isinstance(body, dict) and '$upload' in body
+            if upload and body['text'] is None:
+                self.skipped += 1
+                if n in self.ready:
+                    self.ready[n].set()
+                continue
+            lag = (time.perf_counter() - start) * 1000 - (offset / speed if speed else 0)
+            began = time.perf_counter()
+            status, data = None, None
+            try:
+                if upload:
+                    res = session.upload(method, path, [body['text'].encode('utf-8')], body['$upload'])
+                else:
+                    res = session.request(method, path, body)
+                status, data = res['status'], res['data']
+            except Exception:
+                pass
+            self.results[n] = (status, (time.perf_counter() - began) * 1000, lag)
+            if n in self.ready:
+                self.ids[n] = response_ids(data) if status and status < 400 else []
+                self.ready[n].set()
+
+
+def report(events, replays, wall, speed):
+    recorded = defaultdict(lambda: {'ms': [], 'errors': 0})
+    replayed = defaultdict(lambda: {'ms': [], 'errors': 0, 'changed': 0})
+    changed = []
+    for n, (_, _, method, path, _, status, elapsed, _) in enumerate(events):
+        if not any(n in replay.results for replay in replays):
+            continue  # carga grabada sin cuerpo: no hay con qué comparar
+        key = f"{method} {route(path)}"
+        recorded[key]['ms'].append(elapsed)
+        recorded[key]['errors'] += is_error(status)
+        for copy, replay in enumerate(replays):
+            new_status, ms, _ = replay.results[n]
+            replayed[key]['ms'].append(ms)
+            replayed[key]['errors'] += is_error(new_status)
+            if new_status != status:
+                replayed[key]['changed'] += 1
+                changed.append((n, copy, method, path, status, new_status))
+
+    span = events[-1][0] / 1000 if events else 0
+    lags = sorted(r[2] for replay in replays for r in replay.results.values())
+    log("\n=== REPLAY vs GRABACIÓN ===", Colors.HEADER)
+    log(f"  {len(events)} requests grabados en {span:.1f}s; {len(events) * len(replays)} reproducidos "
+        f"({len(replays)} copia(s)) en {wall:.1f}s, velocidad efectiva x{span / wall if wall else 0:.1f}"
+        f" (pedida {'max' if not speed else f'x{speed:g}'})")
+    if speed:
+        log(f"  Atraso respecto del cronograma: p50 {percentile(lags, 50):.0f} ms, p95 {percentile(lags, 95):.0f} ms")
+    unmapped = sum(r.unmapped for r in replays)
+    if unmapped:
+        log(f"  Ids sin equivalente en el replay: {unmapped} (se usó el id grabado)", Colors.WARN)
+    skipped = sum(r.skipped for r in replays)
+    if skipped:
+        log(f"  Cargas omitidas: {skipped} (grabadas sin cuerpo por superar MAX_TRACED_UPLOAD)", Colors.WARN)
+
+    log(f"\n  {'Endpoint':<40}{'n':>6}{'p50 rec':>9}{'p50 rep':>9}{'Δp50':>7}{'p95 rec':>9}{'p95 rep':>9}{'Δp95':>7}"
+        f"{'err rec':>8}{'err rep':>8}{'status≠':>8}")
+    for key in sorted(recorded, key=lambda k: -len(recorded[k]['ms'])):
+        rec, rep = recorded[key], replayed[key]
+        rec_ms, rep_ms = sorted(rec['ms']), sorted(rep['ms'])
+        cells = []
+        for pct in (50, 95):
+            a, b = percentile(rec_ms, pct), percentile(rep_ms, pct)
+            cells.append((a, b, f"{(b / a - 1) * 100:+.0f}%" if a else ''))
+        # Errores reproducidos normalizados a una copia para comparar con la grabación
+        rep_errors = rep['errors'] / len(replays)
+        color = Colors.FAIL if rep_errors > rec['errors'] else Colors.INFO
+        log(f"  {key:<40}{len(rec_ms):>6}{cells[0][0]:>9.2f}{cells[0][1]:>9.2f}{cells[0][2]:>7}"
+            f"{cells[1][0]:>9.2f}{cells[1][1]:>9.2f}{cells[1][2]:>7}{rec['errors']:>8}{rep_errors:>8.1f}{rep['changed']:>8}", color)
+
+    if changed:
+        log(f"\n  Status distinto al grabado: {len(changed)} request(s)", Colors.WARN)
+        for n, copy, method, path, before, after in changed[:10]:
+            log(f"    #{n} (copia {copy}) {method} {path}: {before} -> {after}")
+        if len(changed) > 10:
+            log(f"    ... y {len(changed) - 10} más")
+    return sum(r['errors'] for r in replayed.values()) / len(replays) > sum(r['errors'] for r in recorded.values())
+
+def run(args):
+    header, events = load_trace(args.trace)
+    if not events:
+        log("El trace no tiene requests", Colors.FAIL)
+        sys.exit(2)
+    credentials = dict(c.split(':', 1) for c in args.credentials.split(',')) if args.credentials else {}
+    speed = 0.0 if args.speed == 'max' else float(args.speed)
+
+    sessions = defaultdict(list)
+    for n, event in enumerate(events):
+        sessions[event[1]].append(n)
+    referenced = {ref[0] for e in events if e[7] for ref in e[7].values()}
+
+    log(f"--- Trace {args.trace}: {len(events)} requests, {len(sessions)} sesiones, grabado {header.get('recorded')} ---",
+        Colors.HEADER)
+    log(f"--- Reproduciendo {args.copies} copia(s) a velocidad {args.speed} contra {CONFIG['host']}:{args.port} ---", Colors.HEADER)
+
+    replays = [Replay(events, referenced) for _ in range(args.copies)]
+    start = time.perf_counter()
+    threads = [threading.Thread(target=replay.run_session, args=(numbers, start, speed, credentials, args.port))
+               for replay in replays for numbers in sessions.values()]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    if report(events, replays, wall, speed):
+        log("\n--- EL REPLAY TIENE ERRORES QUE NO ESTABAN EN LA GRABACIÓN ---", Colors.FAIL)
+        sys.exit(1)
+    log("\n--- REPLAY SIN ERRORES NUEVOS ---", Colors.PASS)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Reproduce un trace de API_TRACE y lo compara con la grabación')
+    parser.add_argument('trace', help='Archivo grabado (.trace / .trace.gz)')
+    parser.add_argument('--speed', default='1', help="Factor de velocidad (1, 2, 10...) o 'max'")
+    parser.add_argument('--copies', type=int, default=1, help='Copias simultáneas del trace')
+    parser.add_argument('--credentials', help='USER:PASS,... para los logins (las claves no se graban)')
+    parser.add_argument('--password', default=CONFIG['pass'], help='Clave para usuarios sin --credentials')
+    parser.add_argument('--port', type=int, default=CONFIG['port'])
+    args = parser.parse_args()
+    CONFIG['pass'] = args.password
+    run(args)
@@ -0,0 +1,254 @@
+"""
+RUNNER - Suites en Paralelo con Usuarios Aislados
+=================================================
+Corre los scripts de tests/ en procesos paralelos, cada uno con un usuario
+recién creado (y sus categorías por defecto), para que no se pisen saldos
+entre sí ni con los datos del admin:
+1. Crea los usuarios directamente en la tabla `users` de la base que sirve el
+   servidor, como create_user.js (no hay API de registro; el hash se calcula
+   una sola vez). Con un servidor en marcha es la única escritura: solo agrega
+   filas nuevas, que ningún caché del servidor conoce todavía. Los usuarios
+   creados se anotan en `<db>.test-users` para poder borrarlos después.
+2. Lanza cada suite con TEST_USER/TEST_PASS/TEST_PORT en el entorno (las suites
+   de carga reciben además un usuario por estudiante con --accounts).
+3. Muestra la salida de cada suite al terminar y un resumen con sus tiempos:
+   el total queda en lo que tarde la suite más lenta.
+4. Limpia sin borrar nunca de la base de un servidor en marcha (sus ETags, el
+   caché de sesiones y los streams SSE no se enterarían):
+   - Con --serve levanta su propio `node server.js` sobre una base temporal vacía;
+     al terminar detiene el servidor y descarta la base entera.
+   - Con un servidor ya corriendo los usuarios quedan; --purge borra los anotados
+     en `<db>.test-users` (con sus filas en toda tabla con columna user_id)
+     cuando el servidor está detenido.
+
+Uso: python3 tests/run_tests.py --serve                  # servidor propio en una base temporal
+     python3 tests/run_tests.py                          # servidor ya corriendo (data/finanzas.sqlite)
+     python3 tests/run_tests.py --db /tmp/x.sqlite --port 3100
+     python3 tests/run_tests.py --only sanity,story --serve --keep-users
+     python3 tests/run_tests.py --purge                  # borra usuarios de corridas anteriores (servidor detenido)
+"""
+
+import argparse
+import os
+import secrets
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from bench_endpoints import ServerProcess
+from gen_dataset import hash_password
+
+CONFIG = {
+    'host': 'localhost',
+    'port': 3000,
+    'db': os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'finanzas.sqlite')
+}
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+USERS_LOG_SUFFIX = '.test-users'  # junto a la base: usuarios creados por cada corrida, para --purge
+
+# Igual que DEFAULT_CATEGORIES de server.js / create_user.js
+DEFAULT_CATEGORIES = [('Comida', 'gasto'), ('Transporte', 'gasto'), ('Salario', 'ingreso'), ('Otros', 'gasto')]
+
+# (nombre, script y argumentos, usuarios extra para --accounts)
+SUITES = [
+    ('sanity', ['sanity_check.py'], 0),
+    ('story', ['user_story_test.py'], 0),
+    ('student', ['student_simulation.py'], 0),
+    ('student_load', ['student_simulation.py', '--load', '10'], 10),
+    ('envelopes', ['stress_envelopes.py', '--threads', '8', '--ops', '25'], 0),
+]
+
+class Colors:
+    PASS = '\033[92m'
+    FAIL = '\033[91m'
+    INFO = '\033[96m'
+    WARN = '\033[93m'
+    HEADER = '\033[95m'
+    ENDC = '\033[0m'
+
+def log(msg, color=Colors.INFO): print(f"{color}{msg}{Colors.ENDC}")
+
+
+def create_users(db_file, names, password_hash):
+    """Inserta los usuarios con sus categorías por defecto; devuelve {nombre: id}."""
+    con = sqlite3.connect(db_file, timeout=30)
+    ids = {}
+    with con:
+        for name in names:
+            user_id = con.execute("INSERT INTO users (username, password_hash) VALUES (?, ?)",
+                                  (name, password_hash)).lastrowid
+            con.executemany("INSERT INTO categorias (user_id, nombre, tipo) VALUES (?, ?, ?)",
+                            ((user_id, nombre, tipo) for nombre, tipo in DEFAULT_CATEGORIES))
+            ids[name] = user_id
+    con.close()
+    return ids
+
+def delete_users(db_file, user_ids):
+    """
+    Borra los usuarios y sus filas en toda tabla con user_id (transacciones primero: sus triggers
+    tocan resumen_mensual y el índice FTS, que como tabla virtual se omite).
+    Solo con el servidor detenido: escribe directo en SQLite, sin pasar por sus cachés.
+    """
+    con = sqlite3.connect(db_file, timeout=30)
+    tables = [name for (name,) in con.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name != 'users' "
+                                              "AND sql NOT LIKE 'CREATE VIRTUAL TABLE%'")
+              if any(col[1] == 'user_id' for col in con.execute(f"PRAGMA table_info({name})"))]
+    tables.sort(key=lambda t: t != 'transacciones')
+    marks = ','.join('?' * len(user_ids))
+    with con:
+        for table in tables:
+            con.execute(f"DELETE FROM {table} WHERE user_id IN ({marks})", user_ids)
+        con.execute(f"DELETE FROM users WHERE id IN ({marks})", user_ids)
+    con.close()
+
+def record_users(db_file, user_ids):
+    """Anota en <db>.test-users los usuarios creados (id y nombre), para que --purge borre solo esos."""
+    with open(db_file + USERS_LOG_SUFFIX, 'a') as f:
+        f.writelines(f"{user_id}\t{name}\n" for name, user_id in user_ids.items())
+
+def test_user_ids(db_file):
+    """Ids de los usuarios anotados por corridas anteriores que siguen existiendo con el mismo nombre."""
+    try:
+        with open(db_file + USERS_LOG_SUFFIX) as f:
+            recorded = [line.rstrip('\n').split('\t', 1) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+    con = sqlite3.connect(db_file, timeout=30)
+    ids = [int(user_id) for user_id, name in recorded
+           if con.execute("SELECT 1 FROM users WHERE id = ? AND username = ?", (int(user_id), name)).fetchone()]
+    con.close()
+    return ids
+
+def server_listening(port):
+    try:
+        socket.create_connection((CONFIG['host'], port), timeout=0.5).close()
+        return True
+    except OSError:
+        return False
+
+def purge(args):
+    if not os.path.exists(args.db):
+        log(f"No existe {args.db}", Colors.FAIL)
+        sys.exit(2)
+    if server_listening(args.port):
+        log(f"Hay un servidor en :{args.port}: detenerlo antes de borrar usuarios de {args.db}", Colors.FAIL)
+        sys.exit(2)
+    user_ids = test_user_ids(args.db)
+    delete_users(args.db, user_ids)
+    if os.path.exists(args.db + USERS_LOG_SUFFIX):
+        os.remove(args.db + USERS_LOG_SUFFIX)
+    log(f"Usuarios de prueba eliminados de {args.db}: {len(user_ids)}")
+
+def run_suite(name, argv, env):
+    started = time.perf_counter()
+    try:
+        out = subprocess.run([sys.executable, *argv], cwd=TESTS_DIR, env=env, capture_output=True, text=True, timeout=900)
+        code, output = out.returncode, out.stdout + out.stderr
+    except subprocess.TimeoutExpired as e:
+        code, output = None, f"{e.stdout or ''}\nTIMEOUT"
+    return name, code, output, time.perf_counter() - started
+
+def run(args):
+    suites = [s for s in SUITES if not args.only or s[0] in args.only.split(',')]
+    if not suites:
+        log(f"Ninguna suite coincide con --only (disponibles: {', '.join(s[0] for s in SUITES)})", Colors.FAIL)
+        sys.exit(2)
+
+    run_id = secrets.token_hex(3)
+    password = f"T{secrets.token_hex(8)}"  # sin '-' inicial (se pasa como argumento a node si no hay bcrypt)
+    password_hash = hash_password(password)
+    if not password_hash:
+        log("Sin bcrypt (ni Python ni node/bcryptjs): no se pueden crear usuarios de prueba", Colors.FAIL)
+        sys.exit(2)
+
+    if args.serve:
+        data_dir = tempfile.mkdtemp(prefix='saulfinanzas-tests-')
+        args.db = os.path.join(data_dir, 'finanzas.sqlite')
+        server = ServerProcess(args.db, args.port)
+        try:
+            server.wait_ready()
+        except RuntimeError:
+            server.stop()
+            shutil.rmtree(data_dir, ignore_errors=True)
+            raise
+        log(f"--- Servidor propio en :{args.port} con base {args.db} ---", Colors.HEADER)
+    elif not os.path.exists(args.db):
+        log(f"No existe {args.db}: indicar con --db la base del servidor (o usar --serve)", Colors.FAIL)
+        sys.exit(2)
+    else:
+        server = None
+    accounts = {}
+    for name, _, extra in suites:
+        accounts[name] = [f"t{run_id}_{name}"] + [f"t{run_id}_{name}_{i:02d}" for i in range(extra)]
+    try:
+        user_ids = create_users(args.db, [u for users in accounts.values() for u in users], password_hash)
+        record_users(args.db, user_ids)
+    except sqlite3.Error:
+        if server:
+            server.stop()
+            shutil.rmtree(data_dir, ignore_errors=True)
+        raise
+    log(f"--- Corrida {run_id}: {len(suites)} suites, {len(user_ids)} usuarios de prueba, {args.jobs or len(suites)} en paralelo ---",
+        Colors.HEADER)
+
+    jobs = []
+    for name, argv, extra in suites:
+        user, *load_users = accounts[name]
+        env = dict(os.environ, TEST_USER=user, TEST_PASS=password, TEST_PORT=str(args.port))
+        if load_users:
+            argv = argv + ['--accounts', ','.join(f"{u}:{password}" for u in load_users)]
+        jobs.append((name, argv, env))
+
+    wall = time.perf_counter()
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=args.jobs or len(jobs)) as pool:
+            for future in as_completed([pool.submit(run_suite, *job) for job in jobs]):
+                name, code, output, elapsed = future.result()
+                results.append((name, code, elapsed))
+                log(f"\n=== {name} ({elapsed:.1f}s) ===", Colors.HEADER)
+                print(output.rstrip())
+    finally:
+        wall = time.perf_counter() - wall
+        if server:
+            # Base propia: se descarta entera con el servidor ya detenido
+            server.stop()
+            if args.keep_users:
+                log(f"\nBase conservada en {args.db} (usuarios con clave {password})", Colors.WARN)
+            else:
+                shutil.rmtree(data_dir, ignore_errors=True)
+        elif args.keep_users:
+            log(f"\nUsuarios conservados (clave {password}): {', '.join(user_ids)}", Colors.WARN)
+        else:
+            log(f"\nUsuarios de prueba conservados ({len(user_ids)}): la base está en uso por el servidor. "
+                f"Para borrarlos, con el servidor detenido: python3 tests/run_tests.py --db {args.db} --purge", Colors.WARN)
+
+    log("\n=== RESUMEN ===", Colors.HEADER)
+    for name, code, elapsed in results:
+        ok = code == 0
+        log(f"  {'PASS' if ok else 'FAIL'}  {name:<14}{elapsed:>7.1f}s" + ('' if ok else f"  (código {code})"),
+            Colors.PASS if ok else Colors.FAIL)
+    log(f"  Total {wall:.1f}s en paralelo (secuencial: {sum(r[2] for r in results):.1f}s)")
+    if any(code != 0 for _, code, _ in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Corre las suites en paralelo, cada una con un usuario nuevo')
+    parser.add_argument('--only', help=f"Suites separadas por coma ({', '.join(s[0] for s in SUITES)})")
+    parser.add_argument('--jobs', type=int, default=0, help='Procesos simultáneos (default: todas las suites)')
+    parser.add_argument('--db', default=CONFIG['db'], help='Base SQLite del servidor (DB_FILE)')
+    parser.add_argument('--port', type=int, default=CONFIG['port'])
+    parser.add_argument('--serve', action='store_true', help='Levantar node server.js sobre una base temporal')
+    parser.add_argument('--keep-users', action='store_true', help='No borrar los usuarios creados (para inspeccionar)')
+    parser.add_argument('--purge', action='store_true',
+                        help='Solo borrar de --db los usuarios de corridas anteriores (con el servidor detenido)')
+    args = parser.parse_args()
+    if args.purge:
+        purge(args)
+    else:
+        run(args)
@@ -7,17 +7,28 @@ Reemplaza a la versión JS por falta de runtime node en el entorno de shell.
 Uso: python3 tests/sanity_check.py
 """
 
-import http.client
+import csv
+import io
 import json
+import os
+import shutil
+import socket
+import sqlite3
 import sys
+import tempfile
 import time as import_time
+from urllib.parse import quote
 
+import db_schema
+from api_client import Session, cents, read_event
+from bench_endpoints import ServerProcess
+
+# TEST_USER/TEST_PASS/TEST_PORT: los define run_tests.py (un usuario nuevo por script)
 CONFIG = {
     'host': 'localhost',
-    'port': 3000,
-    'user': 'admin',
-    'pass': 'Saul123!',
-    'cookie': None
+    'port': int(os.environ.get('TEST_PORT', 3000)),
+    'user': os.environ.get('TEST_USER', 'admin'),
+    'pass': os.environ.get('TEST_PASS', 'Saul123!')
 }
 
 class Colors:
@@ -38,36 +49,13 @@ def log_fail(msg, detail=None):
 def log_info(msg):
     print(f"{Colors.INFO}[INFO]{Colors.ENDC} {msg}")
 
+SESSION = Session(CONFIG['host'], CONFIG['port'])
+
 def request(method, path, body=None):
-    conn = http.client.HTTPConnection(CONFIG['host'], CONFIG['port'])
-    headers = {'Content-Type': 'application/json'}
-    
-    if CONFIG['cookie']:
-        headers['Cookie'] = CONFIG['cookie']
-    
-    json_body = json.dumps(body) if body else None
-    
     try:
-        conn.request(method, '/api' + path, body=json_body, headers=headers)
-        res = conn.getresponse()
-        data = res.read().decode('utf-8')
-        
-        # Capturar cookie en login
-        if path == '/login':
-            cookie_header = res.getheader('Set-Cookie')
-            if cookie_header:
-                CONFIG['cookie'] = cookie_header.split(';')[0]
-                
-        try:
-            parsed = json.loads(data)
-        except:
-            parsed = data
-            
-        return {'status': res.status, 'data': parsed}
+        return SESSION.request(method, path, body)
     except Exception as e:
         log_fail("Error de conexión", str(e))
-    finally:
-        conn.close()
 
 def run_tests():
     print("--- INICIANDO SANITY CHECK (PYTHON) ---\n")
@@ -110,7 +98,7 @@ def run_tests():
         # Integridad
         inc = stats['data'].get('income', 0)
         exp = stats['data'].get('expense', 0)
-        if abs((inc - exp) - bal) < 0.01:
+        if cents(inc) - cents(exp) == cents(bal):
             log_pass("Integridad contable OK")
         else:
             log_fail("Discrepancia en contabilidad", f"{inc} - {exp} != {bal}")
@@ -158,7 +146,250 @@ def run_tests():
     else:
         log_fail("Fallo al actualizar presupuesto", budgets_update['data'])
 
+    # 8. FILTROS Y PAGINACIÓN DE TRANSACCIONES
+    log_info("8. Probando Filtros y Paginación de Transacciones...")
+    month = import_time.strftime('%Y-%m')
+    monthly = request('GET', f'/transactions?month={month}')
+    if monthly['status'] == 200 and all(t['fecha'].startswith(month) for t in monthly['data']):
+        log_pass(f"Filtro mensual OK ({len(monthly['data'])} items en {month})")
+    else:
+        log_fail("Falló filtro mensual", monthly['data'])
+
+    pages, cursor = [], None
+    while True:
+        page = request('GET', f'/transactions?month={month}&limit=50' + (f'&cursor={cursor}' if cursor else ''))
+        if page['status'] != 200 or len(page['data']['data']) > 50:
+            log_fail("Falló paginación", page['data'])
+        pages.extend(page['data']['data'])
+        cursor = page['data']['nextCursor']
+        if not cursor:
+            break
+    if [t['id'] for t in pages] == [t['id'] for t in monthly['data']]:
+        log_pass(f"Paginación keyset OK ({len(pages)} items)")
+    else:
+        log_fail("Paginación no coincide con el listado completo")
+
+    if request('GET', '/transactions?month=2024-13x')['status'] == 400:
+        log_pass("Filtro inválido rechazado (400)")
+    else:
+        log_fail("Filtro inválido no fue rechazado")
+
+    # 9. DASHBOARD AGREGADO
+    log_info("9. Probando Dashboard Agregado...")
+    dash = request('GET', f'/dashboard?month={month}')
+    if dash['status'] != 200:
+        log_fail("Falló /dashboard", dash['data'])
+    d = dash['data']
+    income = sum(t['monto'] for t in monthly['data'] if t['tipo'] == 'ingreso')
+    expense = sum(t['monto'] for t in monthly['data'] if t['tipo'] == 'gasto')
+    budget_spent = sum(t['monto'] for t in monthly['data'] if t['tipo'] == 'gasto' and t['categoria'] != 'Ahorro')
+    if cents(d['income']) == cents(income) and cents(d['expense']) == cents(expense) and cents(d['budget']['spent']) == cents(budget_spent):
+        log_pass(f"Totales del mes OK (Ingresos: {d['income']}, Gastos: {d['expense']})")
+    else:
+        log_fail("Dashboard no coincide con las transacciones del mes", d)
+    if cents(d['balance']) == cents(stats['data']['balance']) and all(c['categoria'] != 'Ahorro' for c in d['categories']):
+        log_pass(f"Balance global y categorías OK ({len(d['categories'])} categorías)")
+    else:
+        log_fail("Dashboard: balance o categorías incorrectos", d)
+
+    # 10. EXPORTACIÓN EN STREAM
+    log_info("10. Probando Exportación NDJSON/CSV...")
+    exported = request('GET', f'/transactions/export?format=ndjson&month={month}')
+    body = exported['data']  # api_client parsea como JSON si hay una sola fila
+    rows = [body] if isinstance(body, dict) else [json.loads(line) for line in body.splitlines() if line]
+    if exported['status'] == 200 and [r['id'] for r in rows] == [t['id'] for t in monthly['data']]:
+        log_pass(f"Exportación NDJSON OK ({len(rows)} filas, mismo orden que el listado)")
+    else:
+        log_fail("Exportación NDJSON no coincide con el listado", exported['data'])
+    exported = request('GET', f'/transactions/export?format=csv&month={month}')
+    rows = list(csv.DictReader(io.StringIO(exported['data']))) if isinstance(exported['data'], str) else []
+    if exported['status'] == 200 and len(rows) == len(monthly['data']):
+        log_pass(f"Exportación CSV OK ({len(rows)} filas)")
+    else:
+        log_fail("Exportación CSV incorrecta", exported['data'])
+
+    # 11. GET CONDICIONAL (ETag / 304)
+    log_info("11. Probando ETag e If-None-Match...")
+    first = request('GET', '/savings')
+    etag = first['headers'].get('etag')
+    again = SESSION.request('GET', '/savings', headers={'If-None-Match': etag or ''})
+    if etag and again['status'] == 304:
+        log_pass(f"304 sin cambios ({etag})")
+    else:
+        log_fail("GET condicional no devolvió 304", again['status'])
+    created = request('POST', '/savings', {'nombre': f'ETag {int(import_time.time())}', 'icono': '🧪'})
+    changed = SESSION.request('GET', '/savings', headers={'If-None-Match': etag})
+    if created['status'] == 200 and changed['status'] == 200 and changed['headers'].get('etag') != etag:
+        log_pass("La escritura invalida el ETag (200 con ETag nuevo)")
+    else:
+        log_fail("El ETag no cambió tras crear un sobre", changed['status'])
+    # Fondos propios para el depósito (un usuario recién creado tiene saldo 0)
+    funding = request('POST', '/transactions', {'fecha': '2001-01-15', 'tipo': 'ingreso', 'categoria': 'Test',
+                                                'monto': 1, 'descripcion': 'Fondos ETag'})['data']
+    etag = request('GET', '/savings')['headers'].get('etag')
+    deposit = request('PUT', f"/savings/{created['data']['id']}/deposit", {'monto': 1})
+    if deposit['status'] != 200:
+        log_fail("Depósito rechazado", deposit)
+    request('PUT', f"/savings/{created['data']['id']}/withdraw", {'monto': 1})
+    if SESSION.request('GET', '/savings', headers={'If-None-Match': etag})['status'] == 200:
+        log_pass("Depósito/retiro también invalidan el ETag")
+    else:
+        log_fail("Depósito no cambió la versión de datos")
+    request('DELETE', f"/savings/{created['data']['id']}")
+    request('DELETE', f"/transactions/{funding.get('id')}")
+
+    # 12. MONTOS EXACTOS Y FECHAS VÁLIDAS (céntimos / yyyymmdd)
+    log_info("12. Probando Sumas Exactas y Validación de Fechas...")
+    ids = [request('POST', '/transactions', {'fecha': '2001-02-28', 'tipo': 'ingreso', 'categoria': 'Test',
+                                             'monto': m, 'descripcion': 'Céntimos'})['data'].get('id')
+           for m in (0.1, 0.2, 0.7)]
+    total = request('GET', '/dashboard?month=2001-02')['data'].get('income')
+    rows = request('GET', '/transactions?from=2001-02-28&to=2001-02-28')['data']
+    if total == 1.0 and sorted(t['monto'] for t in rows if t['id'] in ids) == [0.1, 0.2, 0.7] \
+            and all(t['fecha'] == '2001-02-28' for t in rows):
+        log_pass("0.1 + 0.2 + 0.7 == 1.0 exacto, montos y fechas con el mismo formato")
+    else:
+        log_fail("Suma o formato inesperado", {'total': total, 'rows': rows})
+    for i in ids:
+        request('DELETE', f'/transactions/{i}')
+    bad = [request('POST', '/transactions', {'fecha': f, 'tipo': 'gasto', 'categoria': 'Test', 'monto': 1})['status']
+           for f in ('2001-02-30', '28/02/2001')]
+    if bad == [400, 400]:
+        log_pass("Fechas inválidas rechazadas (400)")
+    else:
+        log_fail("Fechas inválidas aceptadas", bad)
+    bad = [request('POST', '/transactions', {'fecha': '2001-02-28', 'tipo': 'gasto', 'categoria': 'Test', 'monto': m})['status']
+           for m in (1.005, '1e3', '0x10', 1e300)]
+    if bad == [400, 400, 400, 400]:
+        log_pass("Montos inválidos rechazados (400): más de 2 decimales, notación científica, hex, fuera de rango")
+    else:
+        log_fail("Montos inválidos aceptados", bad)
+
+    # 13. BÚSQUEDA DE TEXTO COMPLETO (FTS5)
+    log_info("13. Probando Búsqueda de Texto Completo...")
+    tag = f"prueba{int(import_time.time() * 1000)}"
+    ids = [request('POST', '/transactions', {'fecha': fecha, 'tipo': 'gasto', 'categoria': categoria,
+                                             'monto': 1, 'descripcion': desc})['data'].get('id')
+           for fecha, categoria, desc in (('2001-03-01', 'Libros', f'Libro Física {tag}'),
+                                          ('2001-03-02', 'Libros', f'Física {tag}'),
+                                          ('2001-03-03', 'Libros', f'Fotocopias {tag}'))]
+    q = quote(f"libro FISICA {tag}")
+    found = [t['id'] for t in request('GET', f'/transactions/search?q={q}')['data'].get('data', [])]
+    if found == ids[:2]:
+        log_pass("Sin acentos ni mayúsculas, prefijos y descripción antes que categoría")
+    else:
+        log_fail("Resultados de búsqueda inesperados", {'esperado': ids[:2], 'recibido': found})
+    first = request('GET', f'/transactions/search?q={q}&limit=1')['data']
+    second = request('GET', f"/transactions/search?q={q}&limit=1&cursor={first.get('nextCursor')}")['data']
+    if [t['id'] for t in first['data'] + second['data']] == ids[:2] and second['nextCursor'] is None:
+        log_pass("Paginación de resultados con cursor")
+    else:
+        log_fail("Paginación de búsqueda inesperada", {'primera': first, 'segunda': second})
+    for i in ids:
+        request('DELETE', f'/transactions/{i}')
+    after = request('GET', f'/transactions/search?q={tag}')['data'].get('data')
+    empty = request('GET', '/transactions/search?q=%20-%20')['status']
+    if after == [] and empty == 400:
+        log_pass("Índice sincronizado al borrar y q vacío rechazado (400)")
+    else:
+        log_fail("Índice desincronizado o q vacío aceptado", {'restantes': after, 'status': empty})
+
+    # 14. SINCRONIZACIÓN INCREMENTAL (tombstones)
+    log_info("14. Probando Sincronización Incremental...")
+    marks = {'lastId': 0, 'lastDeleted': 0, 'more': True}
+    while marks['more']:
+        marks = request('GET', f"/transactions/changes?since_id={marks['lastId']}&since_deleted={marks['lastDeleted']}")['data']
+    ids = [request('POST', '/transactions', {'fecha': '2001-04-01', 'tipo': 'gasto', 'categoria': 'Test',
+                                             'monto': 1, 'descripcion': f'Delta {n}'})['data'].get('id') for n in (1, 2)]
+    request('DELETE', f'/transactions/{ids[0]}')
+    delta = request('GET', f"/transactions/changes?since_id={marks['lastId']}&since_deleted={marks['lastDeleted']}")['data']
+    if [t['id'] for t in delta.get('data', [])] == ids[1:] and delta.get('deleted') == ids[:1] \
+            and delta['lastId'] == ids[1] and delta['lastDeleted'] > marks['lastDeleted']:
+        log_pass(f"Delta con solo lo nuevo ({ids[1]}) y lo borrado ({ids[0]})")
+    else:
+        log_fail("Delta inesperado", {'ids': ids, 'delta': delta})
+    request('DELETE', f'/transactions/{ids[1]}')
+    bad = request('GET', '/transactions/changes?since_id=-1')['status']
+    if bad == 400:
+        log_pass("Marca inválida rechazada (400)")
+    else:
+        log_fail("since_id inválido aceptado", bad)
+
+    # 15. EVENTOS EN VIVO (SSE)
+    log_info("15. Probando Stream de Eventos...")
+    stream = SESSION.events()
+    first = read_event(stream)
+    created = request('POST', '/transactions', {'fecha': '2001-05-01', 'tipo': 'ingreso', 'categoria': 'Test',
+                                                'monto': 12.5, 'descripcion': 'Evento'})['data']
+    pushed = [read_event(stream), read_event(stream)]
+    stats = request('GET', '/stats')['data']
+    request('DELETE', f"/transactions/{created.get('id')}")
+    removed = read_event(stream)
+    stream.close()
+    if first[0] == 'hola' and pushed[0][0] == 'transaccion' and pushed[0][1]['transaccion']['id'] == created.get('id') \
+            and pushed[0][1]['transaccion']['monto'] == 12.5 and pushed[1] == ('balance', stats) \
+            and removed == ('transaccion', {'accion': 'baja', 'id': created.get('id')}):
+        log_pass("Alta, balance y baja llegan por el stream")
+    else:
+        log_fail("Eventos inesperados", {'hola': first, 'alta': pushed, 'baja': removed, 'stats': stats})
+
+    legacy_null_dates()
+
     print(f"\n{Colors.PASS}--- TODAS LAS PRUEBAS PASARON EXITOSAMENTE ---{Colors.ENDC}")
 
+# Base legada (v3) con fechas NULL: 500 con fecha y 1200 sin, así los cortes de página de la
+# exportación (1000) y del listado (300) caen dentro del bloque NULL, que ordena al final
+LEGACY_DATED, LEGACY_NULL = 500, 1200
+
+def legacy_null_dates():
+    """Exportación y paginación con filas sin fecha que conserva la migración 4 (servidor propio)."""
+    log_info("16. Probando Fechas NULL Legadas (exportación y paginación)...")
+    if not shutil.which('node'):
+        log_info("Sin node: se omite (necesita levantar un servidor sobre una base propia)")
+        return
+    data_dir = tempfile.mkdtemp(prefix='saulfinanzas-sanity-')
+    db_file = os.path.join(data_dir, 'finanzas.sqlite')
+    con = sqlite3.connect(db_file)
+    db_schema.create_tables(con)
+    db_schema.migrate(con, target=3)
+    with con:
+        con.executemany("INSERT INTO transacciones (user_id, fecha, tipo, categoria, monto, descripcion) VALUES (1, ?, 'gasto', 'Otros', 1.5, ?)",
+                        [(f'2020-01-{i % 28 + 1:02d}', f'legado {i}') for i in range(LEGACY_DATED)]
+                        + [(None, f'sin fecha {i}') for i in range(LEGACY_NULL)])
+    expected = [i for (i,) in con.execute("SELECT id FROM transacciones ORDER BY fecha DESC, id DESC")]
+    con.close()
+
+    with socket.socket() as probe:
+        probe.bind(('localhost', 0))
+        port = probe.getsockname()[1]
+    server = ServerProcess(db_file, port, env={'ADMIN_PASSWORD': 'Legado123!'})
+    try:
+        server.wait_ready()
+        session = Session(CONFIG['host'], port)
+        session.login('admin', 'Legado123!')
+        exported = session.request('GET', '/transactions/export?format=ndjson')
+        exported_ids = [json.loads(line)['id'] for line in exported['data'].splitlines() if line]
+        listed, cursor = [], None
+        while True:
+            page = session.request('GET', '/transactions?limit=300' + (f'&cursor={cursor}' if cursor else ''))
+            if page['status'] != 200:
+                break
+            listed += [t['id'] for t in page['data']['data']]
+            cursor = page['data']['nextCursor']
+            if not cursor:
+                break
+    finally:
+        server.stop()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    if exported['status'] == 200 and exported_ids == expected:
+        log_pass(f"Exportación completa con {LEGACY_NULL} fechas NULL ({len(exported_ids)} filas, corte dentro del bloque NULL)")
+    else:
+        log_fail("Exportación incompleta con fechas NULL", {'esperadas': len(expected), 'exportadas': len(exported_ids)})
+    if page['status'] == 200 and listed == expected:
+        log_pass(f"Paginación con cursor atraviesa las fechas NULL ({len(listed)} filas)")
+    else:
+        log_fail("Paginación cortada en las fechas NULL", {'status': page['status'], 'listadas': len(listed), 'esperadas': len(expected)})
+
 if __name__ == "__main__":
     run_tests()
@@ -0,0 +1,182 @@
+"""
+SERVER METRICS - Scrape y diff de GET /api/metrics
+==================================================
+Lee la exposición Prometheus del servidor y resume la diferencia entre dos
+lecturas: requests, latencia (media y p50/p95 estimados desde los buckets),
+bytes por ruta, las sentencias SQL que más tiempo consumieron y la cola de
+escrituras. Los scripts de carga lo usan con --metrics (antes/después de la corrida).
+En modo cluster (WORKERS > 1) las series traen un label `worker`; se suman entre workers.
+
+Uso:
+    python3 tests/server_metrics.py              # resumen acumulado desde que arrancó el servidor
+    python3 tests/server_metrics.py --raw        # texto Prometheus tal cual
+
+    import server_metrics
+    before = server_metrics.scrape(session)      # sesión de admin (o METRICS_TOKEN)
+    ... carga ...
+    server_metrics.report(server_metrics.diff(before, server_metrics.scrape(session)))
+"""
+
+import argparse
+import os
+import re
+import sys
+from collections import defaultdict
+
+from api_client import Session
+
+# TEST_PORT: el mismo que usan las suites de run_tests.py (o --port)
+CONFIG = {
+    'host': 'localhost',
+    'port': int(os.environ.get('TEST_PORT', 3000)),
+    'user': 'admin',
+    'pass': 'Saul123!'
+}
+
+LINE_RE = re.compile(r'^([a-zA-Z_:][\w:]*)(?:\{(.*)\})? (\S+)$')
+LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+# Gauges que no tiene sentido sumar entre workers: se toma el máximo
+MAX_ACROSS_WORKERS = {'nodejs_eventloop_delay_p99_seconds', 'process_uptime_seconds'}
+
+class Colors:
+    INFO = '\033[96m'
+    FAIL = '\033[91m'
+    HEADER = '\033[95m'
+    ENDC = '\033[0m'
+
+def log(msg, color=Colors.INFO): print(f"{color}{msg}{Colors.ENDC}")
+
+def _unescape(value):
+    return value.replace('\\n', '\n').replace('\\"', '"').replace('\\\\', '\\')
+
+def parse(text):
+    """{(nombre, ((label, valor), ...)): float} y {nombre_base: tipo}, sumando entre workers."""
+    samples, types, workers = {}, {}, set()
+    for line in text.splitlines():
+        if line.startswith('# TYPE '):
+            _, _, name, kind = line.split(' ', 3)
+            types[name] = kind
+            continue
+        match = LINE_RE.match(line)
+        if not match:
+            continue
+        name, labels, value = match.groups()
+        pairs = [(k, _unescape(v)) for k, v in LABEL_RE.findall(labels or '')]
+        workers.update(v for k, v in pairs if k == 'worker')
+        key = (name, tuple(sorted(p for p in pairs if p[0] != 'worker')))
+        if name in MAX_ACROSS_WORKERS:
+            samples[key] = max(samples.get(key, 0.0), float(value))
+        else:
+            samples[key] = samples.get(key, 0.0) + float(value)
+    return {'samples': samples, 'types': types, 'workers': len(workers) or 1}
+
+def scrape(session, token=None):
+    """Lee /api/metrics con la sesión (admin) o con `token` (Bearer METRICS_TOKEN)."""
+    headers = {'Authorization': f'Bearer {token}'} if token else None
+    res = session.request('GET', '/metrics', headers=headers)
+    if res['status'] != 200:
+        raise RuntimeError(f"GET /api/metrics -> {res['status']}: {res['data']}")
+    return parse(res['data'])
+
+def _base(name):
+    for suffix in ('_bucket', '_sum', '_count'):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+def diff(before, after):
+    """Contadores e histogramas como delta; gauges con el valor final."""
+    types = after['types']
+    delta = {}
+    for key, value in after['samples'].items():
+        kind = types.get(_base(key[0])) or types.get(key[0])
+        delta[key] = value if kind == 'gauge' else value - before['samples'].get(key, 0.0)
+    return {'samples': delta, 'types': types, 'workers': after['workers']}
+
+def _histograms(metrics, name):
+    """{labels sin le: {'buckets': [(le, acumulado)], 'sum', 'count'}}"""
+    out = defaultdict(lambda: {'buckets': [], 'sum': 0.0, 'count': 0.0})
+    for (metric, labels), value in metrics['samples'].items():
+        if _base(metric) != name:
+            continue
+        rest = tuple(l for l in labels if l[0] != 'le')
+        if metric.endswith('_bucket'):
+            le = dict(labels)['le']
+            out[rest]['buckets'].append((float('inf') if le == '+Inf' else float(le), value))
+        elif metric.endswith('_sum'):
+            out[rest]['sum'] = value
+        elif metric.endswith('_count'):
+            out[rest]['count'] = value
+    return out
+
+def quantile(hist, q):
+    """Límite superior del bucket que contiene el cuantil q (estimación conservadora), en ms."""
+    if not hist['count']:
+        return 0.0
+    target = q * hist['count']
+    for le, cumulative in sorted(hist['buckets']):
+        if cumulative >= target:
+            return le * 1000
+    return float('inf')
+
+def _value(metrics, name, **labels):
+    return metrics['samples'].get((name, tuple(sorted(labels.items()))), 0.0)
+
+def report(metrics, top=10, say=log):
+    """Imprime el resumen de una lectura o de un diff."""
+    http = _histograms(metrics, 'http_request_duration_seconds')
+    workers = metrics.get('workers', 1)
+    say(f"\n=== MÉTRICAS DEL SERVIDOR{f' ({workers} workers)' if workers > 1 else ''} ===", Colors.HEADER)
+    say(f"  {'Ruta':<44}{'reqs':>7}{'media ms':>10}{'p50≤':>8}{'p95≤':>8}{'KB in':>9}{'KB out':>10}{'4xx/5xx':>9}")
+    status = defaultdict(float)
+    for (metric, labels), value in metrics['samples'].items():
+        if metric == 'http_requests_total' and int(dict(labels)['status']) >= 400:
+            status[(dict(labels)['method'], dict(labels)['route'])] += value
+    for labels, h in sorted(http.items(), key=lambda item: -item[1]['sum']):
+        if not h['count']:
+            continue
+        l = dict(labels)
+        kb_in = _value(metrics, 'http_request_bytes_total', **l) / 1024
+        kb_out = _value(metrics, 'http_response_bytes_total', **l) / 1024
+        say(f"  {l['method'] + ' ' + l['route']:<44}{h['count']:>7.0f}{h['sum'] / h['count'] * 1000:>10.2f}"
+            f"{quantile(h, 0.5):>8g}{quantile(h, 0.95):>8g}{kb_in:>9.1f}{kb_out:>10.1f}{status[(l['method'], l['route'])]:>9.0f}")
+
+    sql = _histograms(metrics, 'sqlite_query_duration_seconds')
+    ranked = sorted((item for item in sql.items() if item[1]['count']), key=lambda item: -item[1]['sum'])[:top]
+    if ranked:
+        say(f"\n  Top {len(ranked)} sentencias SQL por tiempo total", Colors.HEADER)
+        say(f"  {'db':<7}{'veces':>8}{'total ms':>11}{'media ms':>10}{'p95≤':>8}  sql")
+        for labels, h in ranked:
+            l = dict(labels)
+            errors = _value(metrics, 'sqlite_query_errors_total', **l)
+            text = l['sql'] if len(l['sql']) <= 90 else l['sql'][:87] + '...'
+            say(f"  {l['db']:<7}{h['count']:>8.0f}{h['sum'] * 1000:>11.1f}{h['sum'] / h['count'] * 1000:>10.2f}"
+                f"{quantile(h, 0.95):>8g}  {text}" + (f"  [{errors:.0f} errores]" if errors else ''),
+                Colors.FAIL if errors else Colors.INFO)
+
+    batches = _value(metrics, 'write_queue_batches_total')
+    jobs = _value(metrics, 'write_queue_jobs_total')
+    if batches:
+        say(f"\n  Cola de escrituras: {jobs:.0f} trabajos en {batches:.0f} lotes ({jobs / batches:.2f} por commit), "
+            f"{_value(metrics, 'write_queue_failed_total'):.0f} rechazados")
+    say(f"  En vuelo: {_value(metrics, 'http_requests_in_flight'):.0f}  RSS: {_value(metrics, 'process_resident_memory_bytes') / 1e6:.0f} MB  "
+        f"Event loop p99: {_value(metrics, 'nodejs_eventloop_delay_p99_seconds') * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Resumen de GET /api/metrics')
+    parser.add_argument('--raw', action='store_true', help='Imprimir el texto Prometheus sin procesar')
+    parser.add_argument('--token', help='METRICS_TOKEN del servidor (en vez de login de admin)')
+    parser.add_argument('--top', type=int, default=10, help='Sentencias SQL a listar')
+    parser.add_argument('--port', type=int, default=CONFIG['port'])
+    args = parser.parse_args()
+    CONFIG['port'] = args.port
+
+    session = Session(CONFIG['host'], CONFIG['port'])
+    if not args.token and session.login(CONFIG['user'], CONFIG['pass'])['status'] != 200:
+        log("Login fallido", Colors.FAIL)
+        sys.exit(1)
+    if args.raw:
+        headers = {'Authorization': f'Bearer {args.token}'} if args.token else None
+        print(session.request('GET', '/metrics', headers=headers)['data'], end='')
+    else:
+        report(scrape(session, args.token), top=args.top)
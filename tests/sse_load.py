@@ -0,0 +1,278 @@
+"""
+CARGA SSE - Muchos streams abiertos de GET /api/events
+======================================================
+Abre --streams conexiones Server-Sent Events repartidas entre usuarios de un dataset
+de tests/gen_dataset.py (--per-user streams por usuario, como pestañas/dispositivos),
+todas en un solo hilo con `selectors` (sin un hilo por stream). Luego escribe
+transacciones de usuarios al azar a --rate escrituras/s y mide:
+- Conexión: tiempo hasta recibir el evento inicial `hola`.
+- Entrega: desde antes del POST hasta que cada stream del usuario recibe el evento
+  `transaccion` (p50/p95/p99/máx) y eventos perdidos (esperados - recibidos).
+- Balance: cada escritura debe llegar seguida de su evento `balance`.
+
+Levanta `node server.js` sobre el dataset (DB_FILE/PORT) salvo con --live, y sube el
+límite de archivos abiertos (RLIMIT_NOFILE) al máximo permitido antes de conectar.
+
+Uso: python3 tests/sse_load.py
+     python3 tests/sse_load.py --streams 5000 --per-user 5 --rate 100 --duration 20
+     python3 tests/sse_load.py --live --port 3000 --streams 200   # servidor ya levantado sobre --db
+     WORKERS=4 python3 tests/sse_load.py --streams 2000             # eventos entre workers (cluster)
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import selectors
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+import gen_dataset
+from api_client import Session, percentile
+from bench_endpoints import ServerProcess
+
+CONFIG = {
+    'host': 'localhost',
+    'port': 3400,
+    'db': '/tmp/sse_load.sqlite',
+    'pass': gen_dataset.DEFAULT_PASSWORD
+}
+
+class Colors:
+    PASS = '\033[92m'
+    FAIL = '\033[91m'
+    INFO = '\033[96m'
+    WARN = '\033[93m'
+    HEADER = '\033[95m'
+    ENDC = '\033[0m'
+
+def log(msg, color=Colors.INFO): print(f"{color}{msg}{Colors.ENDC}")
+
+class EventStream:
+    """Un stream SSE sobre un socket no bloqueante: HTTP/1.1 chunked -> eventos (tipo, data)."""
+
+    def __init__(self, user, cookie, host, port):
+        self.user = user
+        self.sock = socket.create_connection((host, port), timeout=10)
+        self.sock.sendall((f"GET /api/events HTTP/1.1\r\nHost: {host}:{port}\r\nAccept: text/event-stream\r\n"
+                           f"Cookie: {cookie}\r\n\r\n").encode())
+        self.sock.setblocking(False)
+        self.opened = time.perf_counter()
+        self.raw = b''
+        self.text = ''
+        self.headers_done = False
+        self.status = None
+        self.closed = False
+
+    def feed(self):
+        """Lee lo disponible; devuelve la lista de eventos completos [(tipo, data)]."""
+        try:
+            chunk = self.sock.recv(65536)
+        except BlockingIOError:
+            return []
+        if not chunk:
+            self.closed = True
+            return []
+        self.raw += chunk
+        if not self.headers_done:
+            if b'\r\n\r\n' not in self.raw:
+                return []
+            head, self.raw = self.raw.split(b'\r\n\r\n', 1)
+            self.status = int(head.split(b' ', 2)[1])
+            self.headers_done = True
+        self._dechunk()
+        events = []
+        while '\n\n' in self.text:
+            block, self.text = self.text.split('\n\n', 1)
+            fields = dict(line.split(': ', 1) for line in block.split('\n') if ': ' in line and not line.startswith(':'))
+            if 'event' in fields:
+                events.append((fields['event'], json.loads(fields.get('data', 'null'))))
+        return events
+
+    def _dechunk(self):
+        while b'\r\n' in self.raw:
+            size_line, rest = self.raw.split(b'\r\n', 1)
+            size = int(size_line.split(b';')[0], 16)
+            if size == 0:
+                self.closed = True
+                return
+            if len(rest) < size + 2:
+                return
+            self.text += rest[:size].decode()
+            self.raw = rest[size + 2:]
+
+    def close(self):
+        self.sock.close()
+
+def raise_fd_limit(needed):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = hard if hard != resource.RLIM_INFINITY else max(soft, needed)
+    if soft < target:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    if target < needed:
+        log(f"  Aviso: RLIMIT_NOFILE={target} < {needed} sockets necesarios (ulimit -n)", Colors.WARN)
+
+def prepare(args):
+    if not os.path.exists(args.db):
+        log(f"--- Generando {args.db} ({args.users} usuarios x {args.years} años) ---", Colors.HEADER)
+        subprocess.run([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gen_dataset.py'),
+                        '--out', args.db, '--users', str(args.users), '--years', str(args.years),
+                        '--seed', str(args.seed), '--password', args.password], check=True)
+    con = sqlite3.connect(f"file:{args.db}?mode=ro", uri=True)
+    users = [name for (name,) in con.execute('SELECT username FROM users ORDER BY id')]
+    con.close()
+    return users
+
+class Reader(threading.Thread):
+    """Hilo único que atiende todos los sockets y registra la llegada de cada evento."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.selector = selectors.DefaultSelector()
+        self.lock = threading.Lock()
+        self.connect_ms = []
+        self.arrivals = {}      # descripción -> [instante de llegada por stream]
+        self.balances = 0
+        self.refused = 0
+        self.dropped = 0
+        self.running = True
+
+    def add(self, stream):
+        self.selector.register(stream.sock, selectors.EVENT_READ, stream)
+
+    def run(self):
+        while self.running:
+            for key, _ in self.selector.select(timeout=0.2):
+                stream = key.data
+                now = time.perf_counter()
+                for kind, data in stream.feed():
+                    with self.lock:
+                        if kind == 'hola':
+                            self.connect_ms.append((now - stream.opened) * 1000)
+                        elif kind == 'transaccion' and data.get('accion') == 'alta':
+                            self.arrivals.setdefault(data['transaccion']['descripcion'], []).append(now)
+                        elif kind == 'balance':
+                            self.balances += 1
+                if stream.closed:
+                    self.selector.unregister(stream.sock)
+                    with self.lock:
+                        if stream.status == 429:
+                            self.refused += 1
+                        else:
+                            self.dropped += 1
+
+    def stop(self):
+        self.running = False
+        self.join()
+
+def write_load(args, sessions, month):
+    """POST de transacciones a --rate/s durante --duration s; devuelve {descripción: (inicio, usuario, id)}."""
+    rng = random.Random(args.seed)
+    sent = {}
+    interval = 1.0 / args.rate
+    deadline = time.perf_counter() + args.duration
+    n = 0
+    while time.perf_counter() < deadline:
+        user = rng.choice(list(sessions))
+        n += 1
+        desc = f"sse {os.getpid()} {n}"
+        started = time.perf_counter()
+        res = sessions[user].request('POST', '/transactions', {'fecha': f"{month}-15", 'tipo': 'gasto',
+                                                               'categoria': 'Otros', 'monto': 1, 'descripcion': desc})
+        if res['status'] != 200:
+            raise RuntimeError(f"POST /transactions: {res['status']} {res['data']}")
+        sent[desc] = (started, user, res['data']['id'])
+        time.sleep(max(0.0, started + interval - time.perf_counter()))
+    return sent
+
+def run(args):
+    users = prepare(args)
+    count = -(-args.streams // args.per_user)
+    if count > len(users):
+        raise SystemExit(f"El dataset tiene {len(users)} usuarios; se necesitan {count} (--streams / --per-user)")
+    raise_fd_limit(args.streams + count + 256)
+
+    server = None
+    if not args.live:
+        server = ServerProcess(args.db, args.port)
+        server.wait_ready(timeout=600)
+    streams, reader, sessions, sent = [], None, {}, {}
+    try:
+        rng = random.Random(args.seed)
+        for username in rng.sample(users, count):
+            session = Session(CONFIG['host'], args.port)
+            if session.login(username, args.password)['status'] != 200:
+                raise RuntimeError(f"Login fallido para {username} (--password)")
+            sessions[username] = session
+
+        log(f"--- {len(sessions)} usuarios x {args.per_user} streams = {args.streams} conexiones SSE en :{args.port} ---", Colors.HEADER)
+        started = time.perf_counter()
+        reader = Reader()
+        reader.start()
+        for i in range(args.streams):
+            username = list(sessions)[i % len(sessions)]
+            cookie = '; '.join(f"{k}={v}" for k, v in sessions[username].cookies.items())
+            streams.append(EventStream(username, cookie, CONFIG['host'], args.port))
+            reader.add(streams[-1])
+        while len(reader.connect_ms) + reader.refused + reader.dropped < args.streams and time.perf_counter() - started < 60:
+            time.sleep(0.05)
+        opened = sorted(reader.connect_ms)
+        log(f"  Abiertos {len(opened)}/{args.streams} en {time.perf_counter() - started:.2f}s; `hola` p50 "
+            f"{percentile(opened, 50):.1f} ms, p95 {percentile(opened, 95):.1f} ms (429: {reader.refused}, cortados: {reader.dropped})",
+            Colors.PASS if len(opened) == args.streams else Colors.WARN)
+
+        month = time.strftime('%Y-%m')
+        log(f"--- Escrituras: {args.rate:g}/s durante {args.duration:g}s ---", Colors.HEADER)
+        per_stream = {u: sum(1 for s in streams if s.user == u and not s.closed) for u in sessions}
+        sent = write_load(args, sessions, month)
+        time.sleep(args.settle)
+        reader.stop()
+
+        latencies, expected, received = [], 0, 0
+        for desc, (t0, user, _) in sent.items():
+            arrivals = reader.arrivals.get(desc, [])
+            expected += per_stream[user]
+            received += len(arrivals)
+            latencies.extend((t - t0) * 1000 for t in arrivals)
+        latencies.sort()
+        lost = expected - received
+        log(f"\n  {'Escrituras':<12}{'Eventos':>10}{'Perdidos':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'máx ms':>9}")
+        log(f"  {len(sent):<12}{received:>10,}{lost:>10,}{percentile(latencies, 50):>9.2f}{percentile(latencies, 95):>9.2f}"
+            f"{percentile(latencies, 99):>9.2f}{(latencies[-1] if latencies else 0):>9.2f}",
+            Colors.PASS if lost == 0 and percentile(latencies, 95) <= args.target_ms else Colors.WARN)
+        if reader.balances < received:
+            log(f"  Eventos balance: {reader.balances} (esperados {received})", Colors.WARN)
+    finally:
+        if reader and reader.is_alive():
+            reader.stop()
+        for stream in streams:
+            stream.close()
+        # Borrar lo escrito: el dataset queda igual para la próxima corrida
+        for desc, (_, user, tx_id) in sent.items():
+            sessions[user].request('DELETE', f'/transactions/{tx_id}')
+        if server:
+            server.stop()
+
+    log(f"\n  Verde: ningún evento perdido y p95 <= {args.target_ms:g} ms (--target-ms), medido desde antes del POST.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Carga de streams SSE (GET /api/events) con escrituras concurrentes')
+    parser.add_argument('--db', default=CONFIG['db'], help='Dataset de gen_dataset.py (se genera si no existe)')
+    parser.add_argument('--users', type=int, default=300, help='Usuarios al generar')
+    parser.add_argument('--years', type=float, default=0.25, help='Años al generar')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--password', default=CONFIG['pass'], help='Clave de los usuarios del dataset')
+    parser.add_argument('--port', type=int, default=CONFIG['port'])
+    parser.add_argument('--live', action='store_true', help='Usar un servidor ya levantado en --port (sobre --db)')
+    parser.add_argument('--streams', type=int, default=1000, help='Conexiones SSE abiertas en total')
+    parser.add_argument('--per-user', type=int, default=5, help='Streams por usuario (máx. 10 en el servidor)')
+    parser.add_argument('--rate', type=float, default=50, help='Escrituras por segundo')
+    parser.add_argument('--duration', type=float, default=10, help='Segundos de escrituras')
+    parser.add_argument('--settle', type=float, default=1.0, help='Espera final para eventos en camino (s)')
+    parser.add_argument('--target-ms', type=float, default=50.0, help='p95 esperado de entrega')
+    run(parser.parse_args())
@@ -0,0 +1,170 @@
+"""
+STRESS TEST - Depósitos y Retiros Concurrentes sobre un Sobre
+=============================================================
+Varios hilos depositan y retiran del MISMO sobre al mismo tiempo. Al final
+verifica que:
+  1. sobres.saldo == Σ depósitos ('Ahorro') - Σ retiros ('Retiro Ahorro') del libro.
+  2. Las filas del libro coinciden con las operaciones que respondieron 200.
+  3. El saldo del sobre nunca quedó negativo.
+Sin la transacción atómica (BEGIN IMMEDIATE) dos retiros podían pasar la
+verificación de saldo con el mismo valor y sobregirar el sobre.
+
+Uso: python3 tests/stress_envelopes.py
+     python3 tests/stress_envelopes.py --threads 32 --ops 200 --keep
+     python3 tests/stress_envelopes.py --metrics      # + diff de /api/metrics (latencia por ruta, SQL, cola)
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import server_metrics
+from api_client import Session, cents, percentile
+
+# TEST_USER/TEST_PASS/TEST_PORT: los define run_tests.py (un usuario nuevo por script)
+CONFIG = {
+    'host': 'localhost',
+    'port': int(os.environ.get('TEST_PORT', 3000)),
+    'user': os.environ.get('TEST_USER', 'admin'),
+    'pass': os.environ.get('TEST_PASS', 'Saul123!')
+}
+
+class Colors:
+    PASS = '\033[92m'
+    FAIL = '\033[91m'
+    INFO = '\033[96m'
+    HEADER = '\033[95m'
+    ENDC = '\033[0m'
+
+def log(msg, color=Colors.INFO): print(f"{color}{msg}{Colors.ENDC}")
+
+def check(condition, msg):
+    if condition:
+        log(f"[PASS] {msg}", Colors.PASS)
+        return True
+    log(f"[FAIL] {msg}", Colors.FAIL)
+    return False
+
+def new_session():
+    session = Session(CONFIG['host'], CONFIG['port'])
+    if session.login(CONFIG['user'], CONFIG['pass'])['status'] != 200:
+        log("Login fallido", Colors.FAIL)
+        sys.exit(1)
+    return session
+
+def find_envelope(session, name):
+    return next((s for s in session.request('GET', '/savings')['data'] if s['nombre'] == name), None)
+
+def ledger(session, name):
+    """Filas de depósitos/retiros del sobre en el libro de transacciones."""
+    rows = []
+    for categoria, prefix in (('Ahorro', 'Depósito a sobre: '), ('Retiro Ahorro', 'Retiro de sobre: ')):
+        res = session.request('GET', f'/transactions?categoria={categoria.replace(" ", "%20")}')
+        rows += [r for r in res['data'] if r['descripcion'] == prefix + name]
+    return rows
+
+def worker(envelope_id, ops, seed, amounts, results, lock):
+    session = new_session()
+    rng = random.Random(seed)
+    for _ in range(ops):
+        action = rng.choice(('deposit', 'withdraw'))
+        monto = rng.choice(amounts)
+        started = time.perf_counter()
+        res = session.request('PUT', f'/savings/{envelope_id}/{action}', {'monto': monto})
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            results['latencies'].append(elapsed)
+            key = (action, res['status'])
+            results['status'][key] = results['status'].get(key, 0) + 1
+            if res['status'] == 200:
+                results['ok'][action] += monto
+                results['count'][action] += 1
+
+def run(args):
+    session = new_session()
+    name = f"Stress_{int(time.time())}"
+    amounts = [1, 2, 5, 10, 25]
+
+    log(f"--- Preparando sobre '{name}' ---", Colors.HEADER)
+    # Ingreso de respaldo para que haya fondos suficientes para los depósitos
+    funding = args.threads * args.ops * max(amounts)
+    income = session.request('POST', '/transactions', {
+        'fecha': time.strftime('%Y-%m-%d'), 'tipo': 'ingreso', 'categoria': 'Salario',
+        'monto': funding, 'descripcion': f'Fondeo {name}'
+    })
+    session.request('POST', '/savings', {'nombre': name, 'icono': '🧪'})
+    envelope = find_envelope(session, name)
+    if not envelope:
+        log("No se pudo crear el sobre", Colors.FAIL)
+        sys.exit(1)
+
+    # Saldo inicial chico: los retiros compiten por él y deben fallar con 400, nunca sobregirar
+    session.request('PUT', f"/savings/{envelope['id']}/deposit", {'monto': args.initial})
+
+    log(f"--- {args.threads} hilos x {args.ops} operaciones sobre el sobre #{envelope['id']} ---", Colors.HEADER)
+    results = {'latencies': [], 'status': {}, 'ok': {'deposit': 0, 'withdraw': 0}, 'count': {'deposit': 0, 'withdraw': 0}}
+    lock = threading.Lock()
+    before = server_metrics.scrape(session) if args.metrics else None
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        futures = [pool.submit(worker, envelope['id'], args.ops, args.seed + i, amounts, results, lock)
+                   for i in range(args.threads)]
+        for f in futures:
+            f.result()
+    wall = time.perf_counter() - started
+
+    latencies = sorted(results['latencies'])
+    log("\n=== RESULTADOS ===", Colors.HEADER)
+    log(f"  {len(latencies)} operaciones en {wall:.2f}s = {len(latencies) / wall:.1f} ops/s")
+    log(f"  p50 {percentile(latencies, 50):.2f} ms  p95 {percentile(latencies, 95):.2f} ms  max {latencies[-1]:.2f} ms")
+    for (action, status), n in sorted(results['status'].items()):
+        log(f"  {action:<9} {status}: {n}")
+    if before:
+        server_metrics.report(server_metrics.diff(before, server_metrics.scrape(session)))
+
+    log("\n--- Verificación ---", Colors.HEADER)
+    saldo = find_envelope(session, name)['saldo']
+    rows = ledger(session, name)
+    deposits = [r['monto'] for r in rows if r['categoria'] == 'Ahorro']
+    withdrawals = [r['monto'] for r in rows if r['categoria'] == 'Retiro Ahorro']
+    from_ledger = sum(deposits) - sum(withdrawals)
+    expected = args.initial + results['ok']['deposit'] - results['ok']['withdraw']
+    unexpected = {k: v for k, v in results['status'].items() if k[1] not in (200, 400)}
+
+    ok = all([
+        check(cents(saldo) == cents(from_ledger), f"sobres.saldo ({saldo}) == libro ({from_ledger})"),
+        check(cents(saldo) == cents(expected), f"sobres.saldo ({saldo}) == operaciones 200 ({expected})"),
+        check(len(deposits) == results['count']['deposit'] + 1 and len(withdrawals) == results['count']['withdraw'],
+              f"Filas del libro: {len(deposits)} depósitos / {len(withdrawals)} retiros"),
+        check(saldo >= 0, "Saldo del sobre no negativo"),
+        check(not unexpected, f"Sin respuestas fuera de 200/400 {unexpected or ''}"),
+    ])
+
+    if not args.keep:
+        # Vaciar el sobre y borrar todo lo creado (el balance global vuelve al inicial)
+        if saldo > 0:
+            session.request('PUT', f"/savings/{envelope['id']}/withdraw", {'monto': saldo})
+        session.request('DELETE', f"/savings/{envelope['id']}")
+        for row in ledger(session, name):
+            session.request('DELETE', f"/transactions/{row['id']}")
+        if income['status'] == 200:
+            session.request('DELETE', f"/transactions/{income['data']['id']}")
+        log("Datos de prueba eliminados")
+
+    if not ok:
+        sys.exit(1)
+    log("\n--- SALDO Y LIBRO CONSISTENTES ---", Colors.PASS)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Stress de depósitos/retiros concurrentes sobre un mismo sobre')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--ops', type=int, default=100, help='Operaciones por hilo')
+    parser.add_argument('--initial', type=float, default=20.0, help='Saldo inicial del sobre')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--keep', action='store_true', help='No borrar el sobre ni las transacciones creadas')
+    parser.add_argument('--metrics', action='store_true', help='Mostrar el diff de /api/metrics de la corrida')
+    run(parser.parse_args())
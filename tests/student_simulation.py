@@ -3,29 +3,42 @@ STUDENT LIFE SIMULATION
 =======================
 Escenario: Estudiante con Beca.
 Duración: 1 Semana.
-Objetivos: 
+Objetivos:
 - Ingreso Beca (250k)
 - Sobre Alquiler (70k)
 - Presupuestos varios
 - Gastos diarios (Comida, Transporte)
 - Validación Contable
 
+Modo carga (--load N): corre N estudiantes simultáneos (thread pool), cada uno con
+su propia sesión, y reporta throughput y latencias p50/p95/p99 por endpoint.
+Al final valida la integridad contable de cada estudiante simulado.
+
 Uso: python3 tests/student_simulation.py
+     python3 tests/student_simulation.py --load 50 --ramp-up 10 --think 0.05:0.3
+     python3 tests/student_simulation.py --load 20 --accounts ana:Pass1!,luis:Pass2!
+     python3 tests/student_simulation.py --load 50 --metrics   # + diff de /api/metrics (requiere admin en CONFIG)
 """
 
-import http.client
-import json
+import argparse
+import os
+import re
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, timedelta
 import random
 
+import server_metrics
+from api_client import Session, cents, percentile
+
+# TEST_USER/TEST_PASS/TEST_PORT: los define run_tests.py (un usuario nuevo por script)
 CONFIG = {
     'host': 'localhost',
-    'port': 3000,
-    'user': 'admin',
-    'pass': 'Saul123!',
-    'cookie': None
+    'port': int(os.environ.get('TEST_PORT', 3000)),
+    'user': os.environ.get('TEST_USER', 'admin'),
+    'pass': os.environ.get('TEST_PASS', 'Saul123!')
 }
 
 class Colors:
@@ -37,64 +50,105 @@ class Colors:
     ENDC = '\033[0m'
 
 def log(msg, color=Colors.INFO): print(f"{color}{msg}{Colors.ENDC}")
+def quiet(msg, color=None): pass
+
+class LatencyStats:
+    """Acumula latencias por endpoint (thread-safe) para el modo carga."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    @staticmethod
+    def endpoint(method, path):
+        # /savings/12/deposit -> /savings/{id}/deposit
+        route = re.sub(r'/\d+(?=/|$)', '/{id}', path.split('?')[0])
+        return f"{method} {route}"
+
+    def record(self, sample):
+        """Hook de `api_client.Session`."""
+        key = self.endpoint(sample.method, sample.path)
+        with self.lock:
+            self.samples.setdefault(key, []).append(sample.elapsed)
+            if sample.status is None or sample.status >= 400:
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def report(self, wall_time):
+        total = sum(len(v) for v in self.samples.values())
+        log(f"\n=== LATENCIAS POR ENDPOINT ({total} requests en {wall_time:.1f}s, "
+            f"{total / wall_time if wall_time else 0:.1f} req/s) ===", Colors.HEADER)
+        log(f"{'Endpoint':<34}{'n':>7}{'err':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+        for key in sorted(self.samples):
+            values = sorted(self.samples[key])
+            p50, p95, p99 = (percentile(values, p) * 1000 for p in (50, 95, 99))
+            log(f"{key:<34}{len(values):>7}{self.errors.get(key, 0):>6}{len(values) / wall_time:>9.1f}"
+                f"{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}{values[-1] * 1000:>9.1f}",
+                Colors.FAIL if self.errors.get(key) else Colors.INFO)
 
-def request(method, path, body=None):
-    conn = http.client.HTTPConnection(CONFIG['host'], CONFIG['port'])
-    headers = {'Content-Type': 'application/json'}
-    if CONFIG['cookie']: headers['Cookie'] = CONFIG['cookie']
-    
+SESSION = Session(CONFIG['host'], CONFIG['port'])
+
+def request(method, path, body=None, session=None):
+    session = session if session is not None else SESSION
     try:
-        conn.request(method, '/api' + path, body=json.dumps(body) if body else None, headers=headers)
-        res = conn.getresponse()
-        data = res.read().decode('utf-8')
-        if path == '/login' and res.getheader('Set-Cookie'):
-            CONFIG['cookie'] = res.getheader('Set-Cookie').split(';')[0]
-        try: return {'status': res.status, 'data': json.loads(data)}
-        except: return {'status': res.status, 'data': data}
+        return session.request(method, path, body)
     except Exception as e:
+        if session is not SESSION:
+            # En modo carga un error de conexión se contabiliza (hook), no aborta toda la corrida
+            return {'status': None, 'data': str(e)}
         log(f"Connection Error: {e}", Colors.FAIL)
         sys.exit(1)
-    finally:
-        conn.close()
 
-def setup_scenario():
+def setup_scenario(session=None, account=CONFIG):
     # 0. Login
-    if request('POST', '/login', {'username': CONFIG['user'], 'password': CONFIG['pass']})['status'] != 200:
-        log("Login failed", Colors.FAIL); sys.exit(1)
-        
+    if request('POST', '/login', {'username': account['user'], 'password': account['pass']}, session)['status'] != 200:
+        # Sin sys.exit: en modo carga corre dentro de un thread y cuenta como falla de ese estudiante
+        raise RuntimeError(f"Login failed ({account['user']})")
+
     # Limpieza inicial (Opcional, para que la simulación sea limpia, pero server.js no tiene endpoint de reset)
     # Asumimos que corremos sobre lo que hay. Calcularemos deltas.
-    return request('GET', '/stats')['data']['balance']
+    return request('GET', '/stats', session=session)['data']['balance']
 
-def run_simulation():
-    initial_balance = setup_scenario()
-    log(f"--- INICIO SIMULACIÓN (Balance Inicial: {initial_balance}) ---", Colors.HEADER)
-    
+def simulate_week(session=None, tag='', say=log, rng=random, think=(0, 0)):
+    """
+    Ejecuta la semana del estudiante y devuelve su libro local:
+    delta neto del balance y totales por categoría.
+    `tag` se agrega a las descripciones para poder aislar los movimientos
+    de cada estudiante cuando varios comparten la misma cuenta.
+    `think` (min, max) es la pausa en segundos después de cada request.
+    """
+    suffix = f" #{tag}" if tag else ''
     start_date = date.today()
-    running_balance = initial_balance
-    
+    net = 0
+
+    def api(method, path, body=None):
+        res = request(method, path, body, session)
+        if think[1] > 0:
+            time.sleep(rng.uniform(*think))
+        return res
+
+    def add_tx(fecha, tipo, categoria, monto, descripcion):
+        api('POST', '/transactions', {
+            'fecha': fecha, 'tipo': tipo, 'categoria': categoria,
+            'monto': monto, 'descripcion': descripcion + suffix
+        })
+
     # --- DIA 1: Configuración Financiera ---
-    log("\n[DÍA 1] Recibiendo Beca y Organizando...", Colors.HEADER)
-    
+    say("\n[DÍA 1] Recibiendo Beca y Organizando...", Colors.HEADER)
+
     # 1. Ingreso Beca
     beca = 250000
-    request('POST', '/transactions', {
-        'fecha': start_date.isoformat(),
-        'tipo': 'ingreso',
-        'categoria': 'Beca',
-        'monto': beca,
-        'descripcion': 'Beca Universitaria'
-    })
-    running_balance += beca
-    log(f" + Ingreso: ₡{beca} (Beca)")
+    add_tx(start_date.isoformat(), 'ingreso', 'Beca', beca, 'Beca Universitaria')
+    net += beca
+    say(f" + Ingreso: ₡{beca} (Beca)")
 
     # 2. Categorías
     categories = ['Comida', 'Transporte', 'Libros', 'Telefono', 'Internet', 'Alquiler']
-    current_cats = [c['nombre'] for c in request('GET', '/categories')['data']]
+    current_cats = [c['nombre'] for c in api('GET', '/categories')['data']]
     for cat in categories:
         if cat not in current_cats:
-            request('POST', '/categories', {'nombre': cat, 'tipo': 'gasto'})
-            log(f" > Categoría creada: {cat}")
+            api('POST', '/categories', {'nombre': cat, 'tipo': 'gasto'})
+            say(f" > Categoría creada: {cat}")
 
     # 3. Presupuestos
     budgets = [
@@ -105,98 +159,97 @@ def run_simulation():
         {'categoria': 'Telefono', 'limite': 10000},
         {'categoria': 'Internet', 'limite': 15000}
     ]
-    request('POST', '/category-budgets', budgets)
-    log(" > Presupuestos definidos")
+    api('POST', '/category-budgets', budgets)
+    say(" > Presupuestos definidos")
 
     # 4. Sobre Alquiler
-    env_name = "Alquiler_Mes"
+    env_name = f"Alquiler_Mes_{tag}" if tag else "Alquiler_Mes"
     # Borrar si existe para prueba limpia
-    envs = request('GET', '/savings')['data']
+    envs = api('GET', '/savings')['data']
     existing = next((e for e in envs if e['nombre'] == env_name), None)
     if existing:
         if existing['saldo'] > 0:
-            request('PUT', f"/savings/{existing['id']}/withdraw", {'monto': existing['saldo']})
-            running_balance += existing['saldo'] # Devolvemos al balance para reiniciar
-            log("   (Limpiando sobre anterior...)")
-        request('DELETE', f"/savings/{existing['id']}")
-    
-    new_env = request('POST', '/savings', {'nombre': env_name, 'icono': '🏠'})
+            api('PUT', f"/savings/{existing['id']}/withdraw", {'monto': existing['saldo']})
+            net += existing['saldo'] # Devolvemos al balance para reiniciar
+            say("   (Limpiando sobre anterior...)")
+        api('DELETE', f"/savings/{existing['id']}")
+
+    new_env = api('POST', '/savings', {'nombre': env_name, 'icono': '🏠'})
     env_id = new_env['data']['id']
-    log(f" > Sobre '{env_name}' creado")
+    say(f" > Sobre '{env_name}' creado")
 
     # 5. Mover Alquiler al Sobre
     rent_amount = 70000
-    request('PUT', f'/savings/{env_id}/deposit', {'monto': rent_amount})
-    running_balance -= rent_amount # Sale del disponible
-    log(f" - Transferencia a Sobre: ₡{rent_amount} para Alquiler")
+    api('PUT', f'/savings/{env_id}/deposit', {'monto': rent_amount})
+    net -= rent_amount # Sale del disponible
+    say(f" - Transferencia a Sobre: ₡{rent_amount} para Alquiler")
 
     # ERROR POTENCIAL: ¿Se afecta el presupuesto de 'Alquiler'?
     # En server.js el depósito se guarda como categoría 'Ahorro'.
     # Verificaremos esto al final.
 
     # --- SEMANA 1 (Simulación de Gastos) ---
-    total_comida = 0
-    total_transporte = 0
-    total_libros = 0
-    
+    totals = {'Comida': 0, 'Transporte': 0, 'Libros': 0}
+
+    def spend(fecha, categoria, monto, descripcion):
+        nonlocal net
+        add_tx(fecha, 'gasto', categoria, monto, descripcion)
+        net -= monto
+        totals[categoria] += monto
+
     current_date = start_date
     for i in range(7):
-        day_str = f"[DÍA {i+1}] {current_date.isoformat()}"
-        log(f"\n{day_str}")
-        
+        day = current_date.isoformat()
+        say(f"\n[DÍA {i+1}] {day}")
+
         # Desayuno (1500 - 2500)
-        cost = random.randint(1500, 2500)
-        request('POST', '/transactions', {'fecha': current_date.isoformat(), 'tipo': 'gasto', 'categoria': 'Comida', 'monto': cost, 'descripcion': 'Desayuno'})
-        running_balance -= cost
-        total_comida += cost
-        log(f" - Gasto: ₡{cost} (Desayuno)")
-        
+        cost = rng.randint(1500, 2500)
+        spend(day, 'Comida', cost, 'Desayuno')
+        say(f" - Gasto: ₡{cost} (Desayuno)")
+
         # Transporte Ida (350 - 500)
-        cost = random.randint(350, 500)
-        request('POST', '/transactions', {'fecha': current_date.isoformat(), 'tipo': 'gasto', 'categoria': 'Transporte', 'monto': cost, 'descripcion': 'Bus U'})
-        running_balance -= cost
-        total_transporte += cost
-        
+        spend(day, 'Transporte', rng.randint(350, 500), 'Bus U')
+
         # Almuerzo (3000 - 4500)
-        cost = random.randint(3000, 4500)
-        request('POST', '/transactions', {'fecha': current_date.isoformat(), 'tipo': 'gasto', 'categoria': 'Comida', 'monto': cost, 'descripcion': 'Almuerzo Soda'})
-        running_balance -= cost
-        total_comida += cost
-        log(f" - Gasto: ₡{cost} (Almuerzo)")
+        cost = rng.randint(3000, 4500)
+        spend(day, 'Comida', cost, 'Almuerzo Soda')
+        say(f" - Gasto: ₡{cost} (Almuerzo)")
 
         # Transporte Vuelta
-        cost = random.randint(350, 500)
-        request('POST', '/transactions', {'fecha': current_date.isoformat(), 'tipo': 'gasto', 'categoria': 'Transporte', 'monto': cost, 'descripcion': 'Bus Casa'})
-        running_balance -= cost
-        total_transporte += cost
+        spend(day, 'Transporte', rng.randint(350, 500), 'Bus Casa')
 
         # Cena (2000 - 3000)
-        cost = random.randint(2000, 3000)
-        request('POST', '/transactions', {'fecha': current_date.isoformat(), 'tipo': 'gasto', 'categoria': 'Comida', 'monto': cost, 'descripcion': 'Cena'})
-        running_balance -= cost
-        total_comida += cost
-        
+        spend(day, 'Comida', rng.randint(2000, 3000), 'Cena')
+
         # Dia 3: Compra Libro
         if i == 2:
             cost = 18000
-            request('POST', '/transactions', {'fecha': current_date.isoformat(), 'tipo': 'gasto', 'categoria': 'Libros', 'monto': cost, 'descripcion': 'Libro Física'})
-            running_balance -= cost
-            total_libros += cost
-            log(f" - Gasto: ₡{cost} (Libro Física)!!!")
+            spend(day, 'Libros', cost, 'Libro Física')
+            say(f" - Gasto: ₡{cost} (Libro Física)!!!")
 
         current_date += timedelta(days=1)
 
+    return {'tag': tag, 'start_date': start_date, 'net': net, 'totals': totals}
+
+def run_simulation():
+    initial_balance = setup_scenario()
+    log(f"--- INICIO SIMULACIÓN (Balance Inicial: {initial_balance}) ---", Colors.HEADER)
+
+    week = simulate_week()
+    start_date = week['start_date']
+    running_balance = initial_balance + week['net']
+    total_comida = week['totals']['Comida']
 
     # --- INFORME FINAL ---
     log("\n=== VALIDACIÓN Y RESULTADOS ===", Colors.HEADER)
-    
+
     server_stats = request('GET', '/stats')['data']
     server_balance = server_stats['balance']
-    
+
     log(f"Balance Calculado (Simulación): ₡{running_balance}")
     log(f"Balance Servidor (Real):        ₡{server_balance}")
-    
-    if abs(running_balance - server_balance) < 1.0:
+
+    if cents(running_balance) == cents(server_balance):
         log("✅ INTEGRIDAD CONTABLE: CORRECTA", Colors.PASS)
     else:
         log("❌ INTEGRIDAD CONTABLE: FALLO", Colors.FAIL)
@@ -205,7 +258,7 @@ def run_simulation():
     # Revisión de Presupuestos
     log("\nANÁLISIS DE PRESUPUESTOS vs REALIDAD:", Colors.WARN)
     txs = request('GET', '/transactions')['data']
-    
+
     def get_spent(cat):
         return sum(t['monto'] for t in txs if t['tipo'] == 'gasto' and t['categoria'] == cat and t['fecha'] >= start_date.isoformat())
 
@@ -214,14 +267,14 @@ def run_simulation():
     log(f"Comida: Gastado ₡{spent_comida} / Presupuesto ₡60000")
     if spent_comida != total_comida:
          log(f"⚠️ Discrepancia en tracking local vs server para Comida ({total_comida} vs {spent_comida})", Colors.FAIL)
-    
+
     # Validar Alquiler (El BUG esperado)
     spent_alquiler = get_spent('Alquiler')
     spent_ahorro = get_spent('Ahorro')
-    
+
     log(f"Alquiler (Categoría): Gastado ₡{spent_alquiler} / Presupuesto ₡70000")
     log(f"Ahorro (Categoría):   Gastado ₡{spent_ahorro}")
-    
+
     if spent_alquiler == 0 and spent_ahorro >= 70000:
         log("\n🚩 HALLAZGO IMPORTANTE (BUG DE LÓGICA):", Colors.FAIL)
         log("   El usuario creó un presupuesto para 'Alquiler' y depositó 70k en un sobre llamado 'Alquiler'.")
@@ -229,5 +282,125 @@ def run_simulation():
         log("   RESULTADO: El presupuesto de 'Alquiler' aparece intacto (0% uso), dando una falsa sensación de disponibilidad.")
         log("   El dinero se descontó, pero no se reflejó en la barra de progreso correcta.")
 
+# --- MODO CARGA ---
+
+def verify_students(account, students, initial_balance):
+    """Integridad contable por estudiante (ledger etiquetado) y por cuenta (delta de balance)."""
+    session = Session(CONFIG['host'], CONFIG['port'])
+    final_balance = setup_scenario(session, account)
+    txs = request('GET', '/transactions', session=session)['data']
+    ok = True
+
+    for week in students:
+        if week.get('error'):
+            log(f"❌ [{week['tag']}] Simulación abortada: {week['error']}", Colors.FAIL)
+            ok = False
+            continue
+        # El tag aparece en las descripciones propias y en el nombre del sobre ("Depósito a sobre: ...")
+        mine = [t for t in txs if t['descripcion'] and week['tag'] in t['descripcion']]
+        ledger = sum(t['monto'] if t['tipo'] == 'ingreso' else -t['monto'] for t in mine)
+        comida = sum(t['monto'] for t in mine if t['tipo'] == 'gasto' and t['categoria'] == 'Comida')
+        if cents(ledger) != cents(week['net']) or cents(comida) != cents(week['totals']['Comida']):
+            log(f"❌ [{week['tag']}] Ledger servidor ₡{ledger} (Comida ₡{comida}) != "
+                f"local ₡{week['net']} (Comida ₡{week['totals']['Comida']})", Colors.FAIL)
+            ok = False
+
+    expected = initial_balance + sum(w['net'] for w in students if not w.get('error'))
+    if cents(expected) == cents(final_balance):
+        log(f"✅ [{account['user']}] Balance ₡{final_balance} cuadra con {len(students)} estudiantes", Colors.PASS)
+    else:
+        log(f"❌ [{account['user']}] Balance servidor ₡{final_balance} != esperado ₡{expected} "
+            f"(diferencia {final_balance - expected})", Colors.FAIL)
+        ok = False
+    return ok
+
+def run_load(students, accounts, ramp_up, think, seed, metrics=False):
+    stats = LatencyStats()
+    run_id = int(time.time())
+
+    # Balance inicial por cuenta antes de arrancar la carga
+    initial = {}
+    for acc in accounts:
+        initial[acc['user']] = setup_scenario(Session(CONFIG['host'], CONFIG['port']), acc)
+
+    log(f"--- MODO CARGA: {students} estudiantes, {len(accounts)} cuenta(s), "
+        f"ramp-up {ramp_up}s, think {think[0]}-{think[1]}s ---", Colors.HEADER)
+
+    def student(i):
+        account = accounts[i % len(accounts)]
+        tag = f"{run_id}-s{i:03d}"
+        if ramp_up:
+            time.sleep(ramp_up * i / students)
+        rng = random.Random(seed + i)
+        session = Session(CONFIG['host'], CONFIG['port'])
+        session.add_hook(stats.record)
+        try:
+            setup_scenario(session, account)
+            week = simulate_week(session, tag=tag, say=quiet, rng=rng, think=think)
+        except Exception as e:
+            week = {'tag': tag, 'error': repr(e)}
+        week['account'] = account['user']
+        return week
+
+    # /api/metrics es solo de admin: sesión aparte con la cuenta de CONFIG
+    admin = None
+    if metrics:
+        admin = Session(CONFIG['host'], CONFIG['port'])
+        admin.login(CONFIG['user'], CONFIG['pass'])
+        before = server_metrics.scrape(admin)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=students) as pool:
+        results = list(pool.map(student, range(students)))
+    wall_time = time.perf_counter() - started
+
+    stats.report(wall_time)
+    if admin:
+        server_metrics.report(server_metrics.diff(before, server_metrics.scrape(admin)))
+
+    log("\n=== INTEGRIDAD CONTABLE POR ESTUDIANTE ===", Colors.HEADER)
+    ok = True
+    for acc in accounts:
+        mine = [w for w in results if w['account'] == acc['user']]
+        if mine:
+            ok = verify_students(acc, mine, initial[acc['user']]) and ok
+
+    if ok:
+        log(f"\n✅ INTEGRIDAD BAJO CARGA: CORRECTA ({students} estudiantes)", Colors.PASS)
+    else:
+        log("\n❌ INTEGRIDAD BAJO CARGA: FALLO", Colors.FAIL)
+        sys.exit(1)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Simulación de estudiante (individual o en carga)')
+    parser.add_argument('--load', type=int, default=0, metavar='N',
+                        help='Número de estudiantes simultáneos (0 = simulación individual)')
+    parser.add_argument('--ramp-up', type=float, default=0.0, metavar='SEG',
+                        help='Segundos para escalonar el arranque de los estudiantes')
+    parser.add_argument('--think', default='0:0', metavar='MIN:MAX',
+                        help='Pausa aleatoria entre requests de cada estudiante, en segundos')
+    parser.add_argument('--accounts', default=None, metavar='USER:PASS,...',
+                        help='Cuentas a repartir entre estudiantes (default: CONFIG)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--metrics', action='store_true',
+                        help='En modo carga, mostrar el diff de /api/metrics de la corrida')
+    args = parser.parse_args()
+
+    low, _, high = args.think.partition(':')
+    args.think = (float(low), float(high or low))
+    if args.accounts:
+        args.accounts = [dict(zip(('user', 'pass'), a.split(':', 1))) for a in args.accounts.split(',')]
+    else:
+        args.accounts = [{'user': CONFIG['user'], 'pass': CONFIG['pass']}]
+    return args
+
 if __name__ == "__main__":
-    run_simulation()
+    args = parse_args()
+    try:
+        if args.load > 0:
+            run_load(args.load, args.accounts, args.ramp_up, args.think, args.seed, args.metrics)
+        else:
+            run_simulation()
+    except RuntimeError as e:
+        log(str(e), Colors.FAIL)
+        sys.exit(1)
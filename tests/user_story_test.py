@@ -10,18 +10,19 @@ Simula un flujo completo de usuario:
 Uso: python3 tests/user_story_test.py
 """
 
-import http.client
-import json
+import os
 import sys
 import time
 from datetime import date
 
+from api_client import Session, cents
+
+# TEST_USER/TEST_PASS/TEST_PORT: los define run_tests.py (un usuario nuevo por script)
 CONFIG = {
     'host': 'localhost',
-    'port': 3000,
-    'user': 'admin',
-    'pass': 'Saul123!',
-    'cookie': None
+    'port': int(os.environ.get('TEST_PORT', 3000)),
+    'user': os.environ.get('TEST_USER', 'admin'),
+    'pass': os.environ.get('TEST_PASS', 'Saul123!')
 }
 
 class Colors:
@@ -39,23 +40,13 @@ def log_fail(msg, detail=None):
     sys.exit(1)
 def log_info(msg): print(f"{Colors.INFO} ->{Colors.ENDC} {msg}")
 
+SESSION = Session(CONFIG['host'], CONFIG['port'])
+
 def request(method, path, body=None):
-    conn = http.client.HTTPConnection(CONFIG['host'], CONFIG['port'])
-    headers = {'Content-Type': 'application/json'}
-    if CONFIG['cookie']: headers['Cookie'] = CONFIG['cookie']
-    
     try:
-        conn.request(method, '/api' + path, body=json.dumps(body) if body else None, headers=headers)
-        res = conn.getresponse()
-        data = res.read().decode('utf-8')
-        if path == '/login' and res.getheader('Set-Cookie'):
-            CONFIG['cookie'] = res.getheader('Set-Cookie').split(';')[0]
-        try: return {'status': res.status, 'data': json.loads(data)}
-        except: return {'status': res.status, 'data': data}
+        return SESSION.request(method, path, body)
     except Exception as e:
         log_fail("Connection Error", str(e))
-    finally:
-        conn.close()
 
 def get_balance():
     res = request('GET', '/stats')
@@ -122,8 +113,7 @@ def run_story():
         # Nota: En este sistema, depositar a ahorro crea un GASTO 'Ahorro', reduciendo el disponible.
         current_balance = get_balance()
         expected_balance = initial_balance + income_amount - deposit_amount
-        # Tolerancia float pequeña
-        if abs(current_balance - expected_balance) < 0.1:
+        if cents(current_balance) == cents(expected_balance):
             log_pass(f"Balance general reducido correctamente (Dinero movido a sobre)")
         else:
             log_fail(f"Balance general no cuadra. Esperado: {expected_balance}, Actual: {current_balance}")